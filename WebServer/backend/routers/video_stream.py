@@ -4,15 +4,20 @@
 使用共享摄像头资源，与情绪检测等模块协调工作
 """
 
-from fastapi import APIRouter, HTTPException, Response
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 import sys
 import os
+import asyncio
 import logging
-from typing import Generator, Optional
+from typing import AsyncGenerator, Optional
 import time
 from pathlib import Path
 from config import USE_STATIC_VIDEO_STREAM
+from modules.stream_hub import ViewerLimitError, get_stream_profile, mjpeg_part, request_device_type
+from modules.snapshot_cache import SnapshotCache, etag_matches, snapshot_etag
+from modules.jpeg_codec import encode_jpeg
+from modules.video_sessions import get_video_session_registry, open_video_session
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -47,14 +52,9 @@ class VideoStreamManager:
         self._static_image_bytes: Optional[bytes] = None
         self._load_static_image()
 
-        # 快照缓存目录（项目根/static/camera_cache）
-        try:
-            self._cache_dir = self._root_dir / 'static' / 'camera_cache'
-            self._cache_dir.mkdir(parents=True, exist_ok=True)
-        except Exception as e:
-            logging.getLogger(__name__).warning(f"创建快照缓存目录失败: {e}")
-            self._cache_dir = None
-        self._last_cache_write = 0.0
+        # 快照缓存（内存中按帧序号缓存最新一帧的JPEG，不写磁盘）
+        camera_manager = getattr(self.shared_camera, 'camera_manager', None)
+        self.snapshot_cache = SnapshotCache(camera_manager, quality=self.quality) if camera_manager is not None else None
 
     def _load_static_image(self) -> None:
         """加载静态展示图片到内存，不存在则置空以便后续生成占位图"""
@@ -111,15 +111,46 @@ class VideoStreamManager:
                 "mode": "未知"
             }
     
-    def generate_frames(self) -> Generator[bytes, None, None]:
-        """生成视频帧：静态图或共享摄像头"""
+    def subscribe(self, adaptive: bool = True, profile=None):
+        """
+        为一个客户端订阅共享摄像头的编码通道（静态模式或没有共享摄像头时返回None）
+
+        Args:
+            adaptive: 是否按该客户端自身的网络状况自动选择分辨率/质量档位（质量不超过self.quality）
+            profile: 视频流规格（StreamProfile），按规格限制尺寸、质量和帧率
+
+        Raises:
+            ViewerLimitError: 同时观看的客户端数量已达上限
+        """
+        if self.use_static or self.shared_camera is None or not hasattr(self.shared_camera, 'subscribe'):
+            return None
+        if profile is not None and hasattr(self.shared_camera, 'subscribe_profile'):
+            # 页面配置的质量和帧率同样作为上限
+            profile = profile._replace(quality=min(profile.quality, self.quality),
+                                       fps=min(profile.fps, self.frame_rate))
+            return self.shared_camera.subscribe_profile(profile, adaptive)
+        if adaptive and hasattr(self.shared_camera, 'subscribe_adaptive'):
+            return self.shared_camera.subscribe_adaptive(max_quality=self.quality, target_fps=self.frame_rate)
+        return self.shared_camera.subscribe(quality=self.quality)
+
+    async def generate_frames(self, subscription=None, frame_rate: Optional[float] = None) -> AsyncGenerator[bytes, None]:
+        """
+        生成视频帧：静态图或共享摄像头
+
+        异步生成器，由新帧事件驱动，不占用线程池线程；客户端较慢时直接跳到最新一帧。
+
+        Args:
+            subscription: subscribe() 返回的订阅，每帧只编码一次、所有客户端共享，生成器结束时关闭
+            frame_rate: 帧率上限（如视频流规格的帧率），None使用配置的帧率
+        """
         self.is_streaming = True
-        frame_interval = 1.0 / self.frame_rate
+        frame_interval = 1.0 / min(frame_rate or self.frame_rate, self.frame_rate)
 
         try:
             while self.is_streaming:
                 start_time = time.time()
 
+                part: Optional[bytes] = None
                 if self.use_static:
                     frame_data: Optional[bytes] = self._static_image_bytes
                     if not frame_data:
@@ -127,7 +158,12 @@ class VideoStreamManager:
                 else:
                     frame_data = None
                     try:
-                        if self.shared_camera is not None:
+                        if subscription is not None:
+                            # 等待共享摄像头的新帧，不重复发送同一帧
+                            part = await subscription.next_part_async(timeout=1.0)
+                            if part is not None:
+                                frame_data = subscription.channel.latest.data
+                        elif self.shared_camera is not None:
                             frame_data = self.shared_camera.read()
                     except Exception as e:
                         logger.debug(f"读取共享摄像头失败: {e}")
@@ -135,32 +171,23 @@ class VideoStreamManager:
                         frame_data = self._generate_test_frame()
 
                 if frame_data:
-                    # 生成multipart数据
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame_data + b'\r\n')
-                    # 写入快照缓存（每2秒一次，原子替换）
-                    try:
-                        if self._cache_dir is not None and (time.time() - self._last_cache_write) >= 2.0:
-                            tmp_path = self._cache_dir / 'latest.tmp'
-                            final_path = self._cache_dir / 'latest.jpg'
-                            with open(tmp_path, 'wb') as f:
-                                f.write(frame_data)
-                            os.replace(tmp_path, final_path)
-                            self._last_cache_write = time.time()
-                    except Exception as e:
-                        logger.debug(f"写入快照缓存失败: {e}")
+                    # 生成multipart数据（订阅得到的分段已封装好，所有客户端共享）；
+                    # 静止画面改由 /api/video/snapshot 从内存提供，推流过程中不再写磁盘
+                    yield part if part is not None else mjpeg_part(frame_data)
 
-                # 控制帧率
+                # 控制帧率上限
                 elapsed = time.time() - start_time
                 sleep_time = max(0, frame_interval - elapsed)
                 if sleep_time > 0:
-                    time.sleep(sleep_time)
+                    await asyncio.sleep(sleep_time)
 
         except GeneratorExit:
             logger.info("视频流生成器关闭")
         except Exception as e:
             logger.error(f"视频流生成错误: {e}")
         finally:
+            if subscription is not None:
+                subscription.close()
             self.is_streaming = False
     
     def _generate_test_frame(self) -> bytes:
@@ -183,11 +210,9 @@ class VideoStreamManager:
                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
             
             # 编码为JPEG
-            ret, buffer = cv2.imencode('.jpg', frame, 
-                                     [cv2.IMWRITE_JPEG_QUALITY, self.quality])
-            
-            if ret:
-                return buffer.tobytes()
+            buffer = encode_jpeg(frame, self.quality)
+            if buffer is not None:
+                return buffer
                 
         except Exception as e:
             logger.error(f"测试帧生成错误: {e}")
@@ -198,20 +223,30 @@ class VideoStreamManager:
 video_manager = VideoStreamManager()
 
 @router.get("/video")
-async def video_stream():
+async def video_stream(request: Request, adaptive: bool = True, profile: Optional[str] = None):
     """
     实时传输视频流（静态图或摄像头，受 USE_STATIC_VIDEO_STREAM 控制）
     
     功能位置: Home.vue/Monitor.vue 视频区域
     优先级: 高 🔥
     
+    Args:
+        adaptive: 按该客户端自身的网络状况自动选择分辨率/质量，False时固定使用规格的分辨率和质量
+        profile: 视频流规格 'mobile' / 'pc'，默认按设备类型选择
+    
     Returns:
         StreamingResponse: MJPEG视频流
     """
+    subscription = None
     try:
-        logger.info(f"开始视频流传输（{'静态图' if video_manager.use_static else '摄像头'}）")
+        stream_profile = get_stream_profile(profile, request_device_type(request))
+        logger.info(f"开始视频流传输（{'静态图' if video_manager.use_static else '摄像头'}，规格: {stream_profile.name}）")
+        subscription = video_manager.subscribe(adaptive, stream_profile)
+        if subscription is not None:
+            stream_name = getattr(video_manager.shared_camera, 'stream_name', 'raw')
+            open_video_session(subscription, request, '/api/video', stream_name, stream_profile.name)
         return StreamingResponse(
-            video_manager.generate_frames(),
+            video_manager.generate_frames(subscription, stream_profile.fps),
             media_type="multipart/x-mixed-replace; boundary=frame",
             headers={
                 "Cache-Control": "no-cache, no-store, must-revalidate",
@@ -219,29 +254,70 @@ async def video_stream():
                 "Expires": "0"
             }
         )
+    except ViewerLimitError as e:
+        logger.warning(f"拒绝视频流请求: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"视频流启动失败: {e}")
+        # 生成器尚未开始运行，不会替我们退订
+        if subscription is not None:
+            subscription.close()
         raise HTTPException(status_code=500, detail=f"视频流服务错误: {str(e)}")
 
 
+@router.get("/video/snapshot")
+def video_snapshot(request: Request, w: Optional[int] = None):
+    """
+    最新一帧的JPEG快照（内存缓存，不写磁盘）
+    
+    响应带ETag，客户端携带 If-None-Match 且没有新帧时返回304。
+    缓存未命中时需要同步编码（可能等待解码/编码锁），因此为普通函数，由线程池执行，不阻塞事件循环。
+    
+    Args:
+        w: 输出宽度（按比例缩小，不放大），每种宽度每帧只编码一次
+    
+    Returns:
+        image/jpeg；摄像头尚无画面时返回503
+    """
+    if w is not None and w <= 0:
+        raise HTTPException(status_code=400, detail="w必须为正整数")
+
+    if video_manager.use_static:
+        data = video_manager._static_image_bytes or video_manager._generate_test_frame()
+        etag = f'"static-{len(data)}-{hash(data) & 0xffffffff:x}"'
+    else:
+        cache = video_manager.snapshot_cache
+        jpeg = cache.get(w, video_manager.quality) if cache is not None else None
+        if jpeg is None:
+            raise HTTPException(status_code=503, detail="摄像头暂无画面")
+        data = jpeg.data
+        etag = snapshot_etag(jpeg, video_manager.quality)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        if not video_manager.use_static:
+            video_manager.snapshot_cache.stats['not_modified'] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type='image/jpeg', headers=headers)
+
+
 @router.get("/video/fallback")
 async def video_fallback():
     """
-    视频流回退图片：静态模式返回 static/home.jpg；否则返回最近缓存或占位图。
+    视频流回退图片：静态模式返回 static/home.jpg；否则返回内存中的最新快照或占位图。
     前端在 <img> 加载 /api/video 失败时应切换到该URL。
     """
     try:
         # 静态模式：优先返回静态图
-        if video_manager.use_static:
-            static_img = Path(__file__).resolve().parents[3] / 'static' / 'home.jpg'
-            if static_img.exists():
-                return FileResponse(str(static_img), media_type='image/jpeg', headers={"Cache-Control": "no-store"})
+        if video_manager.use_static and video_manager._static_image_bytes:
+            return Response(content=video_manager._static_image_bytes, media_type='image/jpeg',
+                            headers={"Cache-Control": "no-store"})
 
-        # 其次（或非静态模式），返回最近缓存的快照
-        cache_dir = video_manager._cache_dir or (Path(__file__).resolve().parents[3] / 'static' / 'camera_cache')
-        latest = cache_dir / 'latest.jpg'
-        if latest.exists():
-            return FileResponse(str(latest), media_type='image/jpeg', headers={"Cache-Control": "no-store"})
+        # 其次（或非静态模式），返回内存中的最新快照
+        if video_manager.snapshot_cache is not None:
+            jpeg = video_manager.snapshot_cache.get(quality=video_manager.quality)
+            if jpeg is not None:
+                return Response(content=jpeg.data, media_type='image/jpeg', headers={"Cache-Control": "no-store"})
 
         # 最后兜底：动态生成一张简单提示图
         import cv2
@@ -251,9 +327,9 @@ async def video_fallback():
         ts = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
         cv2.putText(img, "Fallback Snapshot", (40, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (70, 90, 120), 2)
         cv2.putText(img, ts, (80, 200), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (100, 120, 150), 2)
-        ok, buf = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 85])
-        if ok:
-            return Response(content=buf.tobytes(), media_type='image/jpeg', headers={"Cache-Control": "no-store"})
+        buf = encode_jpeg(img, 85)
+        if buf is not None:
+            return Response(content=buf, media_type='image/jpeg', headers={"Cache-Control": "no-store"})
     except Exception as e:
         logger.error(f"回退图片生成失败: {e}")
     # 彻底失败时返回空响应
@@ -270,6 +346,7 @@ async def video_status():
     """
     status = video_manager.get_camera_status()
     status["streaming"] = video_manager.is_streaming
+    status["sessions"] = get_video_session_registry().get_status()
     return status
 
 @router.post("/video/config")
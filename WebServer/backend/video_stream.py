@@ -1,5 +1,4 @@
 import cv2
-import threading
 import time
 import numpy as np
 import logging
@@ -12,6 +11,9 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 # 导入摄像头管理器
 from modules.camera_manager import get_camera_manager
+from modules.stream_hub import StreamSubscription, get_stream_hub
+from modules.video_stream_module import STREAM_RESOLUTION_LEVELS, STREAM_FPS_TARGET, RESOLUTION_ADJUST_INTERVAL
+from modules.jpeg_codec import encode_jpeg
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -20,9 +22,12 @@ logger = logging.getLogger(__name__)
 class Camera:
     """
     摄像头封装类 - 使用中心化摄像头管理器
+    
+    不再有常驻的编码线程：MJPEG推流通过 subscribe() 订阅流分发中心，
+    只在有客户端观看时编码，且每帧只编码一次、所有客户端共享。
     """
-    def __init__(self, src=0):
-        # 获取全局摄像头管理器实例
+    def __init__(self, src=None, quality: int = 85):
+        # 获取摄像头管理器：src为None时使用默认（主）摄像头，否则按设备ID从注册表获取
         self.camera_manager = get_camera_manager(
             init=True,  # 自动初始化并启动
             camera_id=src,
@@ -30,49 +35,81 @@ class Camera:
             frame_height=480,
             fps_target=30
         )
+        self.quality = quality
         
-        # 注册为摄像头帧的消费者
-        self.frame_queue = self.camera_manager.register_consumer("webserver_camera", max_queue_size=5)
-        
-        # 最新一帧（已编码为JPEG）
-        self.frame = None
-        self.lock = threading.Lock()
+        # 在流分发中心登记本摄像头的原始画面
+        self.stream_name = 'raw' if src is None else f"camera:{self.camera_manager.source_id}"
+        self.hub = get_stream_hub()
+        self.hub.register_source(self.stream_name, self.camera_manager)
+        logger.info(f"WebServer摄像头已就绪（视频流: {self.stream_name}）")
+    
+    @property
+    def running(self) -> bool:
+        return self.camera_manager.running
+    
+    def subscribe(self, quality: Optional[int] = None, size=None) -> StreamSubscription:
+        """
+        订阅本摄像头的MJPEG流
         
-        # 启动帧处理线程
-        self.running = True
-        threading.Thread(target=self._process_frames, daemon=True, name="WebServerCamera").start()
-        logger.info("WebServer摄像头帧处理线程已启动")
+        Args:
+            quality: JPEG质量，默认使用构造时的质量
+            size: 输出尺寸 (宽, 高)，None表示摄像头分辨率
+            
+        Returns:
+            StreamSubscription，客户端断开后需 close()
+        """
+        return self.hub.subscribe(self.stream_name, quality or self.quality, size)
     
-    def _process_frames(self):
-        """处理从摄像头管理器接收到的帧"""
-        while self.running:
-            try:
-                # 尝试从队列获取最新帧（超时等待100毫秒）
-                try:
-                    frame = self.frame_queue.get(timeout=0.1)
-                except:
-                    # 队列为空，尝试直接从管理器获取最新帧
-                    frame = self.camera_manager.get_latest_frame()
-                
-                if frame is not None:
-                    # 编码为JPEG
-                    _, jpg = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 85])
-                    with self.lock:
-                        self.frame = jpg.tobytes()
-                else:
-                    # 如果仍然没有帧，生成一个模拟帧
-                    self._generate_dummy_frame()
+    def subscribe_adaptive(self, max_quality: Optional[int] = None, target_fps: float = STREAM_FPS_TARGET):
+        """
+        订阅本摄像头的MJPEG流，按该客户端自身的发送状况在 STREAM_RESOLUTION_LEVELS 中自动选择档位
+        
+        Args:
+            max_quality: JPEG质量上限，默认使用构造时的质量
+            target_fps: 目标帧率
             
-            except Exception as e:
-                logger.error(f"处理视频帧出错: {str(e)}")
-                # 如果发生错误，生成一个模拟帧
-                self._generate_dummy_frame()
-                time.sleep(0.1)
+        Returns:
+            AdaptiveSubscription，客户端断开后需 close()
+        """
+        return self.hub.subscribe_adaptive(
+            self.stream_name, STREAM_RESOLUTION_LEVELS, max_quality=max_quality or self.quality,
+            target_fps=target_fps, adjust_interval=RESOLUTION_ADJUST_INTERVAL)
     
+    def subscribe_profile(self, profile, adaptive: bool = True):
+        """
+        按视频流规格（尺寸/质量/帧率上限）订阅本摄像头的MJPEG流
+
+        Args:
+            profile: StreamProfile（get_stream_profile()）
+            adaptive: 是否在规格以下的 STREAM_RESOLUTION_LEVELS 档位中自动升降
+
+        Returns:
+            StreamSubscription 或 AdaptiveSubscription，客户端断开后需 close()
+        """
+        return self.hub.subscribe_profile(self.stream_name, profile, adaptive,
+                                          resolution_levels=STREAM_RESOLUTION_LEVELS,
+                                          adjust_interval=RESOLUTION_ADJUST_INTERVAL)
+
     def read(self):
-        """读取当前帧"""
-        with self.lock:
-            return self.frame
+        """读取当前帧（JPEG字节），没有帧时返回模拟帧"""
+        jpeg = self.camera_manager.wait_for_jpeg(0, timeout=0, quality=self.quality)
+        return jpeg.data if jpeg is not None else self._generate_dummy_frame()
+    
+    def wait_for_jpeg(self, after_seq: int = 0, timeout: Optional[float] = None):
+        """
+        阻塞等待比after_seq更新的JPEG帧（按需编码，同一帧只编码一次）
+        
+        Args:
+            after_seq: 调用方已发送的最后一帧序号
+            timeout: 最长等待秒数，None表示一直等待
+            
+        Returns:
+            (序号, JPEG字节)；超时返回 (after_seq, None)
+        """
+        jpeg = self.camera_manager.wait_for_jpeg(after_seq, timeout=timeout, quality=self.quality)
+        if jpeg is None:
+            return after_seq, None
+        return jpeg.seq, jpeg.data
     
     @property
     def cap(self):
@@ -87,13 +124,10 @@ class Camera:
         pass
     
     def stop(self):
-        """停止摄像头帧处理（不会停止全局摄像头管理器）"""
-        self.running = False
-        # 注销消费者
-        self.camera_manager.unregister_consumer("webserver_camera")
-        logger.info("WebServer摄像头帧处理已停止")
+        """停止摄像头（兼容性方法，不会停止全局摄像头管理器）"""
+        logger.info("WebServer摄像头已停止")
         
-    def _generate_dummy_frame(self):
+    def _generate_dummy_frame(self) -> Optional[bytes]:
         """生成模拟帧，当无法获取真实帧时使用"""
         try:
             # 创建空白帧
@@ -110,11 +144,10 @@ class Camera:
                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
             
             # 编码为JPEG
-            _, jpg = cv2.imencode('.jpg', dummy_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 85])
-            with self.lock:
-                self.frame = jpg.tobytes()
+            return encode_jpeg(dummy_frame, self.quality)
         except Exception as e:
             logger.error(f"生成模拟帧出错: {str(e)}")
+            return None
 
 # 单例摄像头
-camera = Camera(src=0)
\ No newline at end of file
+camera = Camera()
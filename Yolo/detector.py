@@ -7,6 +7,14 @@ from threading import Thread
 import queue
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from modules.camera_discovery import get_camera_discovery
+from modules.camera_manager import get_camera_manager
+
+try:
+    from config import DETECTION_MAX_FPS
+except ImportError:
+    DETECTION_MAX_FPS = 20
+
 class rknnPoolExecutor:
     def __init__(self, model_path, TPEs, func):
         self.TPEs = TPEs
@@ -66,7 +74,8 @@ def thread_safe_predict(model, frame):
         return None
 
 class Detector:
-    def __init__(self, TPEs=4, model_path="Yolo/best6_rknn_model", camera_id=None, show_img=False):
+    def __init__(self, TPEs=4, model_path="Yolo/best6_rknn_model", camera_id=None, show_img=False,
+                 camera_manager=None, private_capture=False):
         """
         实例化目标检测器
 
@@ -75,6 +84,9 @@ class Detector:
             model_path (str): 模型路径
             camera_id (int, optional): 摄像头ID，若为None则自动查找可用摄像头
             show_img (bool): 是否显示图像，默认False
+            camera_manager (CameraManager, optional): 摄像头管理器，从其共享帧中读取；
+                未提供但指定了camera_id时默认使用 get_camera_manager(camera_id=camera_id)
+            private_capture (bool): 为True时不使用摄像头管理器，自行打开并独占摄像头
             
         此检测器使用YOLO模型进行目标检测，支持多线程处理以提高性能。
         检测结果包括目标位置(x,y)，置信度和FPS信息。
@@ -101,6 +113,11 @@ class Detector:
         self.confidence = 0.0
         self.detected = False
         self.cap = None
+        if camera_manager is None and camera_id is not None and not private_capture:
+            # 指定了设备时共享该设备的摄像头管理器，避免与其他模块争用同一设备
+            camera_manager = get_camera_manager(camera_id=camera_id)
+        self.camera_manager = camera_manager
+        self._last_frame_seq = 0
         self.pool = None
         self._last_frame_time = time.time()
         self._frame_count = 0
@@ -131,86 +148,6 @@ class Detector:
             print(f"显示环境检查失败: {e}")
             return False
             
-    def _find_available_cameras(self):
-        """查找所有可用的摄像头设备
-        
-        Returns:
-            list: 可用摄像头ID列表
-        """
-        available_cameras = []
-        camera_api_preference = cv2.CAP_V4L2  # Linux上使用V4L2后端，效果更好
-        
-        print("开始扫描可用摄像头...")
-        
-        # 方法1：使用传统的枚举方式查找所有摄像头
-        for i in range(0, 10):  # 检查0-9号摄像头
-            try:
-                print(f"尝试检测摄像头索引 {i}...")
-                cap = cv2.VideoCapture(i, camera_api_preference)
-                if cap.isOpened():
-                    ret, frame = cap.read()
-                    if ret and frame is not None:
-                        available_cameras.append(i)
-                        print(f"发现可用摄像头: 索引 {i}, 分辨率: {frame.shape[1]}x{frame.shape[0]}")
-                    else:
-                        print(f"摄像头索引 {i} 无法读取帧")
-                    cap.release()
-                else:
-                    print(f"摄像头索引 {i} 无法打开")
-            except Exception as e:
-                print(f"检测摄像头 {i} 时出错: {e}")
-                continue
-        
-        # 方法2：使用设备文件路径尝试打开摄像头        
-        try:
-            import glob
-            video_devices = glob.glob('/dev/video*')
-            for device in video_devices:
-                try:
-                    index = int(device.replace('/dev/video', ''))
-                    # 如果已经尝试过这个索引，跳过
-                    if index in available_cameras:
-                        continue
-                        
-                    print(f"尝试通过设备路径打开 {device}...")
-                    # 尝试直接使用设备路径
-                    cap = cv2.VideoCapture(device, camera_api_preference)
-                    if cap.isOpened():
-                        ret, frame = cap.read()
-                        if ret and frame is not None:
-                            available_cameras.append(index)
-                            print(f"通过设备文件发现可用摄像头: {device} (索引 {index})")
-                        else:
-                            print(f"设备 {device} 无法读取帧")
-                        cap.release()
-                    else:
-                        print(f"无法打开设备 {device}")
-                except Exception as e:
-                    print(f"尝试设备 {device} 时出错: {e}")
-        except Exception as e:
-            print(f"通过设备文件查找摄像头失败: {e}")
-
-        # 方法3：尝试特定索引（如WebPostureMonitor使用的索引6）
-        special_indices = [6, 1, 4]  # 根据观察特别尝试这些索引
-        for idx in special_indices:
-            if idx in available_cameras:
-                continue
-                
-            try:
-                print(f"尝试特殊索引 {idx}...")
-                cap = cv2.VideoCapture(idx, camera_api_preference)
-                if cap.isOpened():
-                    ret, frame = cap.read()
-                    if ret and frame is not None:
-                        available_cameras.append(idx)
-                        print(f"发现特殊索引摄像头: {idx}")
-                    cap.release()
-            except Exception:
-                pass
-
-        print(f"找到可用摄像头: {available_cameras}")
-        return available_cameras
-
     def initialize(self):
         """初始化检测器资源：摄像头和线程池"""
         try:
@@ -222,149 +159,21 @@ class Detector:
                 func=thread_safe_predict
             )
             
-            # 尝试打开摄像头
-            success = False
-            tried_camera_ids = []
-            camera_api_preference = cv2.CAP_V4L2  # Linux上使用V4L2后端
-            
-            # 先获取所有可用的摄像头
-            available_cameras = self._find_available_cameras()
-            
-            # 尝试1：如果用户明确指定了摄像头ID，先尝试这个ID
-            if self.camera_id is not None:
-                try:
-                    print(f"尝试打开用户指定的摄像头 ID: {self.camera_id}...")
-                    
-                    # 使用V4L2后端打开摄像头
-                    self.cap = cv2.VideoCapture(self.camera_id, camera_api_preference)
-                    if self.cap.isOpened():
-                        ret, test_frame = self.cap.read()
-                        if ret and test_frame is not None:
-                            success = True
-                            print(f"成功打开摄像头 ID: {self.camera_id}")
-                        else:
-                            print(f"摄像头 ID {self.camera_id} 无法读取帧")
-                            self.cap.release()
-                    else:
-                        print(f"摄像头 ID {self.camera_id} 无法打开")
-                except Exception as e:
-                    print(f"打开指定摄像头 {self.camera_id} 失败: {e}")
-                    if self.cap:
-                        self.cap.release()
-                
-                tried_camera_ids.append(self.camera_id)
-            
-            # 尝试2: 如果有前面发现的可用摄像头，尝试这些摄像头
-            if not success and available_cameras:
-                # 过滤掉已经尝试过的ID
-                available_cameras = [cam for cam in available_cameras if cam not in tried_camera_ids]
-                
-                if available_cameras:
-                    print(f"尝试使用发现的可用摄像头: {available_cameras}")
-                    for camera_id in available_cameras:
-                        try:
-                            print(f"尝试打开备选摄像头 ID: {camera_id}...")
-                            self.cap = cv2.VideoCapture(camera_id, camera_api_preference)
-                            if self.cap.isOpened():
-                                ret, test_frame = self.cap.read()
-                                if ret and test_frame is not None:
-                                    self.camera_id = camera_id  # 更新为实际使用的摄像头ID
-                                    success = True
-                                    print(f"成功打开备选摄像头 ID: {camera_id}")
-                                    break
-                                else:
-                                    print(f"备选摄像头 ID {camera_id} 无法读取帧")
-                                    self.cap.release()
-                            else:
-                                print(f"备选摄像头 ID {camera_id} 无法打开")
-                        except Exception as e:
-                            print(f"尝试摄像头 {camera_id} 时出错: {e}")
-                            if self.cap:
-                                self.cap.release()
-                        tried_camera_ids.append(camera_id)
-            
-            # 尝试3：直接使用设备路径打开摄像头
-            if not success:
-                device_paths = ['/dev/video0', '/dev/video1', '/dev/video2', '/dev/video4', '/dev/video6']
-                print(f"尝试使用设备路径方式打开摄像头: {device_paths}")
-                for dev_path in device_paths:
-                    try:
-                        print(f"尝试使用设备路径 {dev_path} 访问摄像头...")
-                        self.cap = cv2.VideoCapture(dev_path, camera_api_preference)
-                        if self.cap.isOpened():
-                            ret, test_frame = self.cap.read()
-                            if ret and test_frame is not None:
-                                # 获取此设备对应的索引，用于后续配置
-                                try:
-                                    index = int(dev_path.replace('/dev/video', ''))
-                                    self.camera_id = index
-                                except:
-                                    self.camera_id = dev_path
-                                    
-                                print(f"通过设备路径 {dev_path} 找到可用摄像头, 对应ID: {self.camera_id}")
-                                success = True
-                                break
-                            else:
-                                print(f"设备路径 {dev_path} 无法读取帧")
-                                self.cap.release()
-                        else:
-                            print(f"设备路径 {dev_path} 无法打开")
-                    except Exception as e:
-                        print(f"尝试设备路径 {dev_path} 失败: {e}")
-                        if self.cap:
-                            self.cap.release()
-                    tried_camera_ids.append(dev_path)
-                    
-            # 尝试4: 如果仍未成功，尝试一些常见的摄像头ID和不同的参数设置
-            if not success:
-                priority_camera_ids = [1, 4, 0, 2, 5, 6, 3]  # 优先尝试索引 1 和 4，因为已知它们可能可用
-                # 过滤掉已尝试过的ID
-                priority_camera_ids = [cam for cam in priority_camera_ids if cam not in tried_camera_ids]
-                
-                if priority_camera_ids:
-                    print(f"尝试常见摄像头ID（优先顺序）: {priority_camera_ids}")
-                    for camera_id in priority_camera_ids:
-                        for api in [camera_api_preference, cv2.CAP_ANY]:  # 尝试两种不同的API
-                            try:
-                                print(f"尝试打开摄像头 ID: {camera_id} 使用API: {api}...")
-                                self.cap = cv2.VideoCapture(camera_id, api)
-                                if self.cap.isOpened():
-                                    ret, test_frame = self.cap.read()
-                                    if ret and test_frame is not None:
-                                        self.camera_id = camera_id  # 更新为实际使用的摄像头ID
-                                        success = True
-                                        print(f"成功打开摄像头 ID: {camera_id} 使用API: {api}")
-                                        break
-                                    else:
-                                        print(f"摄像头 ID {camera_id} 使用API {api} 无法读取帧")
-                                        self.cap.release()
-                                else:
-                                    print(f"摄像头 ID {camera_id} 使用API {api} 无法打开")
-                            except Exception as e:
-                                print(f"尝试摄像头 {camera_id} 使用API {api} 失败: {e}")
-                                if self.cap:
-                                    self.cap.release()
-                        
-                        if success:
-                            break
-                        tried_camera_ids.append(camera_id)
-                        
-            if not success:
-                raise IOError(f"无法找到可用的摄像头，尝试过的ID: {tried_camera_ids}")
-            
-            # 优化摄像头设置
-            print("开始优化摄像头设置...")
-            self._optimize_camera_settings()
-            
-            # 测试摄像头实际帧率
-            measured_fps = self._test_camera_fps(self.cap, frames=15)
-            print(f"测量的实际摄像头帧率: {measured_fps:.1f} FPS")
+            # 打开摄像头：优先使用摄像头管理器共享的帧，避免与其他模块争用同一设备
+            if self.camera_manager is not None:
+                print(f"使用摄像头管理器提供的共享帧，视频源: {self.camera_manager.source_id}")
+                if not self.camera_manager.start():
+                    raise IOError(f"摄像头管理器 {self.camera_manager.source_id} 启动失败")
+                # 按检测帧率上限订阅，由摄像头管理器抽帧
+                self.camera_manager.register_consumer("yolo_detector", fps=DETECTION_MAX_FPS, with_queue=False)
+            else:
+                self._open_camera()
             
             print("摄像头打开并优化成功，开始初始化推理管线...")
             
             # 初始化异步所需要的帧
             for i in range(self.TPEs + 1):
-                ret, frame = self.cap.read()
+                ret, frame = self._read_frame()
                 if not ret:
                     raise IOError("无法读取摄像头帧")
                 self.pool.put(frame)
@@ -388,14 +197,50 @@ class Detector:
             self.cleanup()
             return False
 
+    def _open_camera(self):
+        """通过统一的摄像头发现服务打开摄像头（未提供摄像头管理器时使用）"""
+        self.cap, profile = get_camera_discovery().open(
+            preferred=self.camera_id,
+            fps=30,
+            api=cv2.CAP_V4L2,  # Linux上使用V4L2后端
+            fallback_resolutions=[(320, 240)]
+        )
+        if self.cap is None:
+            raise IOError("无法找到可用的摄像头")
+        self.camera_id = profile.device
+        print(f"摄像头配置: {profile.width}x{profile.height}@{profile.fps}fps, 格式: {profile.fourcc}")
+
+    def _camera_opened(self):
+        """摄像头（或摄像头管理器）是否可用"""
+        if self.camera_manager is not None:
+            return self.camera_manager.running
+        return bool(self.cap) and self.cap.isOpened()
+
+    def _read_frame(self):
+        """
+        读取一帧：有摄像头管理器时等待其共享的新帧，否则直接读取摄像头
+
+        Returns:
+            (是否成功, 帧图像)
+        """
+        if self.camera_manager is None:
+            return self.cap.read()
+        frame_ref = self.camera_manager.wait_for_frame(self._last_frame_seq, timeout=1.0, consumer_id="yolo_detector")
+        if frame_ref is None:
+            return False, None
+        with frame_ref:
+            self._last_frame_seq = frame_ref.seq
+            # 推理线程池异步持有帧，且显示时会在帧上绘制，需要独立副本
+            return True, frame_ref.copy()
+
     def process_frame(self):
         """处理帧数据"""
-        if not self.cap or not self.cap.isOpened() or not self.running:
+        if not self._camera_opened() or not self.running:
             return False
         
         try:
             # 读取新帧
-            ret, frame = self.cap.read()
+            ret, frame = self._read_frame()
             if not ret:
                 print("读取帧失败")
                 return False
@@ -513,7 +358,7 @@ class Detector:
             return False
             
         # 如果没有初始化，先初始化
-        if not self.cap or not self.pool:
+        if not self.pool or (self.camera_manager is None and not self.cap):
             if not self.initialize():
                 print("初始化检测器失败，无法启动")
                 return False
@@ -531,7 +376,7 @@ class Detector:
         initTime = time.time()
         frames_processed = 0
         
-        while self.running and self.cap and self.cap.isOpened():
+        while self.running and self._camera_opened():
             if not self.process_frame():
                 print("处理帧失败，检测循环中断")
                 break
@@ -569,6 +414,10 @@ class Detector:
         """清理资源"""
         self.running = False
         
+        # 注销共享帧消费者（摄像头管理器由其所有者负责停止）
+        if getattr(self, 'camera_manager', None) is not None:
+            self.camera_manager.unregister_consumer("yolo_detector")
+            
         # 释放摄像头
         if hasattr(self, 'cap') and self.cap is not None:
             try:
@@ -609,117 +458,6 @@ class Detector:
             "fps": float(self.fps)  # 添加fps信息
         }
     
-    def _test_camera_fps(self, cap, frames=10):
-        """测试摄像头实际帧率
-        
-        Args:
-            cap: 摄像头对象
-            frames: 测试帧数
-            
-        Returns:
-            float: 测量的帧率
-        """
-        if not cap or not cap.isOpened():
-            return 0
-            
-        # 丢弃前几帧以稳定摄像头
-        for _ in range(3):
-            cap.grab()
-            
-        # 测量获取指定数量帧所需的时间
-        start_time = time.time()
-        frames_read = 0
-        
-        for _ in range(frames):
-            ret, _ = cap.read()
-            if ret:
-                frames_read += 1
-        
-        end_time = time.time()
-        
-        elapsed_time = end_time - start_time
-        if elapsed_time > 0 and frames_read > 0:
-            fps = frames_read / elapsed_time
-            print(f"测量的实际摄像头帧率: {fps:.1f} FPS")
-            return fps
-        else:
-            return 0
-
-    def _optimize_camera_settings(self):
-        """优化摄像头设置以提高性能"""
-        if not self.cap or not self.cap.isOpened():
-            return False
-            
-        try:
-            # 设置缓冲区大小为1，减少延迟
-            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            
-            # 设置目标FPS为30
-            self.cap.set(cv2.CAP_PROP_FPS, 30)
-            
-            # 尝试不同的编码格式，优先使用MJPG（通常性能更好）
-            fourcc_options = ['MJPG', 'YUYV', 'RGB3']
-            best_format = None
-            best_fps = 0
-            
-            for fourcc_code in fourcc_options:
-                try:
-                    fourcc = cv2.VideoWriter_fourcc(*fourcc_code)
-                    self.cap.set(cv2.CAP_PROP_FOURCC, fourcc)
-                    # 读取一帧测试格式是否生效
-                    ret, test = self.cap.read()
-                    if ret:
-                        # 测试这个格式下的帧率
-                        test_fps = self._test_camera_fps(self.cap, frames=5)
-                        print(f"{fourcc_code} 格式下测得帧率: {test_fps:.1f} FPS")
-                        
-                        if test_fps > best_fps:
-                            best_fps = test_fps
-                            best_format = fourcc_code
-                except Exception as e:
-                    print(f"设置 {fourcc_code} 格式失败: {e}")
-            
-            # 设置找到的最佳格式
-            if best_format:
-                print(f"选择最佳格式: {best_format} 帧率: {best_fps:.1f} FPS")
-                fourcc = cv2.VideoWriter_fourcc(*best_format)
-                self.cap.set(cv2.CAP_PROP_FOURCC, fourcc)
-            
-            # 尝试不同的分辨率
-            resolutions_to_try = [(640, 480), (800, 600), (1280, 720)]
-            for width, height in resolutions_to_try:
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-                
-                # 验证设置是否生效
-                actual_width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-                actual_height = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-                print(f"尝试设置分辨率 {width}x{height}, 实际: {actual_width}x{actual_height}")
-                
-                # 测试当前分辨率下的帧率，如果帧率足够高就保留这个分辨率
-                if abs(actual_width - width) < 30 and abs(actual_height - height) < 30:
-                    fps = self._test_camera_fps(self.cap, frames=5)
-                    if fps >= 15:  # 如果帧率超过15fps就可以使用这个分辨率
-                        print(f"选择分辨率 {width}x{height} 帧率足够")
-                        break
-            
-            # 打印最终的摄像头配置
-            final_width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-            final_height = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-            final_fps = self.cap.get(cv2.CAP_PROP_FPS)
-            final_format = int(self.cap.get(cv2.CAP_PROP_FOURCC))
-            
-            try:
-                format_chars = "".join([chr((int(final_format) >> (8 * i)) & 0xFF) for i in range(4)])
-                print(f"摄像头最终配置: {final_width}x{final_height}@{final_fps}fps, 格式: {format_chars}")
-            except:
-                print(f"摄像头最终配置: {final_width}x{final_height}@{final_fps}fps")
-                
-            return True
-        except Exception as e:
-            print(f"优化摄像头设置失败: {e}")
-            return False
-
     def __del__(self):
         """析构函数，确保资源被释放"""
         self.cleanup()
@@ -34,6 +34,22 @@ except ImportError as e:
     print(f"警告：视频状态API路由模块导入失败: {e}")
     register_video_status_routes = None
 
+# 尝试导入原始视频流路由
+try:
+    from modules.routes.raw_video import register_raw_video_routes
+    print("原始视频流API路由模块导入成功")
+except ImportError as e:
+    print(f"警告：原始视频流API路由模块导入失败: {e}")
+    register_raw_video_routes = None
+
+# 尝试导入标注视频流路由
+try:
+    from modules.routes.annotated_video import register_annotated_video_routes
+    print("标注视频流API路由模块导入成功")
+except ImportError as e:
+    print(f"警告：标注视频流API路由模块导入失败: {e}")
+    register_annotated_video_routes = None
+
 # 导入情绪检测模块
 try:
     from Emotion_Detector.EmotionDetector_RKNN import EmotionDetectorRKNN
@@ -54,14 +70,21 @@ def create_services_context() -> AppContext:
     init_database()
     print("数据库初始化完成")
     
+    # 选择JPEG编码后端（'auto' 时做一次简短的基准测试），之后所有编码点使用最快的实现
+    from modules.jpeg_codec import get_jpeg_encoder
+    print(f"JPEG编码后端: {get_jpeg_encoder().name}")
+    
     # 初始化摄像头管理器（全局单例）
     from modules.camera_manager import get_camera_manager
+    from config import CAMERA_SOURCE, CAMERA_REPLAY_REALTIME
     camera_manager = get_camera_manager(
         init=True,  # 自动初始化并启动
+        source=CAMERA_SOURCE,
         camera_id=0, 
         frame_width=640,
         frame_height=480,
-        fps_target=30
+        fps_target=30,
+        replay_realtime=CAMERA_REPLAY_REALTIME
     )
     print("摄像头管理器初始化成功")
     
@@ -362,6 +385,20 @@ def main():
         except Exception as e:
             print(f"注册视频状态API路由失败: {str(e)}")
     
+    if register_raw_video_routes and ctx.video_stream is not None:
+        try:
+            register_raw_video_routes(webserver.app, ctx.video_stream)
+            print("原始视频流API路由已注册")
+        except Exception as e:
+            print(f"注册原始视频流API路由失败: {str(e)}")
+    
+    if register_annotated_video_routes and ctx.posture_monitor is not None:
+        try:
+            register_annotated_video_routes(webserver.app)
+            print("标注视频流API路由已注册")
+        except Exception as e:
+            print(f"注册标注视频流API路由失败: {str(e)}")
+    
     print(f"\n========== 启动Web服务器 ==========")
     print(f"服务器地址: http://{OPEN_HOST}:{OPEN_PORT}")
     print(f"API文档: http://{OPEN_HOST}:{OPEN_PORT}/docs")
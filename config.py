@@ -46,3 +46,70 @@ BAD_POSTURE_THRESHOLD = 75.0  # 不良坐姿的阈值
 
 # 展示版视频流控制开关，True为使用静态图片
 USE_STATIC_VIDEO_STREAM = False
+
+# 模拟摄像头配置（找不到物理摄像头时使用的合成帧源）
+SYNTHETIC_CAMERA_PATTERN = 'shapes'  # 'gradient' 仅渐变背景，'shapes' 叠加运动图形
+SYNTHETIC_CAMERA_NOISE = 0  # 噪声幅度（0-127），0表示不加噪声
+
+# 摄像头帧源配置
+# None 使用物理摄像头；'synthetic' 使用合成画面；
+# 也可以填视频文件（MP4/MJPEG）或图片目录路径（如 'static/posture_images'）回放录像
+CAMERA_SOURCE = None
+CAMERA_REPLAY_REALTIME = True  # True按原始时间节奏回放，False尽可能快地回放（用于压测）
+CAMERA_DISCOVERY_CACHE = 'camera_discovery_cache.json'  # 摄像头探测结果缓存文件（相对项目根目录）
+# 摄像头输出MJPG时直接保留其压缩的JPEG数据：原始视频流原样转发，分析模块需要时才解码
+CAMERA_MJPEG_PASSTHROUGH = True
+# 原尺寸视频流通道的JPEG质量不低于该值时直接转发摄像头的JPEG；更低质量的档位（如慢速客户端降档）从解码帧重新编码
+STREAM_PASSTHROUGH_MIN_QUALITY = 80
+# MJPEG视频流同时观看的客户端上限（所有视频流合计），0表示不限制
+MJPEG_MAX_VIEWERS = 8
+# 视频流处理器每个帧队列（姿势/情绪）可占用的内存预算（MB），队列深度按帧大小由预算换算
+VIDEO_STREAM_QUEUE_BUDGET_MB = 4
+# /ws/video 二进制视频通道每个客户端默认允许的未确认帧数（客户端可在连接参数中调整）
+WS_VIDEO_MAX_IN_FLIGHT = 2
+# 客户端可设置的未确认帧数上限，超出时按上限处理，客户端无法关闭流量控制
+WS_VIDEO_MAX_IN_FLIGHT_LIMIT = 8
+# 已发送帧超过该时间（秒）仍未确认时视为丢失，移出未确认列表，避免客户端漏发确认后视频永久停住
+WS_VIDEO_ACK_TIMEOUT = 3.0
+# 视频流规格：按设备类型（或请求参数 profile）选择，尺寸/质量/帧率均为上限，编码结果由同规格的客户端共享
+STREAM_PROFILES = {
+    'mobile': {'size': (320, 240), 'quality': 60, 'fps': 10},
+    'pc': {'size': (640, 480), 'quality': 85, 'fps': 25},
+}
+# JPEG编码后端：'auto' 启动时基准测试选最快，或 'cv2' / 'turbojpeg'（PyTurboJPEG）/ 'simplejpeg'
+JPEG_ENCODER = 'auto'
+# libjpeg-turbo后端使用快速（低精度）DCT
+JPEG_FAST_DCT = True
+# 色度抽样：'444' / '422' / '420'
+JPEG_SUBSAMPLING = '420'
+
+# 姿势分析：姿势（Pose）与面部网格（FaceMesh）两个模型在各自的工作线程上并行推理，False时依次推理
+POSTURE_PARALLEL_INFERENCE = True
+# 姿势分析推理方式：'thread' 在本进程内推理；'process' 两个模型各在一个独立进程中推理，
+# 帧通过共享内存帧环传递，模型推理不再与Web服务争用本进程的GIL
+POSTURE_INFERENCE_MODE = 'thread'
+# 'process' 模式下共享内存帧环的槽位数
+POSTURE_SHARED_RING_SLOTS = 4
+
+# 面部网格只处理由姿势关键点（鼻子/眼睛/耳朵/嘴角）估计的面部区域，而非整幅画面
+FACE_ROI_ENABLED = True
+# 面部区域边长相对面部关键点跨度的倍数（覆盖额头、下巴和相邻帧间的头部移动）
+FACE_ROI_SCALE = 2.2
+# 面部区域的时间平滑：新位置的权重（0-1），越小越平稳
+FACE_ROI_SMOOTHING = 0.6
+# 面部区域的最小边长（像素）
+FACE_ROI_MIN_SIZE = 112
+# 面部区域超过画面短边的该比例时不裁剪（面部离镜头很近，裁剪收益不大）
+FACE_ROI_MAX_FRACTION = 0.8
+
+# 运动门控：缩小灰度图与上一次推理时的画面平均绝对差低于阈值时沿用上一次的姿势/情绪结果
+MOTION_GATE_ENABLED = True
+# 比较用灰度图的尺寸 (宽, 高)
+MOTION_GATE_SIZE = (64, 48)
+# 平均绝对差阈值（灰度级 0-255），低于该值视为画面没有变化
+MOTION_GATE_THRESHOLD = 2.0
+# 沿用结果的最长时间（秒），到期后即使画面不变也重新推理，0表示不限制
+MOTION_GATE_MAX_REUSE_S = 2.0
+
+# 目标检测从摄像头管理器取帧的帧率上限（与串口自动发送的50ms间隔匹配），摄像头帧率更高时抽帧
+DETECTION_MAX_FPS = 20
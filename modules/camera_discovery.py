@@ -0,0 +1,382 @@
+"""
+摄像头发现服务 - 统一的摄像头探测、参数选择与结果缓存
+
+首次启动时逐个探测设备，选出可用设备及帧率最高的编码格式/分辨率，
+把结果按设备身份（sysfs中的设备名与USB端口路径）写入缓存文件；
+之后启动直接按缓存参数打开设备，只做一次读帧验证，跳过多帧测速。
+"""
+import os
+import sys
+import glob
+import json
+import time
+import threading
+import logging
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import CAMERA_DISCOVERY_CACHE
+except ImportError:
+    CAMERA_DISCOVERY_CACHE = 'camera_discovery_cache.json'
+
+# 项目根目录，缓存文件相对路径以此为基准
+_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# 默认尝试的编码格式，MJPG在USB摄像头上通常帧率最高
+DEFAULT_FOURCC_OPTIONS = ('MJPG', 'YUYV')
+
+Device = Union[int, str]
+
+
+@dataclass
+class CameraProfile:
+    """一次成功探测得到的摄像头配置"""
+    device: Device           # 设备索引或路径
+    identity: str            # 设备身份（设备名@USB端口），用于判断缓存是否仍对应同一设备
+    api: int                 # OpenCV后端
+    fourcc: Optional[str]    # 编码格式，None表示保持设备默认
+    width: int
+    height: int
+    fps: float               # 探测时实测帧率
+    probed_at: float = 0.0   # 探测时间（time.time()）
+    request: Optional[dict] = None  # 探测时的请求参数，请求不同时缓存不适用
+
+
+class CameraDiscovery:
+    """
+    摄像头发现服务
+
+    所有需要直接打开摄像头的模块都通过 open() 获取设备，探测逻辑只有这一份。
+    """
+    def __init__(self, cache_path: str = CAMERA_DISCOVERY_CACHE, max_index: int = 10):
+        """
+        Args:
+            cache_path: 缓存文件路径（相对路径以项目根目录为基准）
+            max_index: 无法枚举 /dev/video* 时探测的最大设备索引
+        """
+        self.cache_path = cache_path if os.path.isabs(cache_path) else os.path.join(_ROOT_DIR, cache_path)
+        self.max_index = max_index
+        self._lock = threading.Lock()
+        self._cache: Dict[str, dict] = {}
+        self._last_identity: Optional[str] = None
+        self._load_cache()
+
+        self.stats = {
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'full_probes': 0,
+            'last_open_ms': 0.0
+        }
+
+    @staticmethod
+    def default_api() -> int:
+        """Linux上优先使用V4L2后端，其他平台交给OpenCV自动选择"""
+        if sys.platform.startswith('linux') and hasattr(cv2, 'CAP_V4L2'):
+            return cv2.CAP_V4L2
+        return cv2.CAP_ANY
+
+    # ---------- 缓存 ----------
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._cache = data.get('devices', {})
+            self._last_identity = data.get('last')
+            logger.info(f"已加载摄像头发现缓存: {len(self._cache)} 个设备")
+        except FileNotFoundError:
+            self._cache = {}
+        except Exception as e:
+            logger.warning(f"读取摄像头发现缓存失败，将重新探测: {e}")
+            self._cache = {}
+
+    def _save_cache(self):
+        try:
+            tmp_path = self.cache_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'devices': self._cache, 'last': self._last_identity}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"写入摄像头发现缓存失败: {e}")
+
+    def invalidate(self, identity: Optional[str] = None):
+        """清除指定设备（或全部）的缓存，下次打开时重新探测"""
+        with self._lock:
+            if identity is None:
+                self._cache.clear()
+                self._last_identity = None
+            else:
+                self._cache.pop(identity, None)
+                if self._last_identity == identity:
+                    self._last_identity = None
+            self._save_cache()
+
+    def get_cached_profiles(self) -> List[CameraProfile]:
+        """返回缓存中的所有设备配置"""
+        return [CameraProfile(**entry) for entry in self._cache.values()]
+
+    # ---------- 设备枚举 ----------
+
+    @staticmethod
+    def _device_index(device: Device) -> Optional[int]:
+        if isinstance(device, int):
+            return device
+        name = os.path.basename(str(device))
+        if name.startswith('video') and name[5:].isdigit():
+            return int(name[5:])
+        return None
+
+    @classmethod
+    def device_identity(cls, device: Device) -> str:
+        """
+        设备身份：sysfs中的设备名加上USB端口路径
+
+        同一个摄像头换了 /dev/videoN 编号或另一个摄像头占用了原编号时都能识别出来；
+        无法读取sysfs时退化为设备号本身。
+        """
+        index = cls._device_index(device)
+        if index is not None:
+            sys_dir = f"/sys/class/video4linux/video{index}"
+            try:
+                with open(os.path.join(sys_dir, 'name'), 'r', encoding='utf-8') as f:
+                    name = f.read().strip()
+                port = os.path.basename(os.path.realpath(os.path.join(sys_dir, 'device')))
+                return f"{name}@{port}"
+            except OSError:
+                pass
+        return f"device:{device}"
+
+    def _candidates(self, preferred: Optional[Device]) -> List[Device]:
+        """待探测设备列表：指定设备优先，其次是系统中存在的 /dev/video*"""
+        candidates: List[Device] = []
+        if preferred is not None:
+            candidates.append(preferred)
+        indices = sorted(
+            self._device_index(path) for path in glob.glob('/dev/video*')
+            if self._device_index(path) is not None
+        )
+        if not indices:
+            indices = list(range(self.max_index))
+        for index in indices:
+            if index not in candidates and f"/dev/video{index}" not in candidates:
+                candidates.append(index)
+        return candidates
+
+    # ---------- 打开与探测 ----------
+
+    @staticmethod
+    def _apply_settings(cap, fourcc: Optional[str], width: int, height: int, fps: float, buffer_size: int):
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        if fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        cap.set(cv2.CAP_PROP_FPS, fps)
+
+    @staticmethod
+    def _read_ok(cap) -> bool:
+        ret, frame = cap.read()
+        return bool(ret) and frame is not None and frame.size > 0
+
+    @staticmethod
+    def measure_fps(cap, frames: int = 10, warmup: int = 3) -> float:
+        """实测帧率：丢弃几帧预热后计时读取指定帧数"""
+        for _ in range(warmup):
+            cap.grab()
+        start = time.time()
+        read = 0
+        for _ in range(frames):
+            if cap.grab():
+                read += 1
+        elapsed = time.time() - start
+        return read / elapsed if elapsed > 0 and read > 0 else 0.0
+
+    @staticmethod
+    def _actual_fourcc(cap) -> Optional[str]:
+        code = int(cap.get(cv2.CAP_PROP_FOURCC))
+        if code <= 0:
+            return None
+        chars = "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+        return chars if chars.isprintable() else None
+
+    @staticmethod
+    def _request_key(api: int, width: int, height: int, fps: float, fourcc_options: Sequence[str],
+                     fallback_resolutions: Sequence[Tuple[int, int]], min_fps: float) -> dict:
+        """影响探测结果的请求参数（与JSON往返后的形式一致，便于直接比较）"""
+        return {
+            'api': int(api),
+            'width': int(width),
+            'height': int(height),
+            'fps': float(fps),
+            'fourcc_options': list(fourcc_options),
+            'fallback_resolutions': [list(r) for r in fallback_resolutions],
+            'min_fps': float(min_fps)
+        }
+
+    def _open_cached(self, identity: str, entry: dict, buffer_size: int):
+        """按缓存参数打开设备并做一次读帧验证"""
+        profile = CameraProfile(**entry)
+        if self.device_identity(profile.device) != identity:
+            logger.info(f"缓存的摄像头 {identity} 已不在 {profile.device}，需要重新探测")
+            return None, None
+        cap = cv2.VideoCapture(profile.device, profile.api)
+        if not cap.isOpened():
+            cap.release()
+            return None, None
+        self._apply_settings(cap, profile.fourcc, profile.width, profile.height, profile.fps, buffer_size)
+        if not self._read_ok(cap):
+            cap.release()
+            return None, None
+        return cap, profile
+
+    def _probe_device(self, device: Device, api: int, width: int, height: int, fps: float,
+                      fourcc_options: Sequence[str], fallback_resolutions: Sequence[Tuple[int, int]],
+                      min_fps: float, buffer_size: int):
+        """完整探测一个设备：验证可读，选出帧率最高的编码格式，帧率不足时尝试备选分辨率"""
+        try:
+            cap = cv2.VideoCapture(device, api)
+        except Exception as e:
+            logger.debug(f"打开摄像头 {device} 出错: {e}")
+            return None, None
+        if not cap.isOpened():
+            cap.release()
+            return None, None
+        if not self._read_ok(cap):
+            logger.info(f"摄像头 {device} 打开成功但无法读取帧")
+            cap.release()
+            return None, None
+
+        best_fourcc, best_fps = None, -1.0
+        for fourcc in fourcc_options:
+            try:
+                self._apply_settings(cap, fourcc, width, height, fps, buffer_size)
+                if not self._read_ok(cap):
+                    continue
+                measured = self.measure_fps(cap)
+                logger.info(f"摄像头 {device} {fourcc} 格式下实测帧率: {measured:.1f} FPS")
+                if measured > best_fps:
+                    best_fourcc, best_fps = fourcc, measured
+            except Exception as e:
+                logger.debug(f"摄像头 {device} 设置 {fourcc} 格式失败: {e}")
+
+        resolutions = [(width, height)] + [r for r in fallback_resolutions if r != (width, height)]
+        chosen = resolutions[0]
+        for i, res in enumerate(resolutions):
+            self._apply_settings(cap, best_fourcc, res[0], res[1], fps, buffer_size)
+            if not self._read_ok(cap):
+                continue
+            chosen = res
+            # 期望分辨率已在编码格式测试中测过速
+            if i > 0:
+                best_fps = self.measure_fps(cap)
+            if best_fps >= min_fps:
+                break
+        self._apply_settings(cap, best_fourcc, chosen[0], chosen[1], fps, buffer_size)
+        if not self._read_ok(cap):
+            cap.release()
+            return None, None
+
+        profile = CameraProfile(
+            device=device,
+            identity=self.device_identity(device),
+            api=api,
+            fourcc=best_fourcc or self._actual_fourcc(cap),
+            width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or chosen[0],
+            height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or chosen[1],
+            fps=round(max(best_fps, 0.0), 1),
+            probed_at=time.time()
+        )
+        return cap, profile
+
+    def open(self, preferred: Optional[Device] = None, width: int = 640, height: int = 480, fps: float = 30,
+             api: Optional[int] = None, fourcc_options: Sequence[str] = DEFAULT_FOURCC_OPTIONS,
+             fallback_resolutions: Sequence[Tuple[int, int]] = (), min_fps: float = 15,
+             buffer_size: int = 1, exclude: Iterable[Device] = ()):
+        """
+        打开一个可用摄像头
+
+        先按缓存参数快速打开（指定设备优先，其次上次使用的设备），失败时才完整探测，
+        探测结果写回缓存。缓存只在请求参数（分辨率、帧率、编码格式、后端等）与探测时一致时使用。
+
+        Args:
+            preferred: 优先使用的设备索引或路径
+            width: 期望宽度
+            height: 期望高度
+            fps: 期望帧率
+            api: OpenCV后端，默认Linux使用V4L2
+            fourcc_options: 探测时依次尝试的编码格式
+            fallback_resolutions: 期望分辨率帧率不足min_fps时依次尝试的备选分辨率
+            min_fps: 可接受的最低实测帧率
+            buffer_size: 驱动缓冲区帧数
+            exclude: 不参与探测的设备（如已被其他摄像头管理器占用）
+
+        Returns:
+            (cv2.VideoCapture, CameraProfile)；找不到可用设备时返回 (None, None)
+        """
+        api = self.default_api() if api is None else api
+        excluded = {str(d) for d in exclude}
+        request = self._request_key(api, width, height, fps, fourcc_options, fallback_resolutions, min_fps)
+        start = time.time()
+
+        with self._lock:
+            # 1. 缓存快速路径：只做一次读帧验证
+            cached_order = []
+            if preferred is not None:
+                cached_order += [i for i, e in self._cache.items() if str(e['device']) == str(preferred)]
+            if preferred is None and self._last_identity in self._cache:
+                cached_order.append(self._last_identity)
+            for identity in cached_order:
+                entry = self._cache[identity]
+                if str(entry['device']) in excluded:
+                    continue
+                if entry.get('request') != request:
+                    logger.info(f"摄像头 {identity} 的缓存配置与本次请求参数不同，重新探测")
+                    continue
+                cap, profile = self._open_cached(identity, entry, buffer_size)
+                if cap is not None:
+                    self.stats['cache_hits'] += 1
+                    self.stats['last_open_ms'] = round((time.time() - start) * 1000, 1)
+                    self._last_identity = identity
+                    logger.info(f"按缓存配置打开摄像头 {profile.device}（{identity}），"
+                                f"{profile.width}x{profile.height} {profile.fourcc}，耗时 {self.stats['last_open_ms']}ms")
+                    return cap, profile
+                self._cache.pop(identity, None)
+            self.stats['cache_misses'] += 1
+
+            # 2. 完整探测
+            self.stats['full_probes'] += 1
+            for device in self._candidates(preferred):
+                if str(device) in excluded:
+                    continue
+                logger.info(f"探测摄像头: {device}")
+                cap, profile = self._probe_device(device, api, width, height, fps, fourcc_options,
+                                                  fallback_resolutions, min_fps, buffer_size)
+                if cap is None:
+                    continue
+                profile.request = request
+                self._cache[profile.identity] = asdict(profile)
+                self._last_identity = profile.identity
+                self._save_cache()
+                self.stats['last_open_ms'] = round((time.time() - start) * 1000, 1)
+                logger.info(f"摄像头探测完成: {profile}，耗时 {self.stats['last_open_ms']}ms")
+                return cap, profile
+
+        logger.warning("未找到可用摄像头")
+        return None, None
+
+
+_discovery_instance: Optional[CameraDiscovery] = None
+_discovery_lock = threading.Lock()
+
+def get_camera_discovery() -> CameraDiscovery:
+    """获取全局摄像头发现服务"""
+    global _discovery_instance
+    with _discovery_lock:
+        if _discovery_instance is None:
+            _discovery_instance = CameraDiscovery()
+        return _discovery_instance
@@ -6,11 +6,29 @@ import threading
 import time
 import numpy as np
 import queue
-from typing import Dict, List, Optional, Callable
+from collections import deque
+from typing import Dict, List, Optional, Callable, NamedTuple, Tuple
 import logging
 import os
+from dataclasses import asdict
 import sys
 
+from modules.frame_ring import FrameRing, FrameRef
+from modules.camera_sources import SyntheticCameraSource, ReplayCameraSource
+from modules.camera_discovery import CameraProfile, get_camera_discovery
+from modules.jpeg_codec import encode_jpeg
+
+try:
+    from config import SYNTHETIC_CAMERA_PATTERN, SYNTHETIC_CAMERA_NOISE
+except ImportError:
+    SYNTHETIC_CAMERA_PATTERN = 'shapes'
+    SYNTHETIC_CAMERA_NOISE = 0
+
+try:
+    from config import CAMERA_MJPEG_PASSTHROUGH
+except ImportError:
+    CAMERA_MJPEG_PASSTHROUGH = True
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -21,6 +39,112 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 订阅规格支持的色彩空间及对应的BGR转换码（None表示保持BGR）
+COLOUR_CONVERSIONS = {
+    'bgr': None,
+    'rgb': cv2.COLOR_BGR2RGB,
+    'gray': cv2.COLOR_BGR2GRAY,
+}
+
+class FrameSpec(NamedTuple):
+    """
+    消费者订阅规格
+    
+    Attributes:
+        fps: 投递帧率上限，None表示每帧都投递
+        size: 输出尺寸 (宽, 高)，None表示保持摄像头分辨率
+        colour: 色彩空间，'bgr' / 'rgb' / 'gray'
+    """
+    fps: Optional[float] = None
+    size: Optional[Tuple[int, int]] = None
+    colour: str = 'bgr'
+    
+    @property
+    def variant_key(self) -> Tuple[Optional[Tuple[int, int]], str]:
+        """派生帧的共享键：尺寸与色彩空间相同的订阅共享同一份派生帧"""
+        return (self.size, self.colour)
+
+class JpegFrame(NamedTuple):
+    """
+    一帧JPEG编码数据，与环形缓冲区中的解码帧共用帧序号
+    
+    Attributes:
+        seq: 帧序号
+        capture_time: 捕获时刻（time.monotonic()）
+        data: JPEG字节
+        width: 图像宽度
+        height: 图像高度
+        source_id: 视频源标识
+        passthrough: True表示摄像头原始压缩数据（未经解码/重新编码）
+    """
+    seq: int
+    capture_time: float
+    data: bytes
+    width: int
+    height: int
+    source_id: str = ''
+    passthrough: bool = False
+    
+    def age(self) -> float:
+        """距捕获时刻经过的秒数"""
+        return time.monotonic() - self.capture_time
+
+class ConsumerStats:
+    """单个消费者的投递统计：投递/丢弃/消费计数与捕获到消费的延迟"""
+    def __init__(self, window_size: int = 100):
+        self.delivered = 0   # 已投递帧数
+        self.dropped = 0     # 因队列满被丢弃的帧数
+        self.decimated = 0   # 按订阅帧率跳过的帧数
+        self.consumed = 0    # 消费者实际取出的帧数
+        self.last_seq = 0    # 最近一次取出的帧序号
+        self.latencies = deque(maxlen=window_size)  # 捕获到取出的延迟（秒）
+    
+    def record_consume(self, ref: FrameRef):
+        """记录一次消费"""
+        self.consumed += 1
+        self.last_seq = ref.seq
+        self.latencies.append(ref.age())
+    
+    def snapshot(self) -> dict:
+        """导出统计快照（延迟单位为毫秒）"""
+        latencies = sorted(self.latencies)
+        avg_ms = sum(latencies) / len(latencies) * 1000 if latencies else 0
+        p95_ms = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000 if latencies else 0
+        return {
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "decimated": self.decimated,
+            "consumed": self.consumed,
+            "last_seq": self.last_seq,
+            "latency_ms_avg": round(avg_ms, 2),
+            "latency_ms_p95": round(p95_ms, 2)
+        }
+
+class FrameQueue(queue.Queue):
+    """
+    消费者帧队列，元素为FrameRef
+    
+    在消费者取出帧时记录捕获到消费的延迟，丢弃旧帧时计入丢帧统计。
+    """
+    def __init__(self, maxsize: int, stats: ConsumerStats):
+        super().__init__(maxsize=maxsize)
+        self.stats = stats
+    
+    def _get(self):
+        ref = super()._get()
+        self.stats.record_consume(ref)
+        return ref
+    
+    def drop_oldest(self) -> Optional[FrameRef]:
+        """丢弃队首最旧的帧（不计入消费），返回被丢弃的FrameRef"""
+        with self.mutex:
+            if not self._qsize():
+                return None
+            ref = self.queue.popleft()
+            self.stats.dropped += 1
+            self.not_full.notify()
+            return ref
+
 class CameraManager:
     """
     中心化摄像头管理器
@@ -30,7 +154,12 @@ class CameraManager:
                 camera_id: int = 0, 
                 frame_width: int = 640, 
                 frame_height: int = 480,
-                fps_target: int = 30):
+                fps_target: int = 30,
+                ring_size: int = 8,
+                source: Optional[str] = None,
+                replay_realtime: bool = True,
+                replay_loop: bool = True,
+                mjpeg_passthrough: bool = CAMERA_MJPEG_PASSTHROUGH):
         """
         初始化摄像头管理器
         
@@ -39,8 +168,19 @@ class CameraManager:
             frame_width: 视频帧宽度
             frame_height: 视频帧高度
             fps_target: 目标帧率
+            ring_size: 帧环形缓冲区的初始槽位数
+            source: 替代物理摄像头的帧源：'synthetic' 使用合成画面，
+                    视频文件或图片目录路径则回放录像；None使用物理摄像头
+            replay_realtime: 回放时是否按原始时间节奏，False为尽可能快地回放
+            replay_loop: 回放结束后是否从头循环
+            mjpeg_passthrough: 摄像头输出MJPG时保留原始JPEG数据，原始视频流直接转发，
+                               解码推迟到有消费者需要图像时
         """
         self.camera_id = camera_id
+        self.source = source
+        self.replay_realtime = replay_realtime
+        self.replay_loop = replay_loop
+        self.source_id = str(source if source is not None else camera_id)
         self.frame_width = frame_width
         self.frame_height = frame_height
         self.fps_target = fps_target
@@ -49,7 +189,6 @@ class CameraManager:
         # 摄像头实例
         self.cap = None
         self.running = False
-        self.last_frame = None
         self.frame_count = 0
         self.last_frame_time = 0
         self.fps = 0
@@ -57,12 +196,56 @@ class CameraManager:
         # 线程锁和队列
         self.lock = threading.Lock()
         
-        # 消费者注册表 {consumer_id: queue}
-        self.consumers: Dict[str, queue.Queue] = {}
+        # 帧环形缓冲区：每帧只写入一次，消费者借用只读视图
+        self.ring = FrameRing(capacity=ring_size, frame_shape=(frame_height, frame_width, 3))
+        
+        # 新帧到达通知，供wait_for_frame阻塞等待
+        self.frame_ready = threading.Condition()
+        
+        # 消费者注册表 {consumer_id: queue}，队列中的元素为FrameRef
+        self.consumers: Dict[str, FrameQueue] = {}
         
         # 消费者回调函数 {consumer_id: callback_function}
         self.callbacks: Dict[str, Callable] = {}
         
+        # 消费者投递统计 {consumer_id: ConsumerStats}
+        self.consumer_stats: Dict[str, ConsumerStats] = {}
+        
+        # 消费者订阅规格 {consumer_id: FrameSpec}，及按帧率抽帧的下次投递时刻
+        self.consumer_specs: Dict[str, FrameSpec] = {}
+        self._next_due: Dict[str, float] = {}
+        
+        # 派生帧缓冲区 {(尺寸, 色彩空间): FrameRing}，每种派生帧每个源帧只计算一次
+        self.variant_rings: Dict[Tuple, FrameRing] = {}
+        self.variant_lock = threading.Lock()
+        # 派生帧缓存命中统计 {(尺寸, 色彩空间): {'hits': 命中次数, 'misses': 计算次数}}
+        self.variant_stats: Dict[Tuple, Dict[str, int]] = {}
+        
+        # 帧序号：解码帧与JPEG帧共用同一序列
+        self._seq = 0
+        
+        # MJPEG直通：摄像头压缩的最新一帧JPEG，解码帧按需生成
+        self.mjpeg_passthrough = mjpeg_passthrough
+        self.passthrough_active = False
+        self.passthrough_size = (frame_width, frame_height)
+        self._jpeg_latest: Optional[JpegFrame] = None
+        self._decode_lock = threading.Lock()
+        # 非直通模式下按质量缓存最新一帧的编码结果 {质量: JpegFrame}，换帧时清空；
+        # 快照与不同质量的视频流通道各自命中，不会互相挤掉
+        self._jpeg_encoded: Dict[int, JpegFrame] = {}
+        self._jpeg_encoded_seq = 0
+        self._encode_lock = threading.Lock()
+        self._encode_quality_locks: Dict[int, threading.Lock] = {}  # 每种质量一把编码锁
+        self.jpeg_stats = {
+            'passthrough_frames': 0,   # 摄像头直接输出的JPEG帧数
+            'served_passthrough': 0,   # 未经重新编码直接发送的帧数
+            'eager_decodes': 0,        # 为队列/回调消费者立即解码的帧数
+            'lazy_decodes': 0,         # 消费者请求图像时才解码的帧数
+            'decode_errors': 0,
+            'encoded_frames': 0,       # 非直通帧的JPEG编码次数
+            'encode_cache_hits': 0     # 同一帧、同一质量直接使用已有编码结果的次数
+        }
+        
         # 错误恢复相关
         self.reconnect_count = 0
         self.max_reconnects = 20  # 增加最大重连次数
@@ -71,19 +254,21 @@ class CameraManager:
         self.camera_open_retry_count = 0
         self.max_open_retries = 5
         
-        # 可用视频源列表
-        self.video_sources = [0, 1, 2, 3, "/dev/video0", "/dev/video1", "/dev/video2", "/dev/video3"]
+        # 摄像头发现服务返回的设备配置
+        self.camera_profile: Optional[CameraProfile] = None
         
         # 添加模拟摄像头选项（当真实摄像头不可用时）
         self.use_dummy_camera = False
-        self.dummy_frame_index = 0
-        self.dummy_frames = []
+        self.synthetic_source: Optional[SyntheticCameraSource] = None
         
         # 初始化摄像头
         self._init_camera()
         
     def _init_camera(self):
         """初始化摄像头，如果失败则尝试其他视频源"""
+        if self.source is not None:
+            return self._init_source()
+        
         # 重置模拟摄像头标志
         self.use_dummy_camera = False
         
@@ -92,80 +277,32 @@ class CameraManager:
             self.cap.release()
             time.sleep(0.5)  # 等待资源释放
         
-        # 尝试打开指定的摄像头
+        # 通过摄像头发现服务打开设备：有缓存时按缓存配置快速打开，否则完整探测
+        # 其他摄像头管理器已占用的设备不参与探测，避免争用
         try:
-            logger.info(f"尝试打开摄像头: {self.camera_id}")
-            self.cap = cv2.VideoCapture(self.camera_id)
-            
-            # 设置摄像头参数
-            if self.cap.isOpened():
-                # 设置分辨率
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_width)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_height)
-                
-                # 设置帧率
-                self.cap.set(cv2.CAP_PROP_FPS, self.fps_target)
-                
-                # 设置缓冲区大小
-                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                
-                # 尝试设置编码格式为MJPG（如果支持）
-                self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
-                
-                # 读取一帧测试摄像头是否正常工作
-                ret, test_frame = self.cap.read()
-                if not ret or test_frame is None or test_frame.size == 0:
-                    logger.warning(f"摄像头 {self.camera_id} 虽然打开但无法读取帧")
-                    self.cap.release()
-                else:
-                    logger.info(f"摄像头 {self.camera_id} 初始化成功，分辨率: {self.frame_width}x{self.frame_height}")
-                    self.camera_open_retry_count = 0
-                    return True
-                
+            in_use = [m.camera_id for m in list_camera_managers().values()
+                      if m is not self and m.cap is not None]
+            cap, profile = get_camera_discovery().open(
+                preferred=self.camera_id,
+                width=self.frame_width,
+                height=self.frame_height,
+                fps=self.fps_target,
+                exclude=in_use
+            )
+            if cap is not None:
+                self.cap = cap
+                self.camera_id = profile.device
+                self.camera_profile = profile
+                self.camera_open_retry_count = 0
+                self.passthrough_active = False
+                if self.mjpeg_passthrough and profile.fourcc == 'MJPG':
+                    self._enable_mjpeg_passthrough()
+                logger.info(f"摄像头 {self.camera_id} 初始化成功，分辨率: {profile.width}x{profile.height}"
+                            f"{'，MJPEG直通' if self.passthrough_active else ''}")
+                return True
         except Exception as e:
             logger.error(f"打开摄像头 {self.camera_id} 时出错: {str(e)}")
-            if self.cap is not None:
-                self.cap.release()
-        
-        # 如果指定摄像头打开失败，尝试其他视频源
-        logger.warning(f"摄像头 {self.camera_id} 打开失败，尝试其他视频源...")
-        
-        # 循环尝试不同的摄像头设备
-        for src in self.video_sources:
-            if src == self.camera_id:
-                continue
-                
-            try:
-                logger.info(f"尝试打开视频源: {src}")
-                self.cap = cv2.VideoCapture(src)
-                
-                if self.cap.isOpened():
-                    # 设置分辨率
-                    self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_width)
-                    self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_height)
-                    
-                    # 设置帧率
-                    self.cap.set(cv2.CAP_PROP_FPS, self.fps_target)
-                    
-                    # 设置缓冲区大小
-                    self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                    
-                    # 读取一帧测试摄像头是否正常工作
-                    ret, test_frame = self.cap.read()
-                    if not ret or test_frame is None or test_frame.size == 0:
-                        logger.warning(f"视频源 {src} 虽然打开但无法读取帧")
-                        self.cap.release()
-                        continue
-                    
-                    logger.info(f"成功打开视频源: {src}")
-                    self.camera_id = src
-                    self.camera_open_retry_count = 0
-                    return True
-            except Exception as e:
-                logger.error(f"打开视频源 {src} 时出错: {str(e)}")
-                if self.cap is not None:
-                    self.cap.release()
-                    
+            
         # 增加重试计数
         self.camera_open_retry_count += 1
         
@@ -180,6 +317,39 @@ class CameraManager:
         self.cap = None
         return False
     
+    @staticmethod
+    def _is_complete_jpeg(data: bytes) -> bool:
+        """
+        检查摄像头输出的是否是浏览器可直接显示的完整JPEG
+        
+        部分UVC摄像头的MJPG帧省略了霍夫曼表（DHT段），OpenCV能解码但浏览器不能，这类设备不做直通。
+        """
+        if data[:2] != b'\xff\xd8':
+            return False
+        sos = data.find(b'\xff\xda')
+        return sos > 0 and data.find(b'\xff\xc4', 0, sos) >= 0
+    
+    def _enable_mjpeg_passthrough(self) -> bool:
+        """
+        让摄像头返回未解码的MJPG数据（CAP_PROP_FORMAT=-1），并验证得到的是完整JPEG
+        
+        验证失败时恢复OpenCV解码输出，走原有的解码/重新编码路径。
+        """
+        try:
+            if self.cap.set(cv2.CAP_PROP_FORMAT, -1):
+                ret, raw = self.cap.read()
+                if ret and raw is not None and self._is_complete_jpeg(raw.tobytes()):
+                    self.passthrough_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or self.frame_width,
+                                              int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or self.frame_height)
+                    self.passthrough_active = True
+                    return True
+            logger.info(f"摄像头 {self.camera_id} 不支持输出完整的原始JPEG，使用解码模式")
+            self.cap.set(cv2.CAP_PROP_FORMAT, cv2.CV_8UC3)
+        except Exception as e:
+            logger.warning(f"启用MJPEG直通失败: {str(e)}")
+        self.passthrough_active = False
+        return False
+    
     def _generate_error_frame(self, message="摄像头未连接"):
         """生成错误帧"""
         frame = np.zeros((self.frame_height, self.frame_width, 3), dtype=np.uint8)
@@ -194,55 +364,41 @@ class CameraManager:
         
         return frame
         
+    def _init_source(self):
+        """初始化指定的替代帧源（合成画面或录像回放）"""
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        
+        if self.source == 'synthetic':
+            return self._init_dummy_camera()
+        
+        self.use_dummy_camera = False
+        source = ReplayCameraSource(
+            self.source, self.frame_width, self.frame_height, fps=None,
+            realtime=self.replay_realtime, loop=self.replay_loop)
+        if not source.isOpened():
+            logger.error(f"无法打开回放帧源: {self.source}")
+            return False
+        self.cap = source
+        return True
+    
     def _init_dummy_camera(self):
-        """初始化模拟摄像头，创建一系列测试图像"""
+        """初始化模拟摄像头（向量化合成帧源，毫秒级启动）"""
         logger.info("初始化模拟摄像头...")
-        self.dummy_frames = []
-        
-        # 生成10个不同的模拟帧
-        for i in range(10):
-            # 创建基础帧
-            frame = np.zeros((self.frame_height, self.frame_width, 3), dtype=np.uint8)
-            # 生成渐变背景
-            for y in range(self.frame_height):
-                for x in range(self.frame_width):
-                    b = int(255 * x / self.frame_width)
-                    g = int(255 * y / self.frame_height)
-                    r = int(255 * (1 - (x + y) / (self.frame_width + self.frame_height)))
-                    frame[y, x] = [b, g, r]
-            
-            # 添加一些动态内容
-            radius = 50 + 20 * (i % 5)
-            center = (self.frame_width // 2 + 100 * np.cos(i * 36 * np.pi/180), 
-                      self.frame_height // 2 + 100 * np.sin(i * 36 * np.pi/180))
-            cv2.circle(frame, (int(center[0]), int(center[1])), radius, (255, 255, 255), -1)
-            
-            # 添加文本
-            cv2.putText(frame, f"模拟摄像头 #{i+1}", (50, 50), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-            cv2.putText(frame, timestamp, (50, 100), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 1)
-            
-            self.dummy_frames.append(frame)
-            
+        start = time.time()
+        self.synthetic_source = SyntheticCameraSource(
+            self.frame_width, self.frame_height, fps=self.fps_target,
+            pattern=SYNTHETIC_CAMERA_PATTERN, noise=SYNTHETIC_CAMERA_NOISE)
         self.use_dummy_camera = True
-        logger.info(f"模拟摄像头初始化完成，生成了 {len(self.dummy_frames)} 个测试帧")
+        logger.info(f"模拟摄像头初始化完成，耗时 {(time.time() - start) * 1000:.1f}ms")
         return True
         
-    def _get_dummy_frame(self):
-        """获取下一个模拟摄像头帧"""
-        if not self.dummy_frames:
+    def _get_dummy_frame(self, image: Optional[np.ndarray] = None):
+        """获取下一个模拟摄像头帧，可直接写入给定的缓冲区"""
+        if self.synthetic_source is None:
             self._init_dummy_camera()
-            
-        frame = self.dummy_frames[self.dummy_frame_index].copy()
-        self.dummy_frame_index = (self.dummy_frame_index + 1) % len(self.dummy_frames)
-        
-        # 添加当前时间戳
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-        cv2.putText(frame, timestamp, (self.frame_width - 200, self.frame_height - 20), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 1)
-                   
+        _, frame = self.synthetic_source.read(image=image)
         return frame
     
     def start(self):
@@ -250,12 +406,12 @@ class CameraManager:
         if self.running:
             return True
             
-        if self.cap is None and not self._init_camera():
+        if self.cap is None and not self.use_dummy_camera and not self._init_camera():
             logger.error("摄像头初始化失败，无法启动捕获线程")
             return False
             
         self.running = True
-        threading.Thread(target=self._capture_loop, daemon=True, name="CameraCapture").start()
+        threading.Thread(target=self._capture_loop, daemon=True, name=f"CameraCapture-{self.source_id}").start()
         logger.info("摄像头捕获线程已启动")
         return True
     
@@ -277,12 +433,16 @@ class CameraManager:
                 
                 # 处理模拟摄像头模式
                 if self.use_dummy_camera:
-                    frame = self._get_dummy_frame()
-                    with self.lock:
-                        self.last_frame = frame.copy()
+                    # 合成帧直接生成到环形缓冲区的预分配槽位中
+                    slot, buf = self.ring.reserve()
+                    try:
+                        frame = self._get_dummy_frame(buf)
+                    except Exception:
+                        self.ring.cancel(slot)
+                        raise
                     
-                    # 分发帧给所有消费者
-                    self._distribute_frame(frame)
+                    # 发布槽位并分发给所有消费者
+                    self._publish_frame(frame, slot=slot)
                     
                     # 计算帧率
                     time_diff = current_time - self.last_frame_time
@@ -320,17 +480,26 @@ class CameraManager:
                     else:
                         frame = self._generate_error_frame("正在尝试重新连接摄像头...")
                         
-                    with self.lock:
-                        self.last_frame = frame.copy()
-                        
                     # 分发错误帧给所有消费者
-                    self._distribute_frame(frame)
+                    self._publish_frame(frame)
                     time.sleep(0.5)
                     continue
                 
-                # 读取一帧
+                # 读取一帧：直接读入环形缓冲区中借出的预分配槽位，避免每帧分配新数组再拷贝；
+                # MJPEG直通时读到的是摄像头压缩的JPEG数据，暂不解码
                 start_read_time = time.time()
-                ret, frame = self.cap.read()
+                passthrough = self.passthrough_active
+                slot = None
+                if passthrough:
+                    ret, frame = self.cap.read()
+                else:
+                    slot, buf = self.ring.reserve()
+                    try:
+                        ret, frame = self.cap.read(image=buf)
+                    except Exception:
+                        self.ring.cancel(slot)
+                        raise
+                capture_time = time.monotonic()
                 read_time = time.time() - start_read_time
                 
                 # 如果读取时间过长，记录警告
@@ -351,6 +520,17 @@ class CameraManager:
                 
                 # 处理读取失败的情况
                 if not ret or frame is None or frame.size == 0:
+                    if slot is not None:
+                        self.ring.cancel(slot)
+                    
+                    # 不循环的回放播放完毕，停止捕获而不是当作摄像头故障重连
+                    if getattr(self.cap, 'finished', False):
+                        logger.info("回放帧源播放完毕，停止捕获")
+                        self.running = False
+                        with self.frame_ready:
+                            self.frame_ready.notify_all()
+                        break
+                    
                     consecutive_errors += 1
                     logger.warning(f"读取视频帧失败，连续错误: {consecutive_errors}")
                     
@@ -368,11 +548,8 @@ class CameraManager:
                     else:
                         frame = self._generate_error_frame("视频信号丢失")
                     
-                    with self.lock:
-                        self.last_frame = frame.copy()
-                    
                     # 分发帧给所有消费者
-                    self._distribute_frame(frame)
+                    self._publish_frame(frame)
                     time.sleep(0.1)  # 减少等待时间，加快恢复
                     continue
                 
@@ -380,14 +557,15 @@ class CameraManager:
                 consecutive_errors = 0
                 self.frame_count += 1
                 
-                # 保存当前帧
-                with self.lock:
-                    self.last_frame = frame.copy()
-                
-                # 分发帧给所有消费者
-                self._distribute_frame(frame)
+                # 发布已读入的槽位（无需拷贝）并分发给所有消费者
+                if passthrough:
+                    self._publish_jpeg(frame.tobytes(), capture_time)
+                else:
+                    self._publish_frame(frame, capture_time, slot=slot)
                 
-                # 控制帧率
+                # 控制帧率（回放帧源自行控制节奏，全速回放时不休眠）
+                if getattr(self.cap, 'paced', False):
+                    continue
                 elapsed = time.time() - current_time
                 sleep_time = max(0, self.frame_interval - elapsed)
                 if sleep_time > 0:
@@ -405,49 +583,238 @@ class CameraManager:
                 
                 time.sleep(0.5)
     
-    def _distribute_frame(self, frame):
-        """分发帧给所有消费者"""
+    def _publish_frame(self, frame, capture_time: Optional[float] = None, slot: Optional[int] = None):
+        """
+        将一帧封装为带序号和捕获时间的信封写入环形缓冲区，并分发给所有消费者
+        
+        Args:
+            frame: 帧图像
+            capture_time: 捕获时刻（time.monotonic()）
+            slot: 帧已直接读入的环形缓冲区槽位（由ring.reserve()借出），为None时拷贝写入
+        """
+        seq = self._next_seq()
+        if slot is None:
+            ref = self.ring.publish(frame, capture_time=capture_time, source_id=self.source_id, seq=seq)
+        else:
+            ref = self.ring.commit(slot, frame, capture_time=capture_time, source_id=self.source_id, seq=seq)
+        with self.frame_ready:
+            self.frame_ready.notify_all()
+        self._distribute_frame(ref)
+        return ref
+    
+    def _next_seq(self) -> int:
+        """分配下一个帧序号（仅捕获线程调用）"""
+        self._seq += 1
+        return self._seq
+    
+    @property
+    def latest_seq(self) -> int:
+        """最新一帧的序号（解码帧或直通JPEG帧），尚无帧时为0"""
+        jpeg = self._jpeg_latest
+        return max(self.ring.latest_seq, jpeg.seq if jpeg is not None else 0)
+    
+    def _publish_jpeg(self, data: bytes, capture_time: Optional[float] = None):
+        """
+        发布摄像头直接输出的一帧JPEG
+        
+        只有队列/回调消费者需要逐帧推送图像，此时立即解码并分发；
+        否则只唤醒等待者，解码推迟到有消费者请求图像时（见_ensure_decoded）。
+        """
+        width, height = self.passthrough_size
+        jpeg = JpegFrame(self._next_seq(), capture_time if capture_time is not None else time.monotonic(),
+                         data, width, height, self.source_id, passthrough=True)
+        self._jpeg_latest = jpeg
+        self.jpeg_stats['passthrough_frames'] += 1
+        with self.frame_ready:
+            self.frame_ready.notify_all()
+        
+        if self.consumers or self.callbacks:
+            ref = self._decode_jpeg(jpeg, eager=True)
+            if ref is not None:
+                self._distribute_frame(ref)
+                return
+            # 被唤醒的等待者可能已抢先按需解码了这一帧，此时分发已发布的同一帧，避免队列/回调消费者漏帧
+            latest = self.ring.acquire_latest()
+            if latest is not None:
+                with latest:
+                    if latest.seq == jpeg.seq:
+                        self._distribute_frame(latest)
+    
+    def _decode_jpeg(self, jpeg: JpegFrame, eager: bool = False) -> Optional[FrameRef]:
+        """把直通JPEG解码进环形缓冲区（沿用其序号），已解码过或已有更新的帧时不重复解码"""
+        with self._decode_lock:
+            if jpeg.seq <= self.ring.latest_seq:
+                return None
+            image = cv2.imdecode(np.frombuffer(jpeg.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                self.jpeg_stats['decode_errors'] += 1
+                return None
+            self.jpeg_stats['eager_decodes' if eager else 'lazy_decodes'] += 1
+            return self.ring.publish(image, capture_time=jpeg.capture_time, source_id=jpeg.source_id, seq=jpeg.seq)
+    
+    def _ensure_decoded(self):
+        """确保环形缓冲区中的最新帧不旧于最新的直通JPEG帧"""
+        jpeg = self._jpeg_latest
+        if jpeg is not None and jpeg.seq > self.ring.latest_seq:
+            self._decode_jpeg(jpeg)
+    
+    def _distribute_frame(self, ref: FrameRef):
+        """
+        分发帧给所有消费者
+        
+        所有消费者共享环形缓冲区中的同一块只读内存，不再逐个拷贝。
+        订阅了其他尺寸/色彩空间的消费者共享同一份派生帧，每种派生帧只计算一次。
+        队列中的每个FrameRef都持有一次引用，由消费者取出后负责release()。
+        """
+        # 本帧已生成的派生帧 {variant_key: FrameRef}
+        variants: Dict[Tuple, FrameRef] = {}
+        
         # 处理基于队列的消费者
         for consumer_id, q in list(self.consumers.items()):
             try:
-                # 如果队列满，移除最旧的帧
+                spec = self.consumer_specs.get(consumer_id)
+                if spec is not None and not self._consumer_due(consumer_id, spec, ref.capture_time):
+                    q.stats.decimated += 1
+                    continue
+                
+                out = ref
+                if spec is not None and not self._is_passthrough(spec, ref):
+                    out = variants.get(spec.variant_key)
+                    if out is None:
+                        out = variants[spec.variant_key] = self.acquire_variant(ref, spec.size, spec.colour)
+                
+                # 如果队列满，移除最旧的帧并释放其引用（计入该消费者的丢帧数）
                 if q.full():
-                    try:
-                        q.get_nowait()
-                    except:
-                        pass
+                    dropped = q.drop_oldest()
+                    if dropped is not None:
+                        dropped.release()
                 
                 # 添加新帧
-                q.put_nowait(frame.copy())
+                q.put_nowait(out.retain())
+                q.stats.delivered += 1
+            except queue.Full:
+                q.stats.dropped += 1
+                out.release()
             except Exception as e:
                 logger.error(f"向消费者 {consumer_id} 分发帧时出错: {str(e)}")
         
-        # 处理回调函数
+        # 释放本次分发持有的派生帧引用（队列中的引用不受影响）
+        for variant in variants.values():
+            variant.release()
+        
+        # 处理回调函数：回调同步执行，期间帧不会被回收；需要保留或修改时请自行copy
         for consumer_id, callback in list(self.callbacks.items()):
             try:
-                callback(frame.copy())
+                callback(ref.image)
+                stats = self.consumer_stats.get(consumer_id)
+                if stats is not None:
+                    stats.delivered += 1
+                    stats.record_consume(ref)
             except Exception as e:
                 logger.error(f"调用消费者 {consumer_id} 的回调函数时出错: {str(e)}")
     
-    def register_consumer(self, consumer_id: str, max_queue_size: int = 5) -> queue.Queue:
+    def _consumer_due(self, consumer_id: str, spec: FrameSpec, now: float) -> bool:
+        """按订阅帧率判断该消费者此刻是否应投递新帧，投递时推进下次投递时刻"""
+        if not spec.fps:
+            return True
+        due = self._next_due.get(consumer_id, 0.0)
+        if now < due:
+            return False
+        interval = 1.0 / spec.fps
+        # 落后不足一个周期时按固定节拍推进，否则从当前时刻重新计时，避免补帧
+        self._next_due[consumer_id] = due + interval if now - due < interval else now + interval
+        return True
+    
+    def _is_passthrough(self, spec: FrameSpec, ref: FrameRef) -> bool:
+        """订阅规格与源帧一致时直接共享源帧"""
+        if spec.colour != 'bgr':
+            return False
+        return spec.size is None or (spec.size[0] == ref.image.shape[1] and spec.size[1] == ref.image.shape[0])
+    
+    def acquire_variant(self, ref: FrameRef, size: Optional[Tuple[int, int]] = None,
+                        colour: str = 'bgr') -> FrameRef:
+        """
+        借用源帧的派生帧（缩放/色彩空间转换）
+        
+        同一源帧、同一尺寸和色彩空间的派生帧只计算一次，之后的调用共享同一份只读结果。
+        派生帧沿用源帧的序号、捕获时间和视频源标识。
+        
+        Args:
+            ref: 源帧
+            size: 输出尺寸 (宽, 高)，None表示保持源帧尺寸
+            colour: 色彩空间，'bgr' / 'rgb' / 'gray'
+            
+        Returns:
+            派生帧的FrameRef，用完后需调用 release()；规格与源帧一致时返回源帧的新引用
+        """
+        if colour not in COLOUR_CONVERSIONS:
+            raise ValueError(f"不支持的色彩空间: {colour}")
+        spec = FrameSpec(size=tuple(size) if size else None, colour=colour)
+        if self._is_passthrough(spec, ref):
+            return ref.retain()
+        
+        key = spec.variant_key
+        with self.variant_lock:
+            stats = self.variant_stats.setdefault(key, {'hits': 0, 'misses': 0})
+            ring = self.variant_rings.get(key)
+            if ring is not None and ring.latest_seq == ref.seq:
+                variant = ring.acquire_latest()
+                if variant is not None:
+                    stats['hits'] += 1
+                    return variant
+            
+            stats['misses'] += 1
+            image = ref.image
+            if spec.size is not None:
+                image = cv2.resize(image, spec.size, interpolation=cv2.INTER_AREA)
+            if COLOUR_CONVERSIONS[colour] is not None:
+                image = cv2.cvtColor(image, COLOUR_CONVERSIONS[colour])
+            
+            if ring is None:
+                ring = FrameRing(capacity=self.ring.capacity, frame_shape=image.shape, dtype=image.dtype)
+                self.variant_rings[key] = ring
+            # 迟到的请求（源帧已不是最新）也按其序号写入，后续新帧会重新计算
+            ring.publish(image, capture_time=ref.capture_time, source_id=ref.source_id, seq=ref.seq)
+            return ring.acquire_latest()
+    
+    def register_consumer(self, consumer_id: str, max_queue_size: int = 5,
+                          fps: Optional[float] = None, size: Optional[Tuple[int, int]] = None,
+                          colour: str = 'bgr', with_queue: bool = True) -> Optional[queue.Queue]:
         """
         注册一个帧消费者
         
         Args:
             consumer_id: 消费者ID
             max_queue_size: 队列最大大小
+            fps: 投递帧率上限，None表示每帧都投递
+            size: 需要的帧尺寸 (宽, 高)，None表示保持摄像头分辨率
+            colour: 需要的色彩空间，'bgr' / 'rgb' / 'gray'
+            with_queue: 是否创建帧队列；使用wait_for_frame获取帧的消费者传False，只登记订阅规格
             
         Returns:
-            指向该消费者的队列
+            指向该消费者的队列，队列元素为FrameRef（只读帧视图），
+            消费者处理完后必须调用 release()；with_queue为False时返回None
         """
+        if colour not in COLOUR_CONVERSIONS:
+            raise ValueError(f"不支持的色彩空间: {colour}")
+        
         if consumer_id in self.consumers:
             logger.warning(f"消费者 {consumer_id} 已存在，返回现有队列")
             return self.consumers[consumer_id]
         
+        spec = FrameSpec(fps=fps, size=tuple(size) if size else None, colour=colour)
+        if spec != FrameSpec():
+            self.consumer_specs[consumer_id] = spec
+        stats = self.consumer_stats.setdefault(consumer_id, ConsumerStats())
+        
+        if not with_queue:
+            logger.info(f"消费者 {consumer_id} 注册成功（订阅规格: {spec}）")
+            return None
+        
         # 创建新队列
-        q = queue.Queue(maxsize=max_queue_size)
+        q = FrameQueue(max_queue_size, stats)
         self.consumers[consumer_id] = q
-        logger.info(f"消费者 {consumer_id} 注册成功")
+        logger.info(f"消费者 {consumer_id} 注册成功（订阅规格: {spec}）")
         return q
     
     def register_callback(self, consumer_id: str, callback: Callable):
@@ -456,27 +823,205 @@ class CameraManager:
         
         Args:
             consumer_id: 消费者ID
-            callback: 回调函数，接收一帧图像作为参数
+            callback: 回调函数，接收一帧只读图像作为参数（仅在回调期间有效）
         """
         self.callbacks[consumer_id] = callback
+        self.consumer_stats.setdefault(consumer_id, ConsumerStats())
         logger.info(f"消费者 {consumer_id} 回调函数注册成功")
     
     def unregister_consumer(self, consumer_id: str):
         """注销一个帧消费者"""
         if consumer_id in self.consumers:
-            del self.consumers[consumer_id]
+            self._drain_queue(self.consumers.pop(consumer_id))
             logger.info(f"消费者 {consumer_id} 注销成功")
         
         if consumer_id in self.callbacks:
             del self.callbacks[consumer_id]
             logger.info(f"消费者 {consumer_id} 回调函数注销成功")
+        
+        self.consumer_stats.pop(consumer_id, None)
+        self.consumer_specs.pop(consumer_id, None)
+        self._next_due.pop(consumer_id, None)
+    
+    @property
+    def last_frame(self):
+        """最新帧的只读视图（兼容旧代码，长期持有请使用acquire_latest_frame）"""
+        self._ensure_decoded()
+        ref = self.ring._latest
+        return ref.image if ref is not None else None
+    
+    def acquire_latest_frame(self) -> Optional[FrameRef]:
+        """
+        借用最新帧（不拷贝）
+        
+        Returns:
+            FrameRef，用完后需调用 release()；尚无帧时返回None
+        """
+        self._ensure_decoded()
+        return self.ring.acquire_latest()
+    
+    def wait_for_frame(self, after_seq: int = 0, timeout: Optional[float] = None,
+                       consumer_id: Optional[str] = None) -> Optional[FrameRef]:
+        """
+        阻塞等待序号大于after_seq的新帧
+        
+        新帧写入时通过条件变量唤醒等待者，不轮询、不会重复返回同一帧。
+        若等待期间到达了多帧，只返回最新一帧，跳过的帧计入该消费者的丢帧数。
+        消费者通过register_consumer登记了订阅规格时，按其帧率抽帧并返回对应的派生帧。
+        
+        Args:
+            after_seq: 调用方已处理过的最后一帧序号，首次调用传0
+            timeout: 最长等待秒数，None表示一直等待
+            consumer_id: 消费者ID（可选），用于统计延迟与丢帧
+            
+        Returns:
+            借用的FrameRef，用完后需调用 release()；超时返回None
+        """
+        spec = self.consumer_specs.get(consumer_id) if consumer_id is not None else None
+        if spec is not None and spec.fps:
+            # 未到下次投递时刻前先休眠，抽帧期间到达的帧不会唤醒该消费者
+            wait_time = self._next_due.get(consumer_id, 0.0) - time.monotonic()
+            if wait_time > 0:
+                if timeout is not None and wait_time >= timeout:
+                    time.sleep(timeout)
+                    return None
+                time.sleep(wait_time)
+                if timeout is not None:
+                    timeout -= wait_time
+        
+        with self.frame_ready:
+            if not self.frame_ready.wait_for(lambda: self.latest_seq > after_seq, timeout):
+                return None
+        # MJPEG直通时在等待者线程中按需解码，不占用捕获线程
+        self._ensure_decoded()
+        ref = self.ring.acquire_latest()
+        if ref is None:
+            return None
+        
+        if spec is not None:
+            if spec.fps:
+                self._consumer_due(consumer_id, spec, max(time.monotonic(), self._next_due.get(consumer_id, 0.0)))
+            if not self._is_passthrough(spec, ref):
+                try:
+                    variant = self.acquire_variant(ref, spec.size, spec.colour)
+                finally:
+                    ref.release()
+                ref = variant
+        
+        if consumer_id is not None:
+            stats = self.consumer_stats.get(consumer_id)
+            if stats is None:
+                stats = self.consumer_stats.setdefault(consumer_id, ConsumerStats())
+            stats.delivered += 1
+            if after_seq > 0:
+                skipped = max(0, ref.seq - after_seq - 1)
+                if spec is not None and spec.fps:
+                    stats.decimated += skipped
+                else:
+                    stats.dropped += skipped
+            stats.record_consume(ref)
+        return ref
     
     def get_latest_frame(self):
-        """获取最新帧"""
-        with self.lock:
-            if self.last_frame is None:
-                return self._generate_error_frame()
-            return self.last_frame.copy()
+        """获取最新帧的可写副本（需要修改图像时使用，只读访问请用acquire_latest_frame）"""
+        ref = self.acquire_latest_frame()
+        if ref is None:
+            return self._generate_error_frame()
+        with ref:
+            return ref.copy()
+    
+    def wait_for_jpeg(self, after_seq: int = 0, timeout: Optional[float] = None,
+                      consumer_id: Optional[str] = None, quality: int = 85,
+                      passthrough: bool = True) -> Optional[JpegFrame]:
+        """
+        阻塞等待序号大于after_seq的新帧，返回其JPEG编码
+        
+        MJPEG直通时直接返回摄像头压缩的原始数据，不解码也不重新编码（quality不生效）；
+        否则对解码帧编码一次，同一帧、同一质量的多个观看者共享编码结果。
+        
+        Args:
+            after_seq: 调用方已发送的最后一帧序号，首次调用传0
+            timeout: 最长等待秒数，None表示一直等待
+            consumer_id: 消费者ID（可选），用于统计延迟与丢帧
+            quality: 需要重新编码时使用的JPEG质量
+            passthrough: 是否允许直接返回摄像头的JPEG；False时MJPEG直通帧也解码后按quality重新编码
+            
+        Returns:
+            JpegFrame；超时返回None
+        """
+        with self.frame_ready:
+            if not self.frame_ready.wait_for(lambda: self.latest_seq > after_seq, timeout):
+                return None
+        
+        jpeg = self._jpeg_latest
+        if passthrough and jpeg is not None and jpeg.seq >= self.ring.latest_seq:
+            self.jpeg_stats['served_passthrough'] += 1
+        else:
+            if not passthrough:
+                self._ensure_decoded()
+            jpeg = self._encode_latest(quality)
+            if jpeg is None:
+                return None
+        
+        if consumer_id is not None:
+            stats = self.consumer_stats.setdefault(consumer_id, ConsumerStats())
+            stats.delivered += 1
+            if after_seq > 0:
+                stats.dropped += max(0, jpeg.seq - after_seq - 1)
+            stats.record_consume(jpeg)
+        return jpeg
+    
+    def _encode_latest(self, quality: int) -> Optional[JpegFrame]:
+        """
+        把最新的解码帧编码为JPEG，按(序号, 质量)缓存，每帧每种质量只编码一次
+
+        编码在管理器锁之外进行，只有同一质量的请求互相等待（等到的正是需要的结果），
+        不同质量的通道可以并行编码。
+        """
+        ref = self.ring.acquire_latest()
+        if ref is None:
+            return None
+        with ref:
+            with self._encode_lock:
+                cached = self._cached_encode(ref.seq, quality)
+                if cached is not None:
+                    return cached
+                quality_lock = self._encode_quality_locks.setdefault(quality, threading.Lock())
+            with quality_lock:
+                with self._encode_lock:
+                    # 等锁期间可能已由其他线程编码完成
+                    cached = self._cached_encode(ref.seq, quality)
+                    if cached is not None:
+                        return cached
+                data = encode_jpeg(ref.image, quality)
+                if data is None:
+                    return None
+                jpeg = JpegFrame(ref.seq, ref.capture_time, data, ref.image.shape[1],
+                                 ref.image.shape[0], ref.source_id)
+                with self._encode_lock:
+                    if self._jpeg_encoded_seq == ref.seq:
+                        self._jpeg_encoded[quality] = jpeg
+                    self.jpeg_stats['encoded_frames'] += 1
+                return jpeg
+
+    def _cached_encode(self, seq: int, quality: int) -> Optional[JpegFrame]:
+        """查找(序号, 质量)的编码缓存，遇到更新的帧时清空旧缓存（调用方持有 _encode_lock）"""
+        if seq > self._jpeg_encoded_seq:
+            self._jpeg_encoded.clear()
+            self._jpeg_encoded_seq = seq
+        cached = self._jpeg_encoded.get(quality) if seq == self._jpeg_encoded_seq else None
+        if cached is not None:
+            self.jpeg_stats['encode_cache_hits'] += 1
+        return cached
+    
+    @staticmethod
+    def _drain_queue(q: FrameQueue):
+        """清空消费者队列并释放其中的帧引用"""
+        while True:
+            ref = q.drop_oldest()
+            if ref is None:
+                break
+            ref.release()
     
     def get_status(self):
         """获取摄像头状态"""
@@ -485,11 +1030,20 @@ class CameraManager:
             "connected": (self.cap is not None and self.cap.isOpened()) or self.use_dummy_camera,
             "is_dummy": self.use_dummy_camera,
             "camera_id": self.camera_id,
+            "source": self.source_id,
+            "camera_profile": asdict(self.camera_profile) if self.camera_profile else None,
             "fps": round(self.fps, 2),
             "resolution": f"{self.frame_width}x{self.frame_height}",
             "target_fps": self.fps_target,
-            "consumers": list(self.consumers.keys()) + list(self.callbacks.keys()),
-            "consumer_count": len(self.consumers) + len(self.callbacks),
+            "consumers": list(self.consumer_stats.keys()),
+            "consumer_count": len(self.consumer_stats),
+            "frame_ring": self.ring.get_status(),
+            "capture_buffers": self.get_buffer_pool_status(),
+            "consumer_specs": {cid: spec._asdict() for cid, spec in list(self.consumer_specs.items())},
+            "frame_variants": self.get_variant_status(),
+            "mjpeg_passthrough": {"enabled": self.mjpeg_passthrough, "active": self.passthrough_active,
+                                  **self.jpeg_stats},
+            "consumer_stats": {cid: stats.snapshot() for cid, stats in list(self.consumer_stats.items())},
             "reconnect_count": self.reconnect_count,
             "retry_count": self.camera_open_retry_count,
             "uptime": time.time() - self.last_reconnect_time if self.last_reconnect_time > 0 else 0
@@ -507,18 +1061,49 @@ class CameraManager:
                 
         return status
     
+    def get_buffer_pool_status(self) -> dict:
+        """
+        捕获缓冲池占用情况
+        
+        Returns:
+            槽位总数、被借用的槽位数、占用率、已分配字节数，以及直接读入/拷贝写入的帧数
+        """
+        ring_status = self.ring.get_status()
+        return {
+            "capacity": ring_status["capacity"],
+            "slots_in_use": ring_status["slots_in_use"],
+            "occupancy": ring_status["occupancy"],
+            "bytes_allocated": ring_status["bytes_allocated"],
+            "in_place_reads": ring_status["in_place_writes"],
+            "copied_frames": ring_status["copied_writes"],
+            "grown_slots": ring_status["grown_slots"]
+        }
+    
+    def get_variant_status(self) -> dict:
+        """派生帧缓冲区状态：每种派生帧的生成次数、缓存命中情况与订阅者数量"""
+        status = {}
+        for (size, colour), ring in list(self.variant_rings.items()):
+            name = f"{size[0]}x{size[1]}/{colour}" if size else f"source/{colour}"
+            subscribers = sum(1 for spec in list(self.consumer_specs.values())
+                              if spec.variant_key == (size, colour))
+            stats = dict(self.variant_stats.get((size, colour), {'hits': 0, 'misses': 0}))
+            requests = stats['hits'] + stats['misses']
+            stats['hit_rate'] = round(stats['hits'] / requests, 3) if requests else 0
+            status[name] = {"subscribers": subscribers, **stats, **ring.get_status()}
+        return status
+    
     def stop(self):
         """停止摄像头帧捕获"""
         self.running = False
         time.sleep(0.5)  # 等待捕获线程退出
         
+        # 唤醒所有等待新帧的消费者，让其按超时逻辑检查自身状态
+        with self.frame_ready:
+            self.frame_ready.notify_all()
+        
         # 清空所有队列
         for q in self.consumers.values():
-            while not q.empty():
-                try:
-                    q.get_nowait()
-                except:
-                    pass
+            self._drain_queue(q)
         
         # 释放摄像头资源
         if self.cap is not None:
@@ -527,25 +1112,79 @@ class CameraManager:
         
         logger.info("摄像头管理器已停止")
 
-# 全局单例实例
-_camera_manager_instance = None
+# 摄像头管理器注册表 {视频源ID: CameraManager}，每个视频源有独立的捕获线程、缓冲池和消费者
+_camera_registry: Dict[str, CameraManager] = {}
+_registry_lock = threading.RLock()
+# 默认（主）摄像头的视频源ID：第一个创建的管理器
+_default_source_id: Optional[str] = None
+
+def _make_source_id(camera_id=None, source=None) -> str:
+    """根据摄像头ID或替代帧源计算注册表键"""
+    return str(source if source is not None else (camera_id if camera_id is not None else 0))
 
-def get_camera_manager(init=False, **kwargs):
+def get_camera_manager(init=False, source=None, camera_id=None, **kwargs):
     """
-    获取摄像头管理器的全局单例实例
+    按视频源获取摄像头管理器，不存在时创建并登记
+    
+    同一设备/帧源只会有一个管理器，多个模块共享其帧，不会争用设备；
+    不同设备（如面向桌面的第二个摄像头）各自拥有独立的管理器。
+    不指定camera_id和source时返回默认（第一个创建的）管理器。
     
     Args:
-        init: 是否初始化摄像头
-        **kwargs: 传递给CameraManager的参数
+        init: 是否启动摄像头捕获线程
+        source: 替代物理摄像头的帧源，'synthetic' 或录像文件/图片目录路径（见CameraManager）
+        camera_id: 摄像头ID或设备路径
+        **kwargs: 创建时传递给CameraManager的其他参数
         
     Returns:
         CameraManager实例
     """
-    global _camera_manager_instance
+    global _default_source_id
     
-    if _camera_manager_instance is None:
-        _camera_manager_instance = CameraManager(**kwargs)
-        if init:
-            _camera_manager_instance.start()
+    with _registry_lock:
+        if camera_id is None and source is None and _default_source_id is not None:
+            source_id = _default_source_id
+        else:
+            source_id = _make_source_id(camera_id, source)
+        
+        manager = _camera_registry.get(source_id)
+        if manager is None:
+            manager = CameraManager(camera_id=camera_id if camera_id is not None else 0, source=source, **kwargs)
+            _camera_registry[source_id] = manager
+            if _default_source_id is None:
+                _default_source_id = source_id
+            logger.info(f"已登记摄像头管理器: {source_id}")
+        elif kwargs:
+            logger.debug(f"摄像头管理器 {source_id} 已存在，忽略创建参数: {list(kwargs.keys())}")
+    
+    if init and not manager.running:
+        manager.start()
+    
+    return manager
+
+def list_camera_managers() -> Dict[str, CameraManager]:
+    """返回所有已登记的摄像头管理器 {视频源ID: CameraManager}"""
+    with _registry_lock:
+        return dict(_camera_registry)
+
+def release_camera_manager(source_id: str) -> bool:
+    """
+    停止并注销指定视频源的摄像头管理器
     
-    return _camera_manager_instance
+    Args:
+        source_id: 视频源ID（见CameraManager.source_id）
+        
+    Returns:
+        是否找到并注销
+    """
+    global _default_source_id
+    
+    with _registry_lock:
+        manager = _camera_registry.pop(str(source_id), None)
+        if manager is None:
+            return False
+        if _default_source_id == str(source_id):
+            _default_source_id = next(iter(_camera_registry), None)
+    manager.stop()
+    logger.info(f"已注销摄像头管理器: {source_id}")
+    return True
@@ -0,0 +1,278 @@
+"""
+摄像头帧源模块 - 提供可替代物理摄像头的帧源
+
+帧源接口与 cv2.VideoCapture 保持一致（read / isOpened / release），
+摄像头管理器的捕获循环可以不区分帧源类型，直接读入环形缓冲区的预分配槽位。
+
+- SyntheticCameraSource: 向量化生成的合成画面，用于没有摄像头的环境
+- ReplayCameraSource: 回放视频文件或图片目录，用于确定性压测和复现现场问题
+"""
+import os
+import time
+import logging
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SyntheticCameraSource:
+    """
+    合成摄像头帧源
+
+    背景渐变在初始化时用NumPy广播一次性生成，每帧只做一次整帧拷贝，
+    再叠加按时间运动的图形、可选噪声和时间戳，启动耗时为毫秒级，可维持任意目标帧率。
+    """
+    PATTERNS = ('gradient', 'shapes')
+
+    def __init__(self, width: int = 640, height: int = 480, fps: float = 30,
+                 pattern: str = 'shapes', noise: int = 0, seed: Optional[int] = None):
+        """
+        初始化合成帧源
+
+        Args:
+            width: 帧宽度
+            height: 帧高度
+            fps: 标称帧率（运动图形按真实时间移动，与实际读取速度无关）
+            pattern: 画面样式，'gradient' 仅渐变背景，'shapes' 叠加运动图形
+            noise: 噪声幅度（0-127），0表示不加噪声
+            seed: 噪声随机种子
+        """
+        if pattern not in self.PATTERNS:
+            raise ValueError(f"不支持的合成画面样式: {pattern}")
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.pattern = pattern
+        self.noise = max(0, min(int(noise), 127))
+        self.frame_index = 0
+        self._opened = True
+        self._start_time = time.monotonic()
+
+        self._background = self._build_gradient(width, height)
+        self._noise_pool = self._build_noise_pool(seed) if self.noise else []
+
+    @staticmethod
+    def _build_gradient(width: int, height: int) -> np.ndarray:
+        """用广播生成BGR渐变背景：B沿x方向、G沿y方向、R沿对角线递减"""
+        x = np.arange(width, dtype=np.float32)[None, :]
+        y = np.arange(height, dtype=np.float32)[:, None]
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[..., 0] = 255 * x / width
+        frame[..., 1] = 255 * y / height
+        frame[..., 2] = 255 * (1 - (x + y) / (width + height))
+        return frame
+
+    def _build_noise_pool(self, seed: Optional[int], pool_size: int = 4):
+        """预生成若干帧噪声，拆成正负两部分以便用饱和加减法原地叠加"""
+        rng = np.random.default_rng(seed)
+        pool = []
+        for _ in range(pool_size):
+            noise = rng.integers(-self.noise, self.noise + 1, size=self._background.shape, dtype=np.int16)
+            pool.append((np.clip(noise, 0, None).astype(np.uint8), np.clip(-noise, 0, None).astype(np.uint8)))
+        return pool
+
+    def _draw_shapes(self, frame: np.ndarray, t: float):
+        """按时间绘制运动的圆形和往返移动的方块"""
+        w, h = self.width, self.height
+        angle = t * 2 * np.pi / 4.0  # 4秒绕一圈
+        center = (int(w // 2 + 0.2 * w * np.cos(angle)), int(h // 2 + 0.2 * h * np.sin(angle)))
+        radius = int(min(w, h) * (0.1 + 0.04 * np.sin(t * 2 * np.pi / 3.0)))
+        cv2.circle(frame, center, radius, (255, 255, 255), -1)
+
+        size = max(8, min(w, h) // 8)
+        travel = max(1, w - size)
+        phase = (t / 3.0) % 2.0  # 3秒单程往返
+        left = int(travel * (phase if phase < 1.0 else 2.0 - phase))
+        top = h - size - max(4, h // 16)
+        cv2.rectangle(frame, (left, top), (left + size, top + size), (40, 40, 220), -1)
+
+    def read(self, image: Optional[np.ndarray] = None):
+        """
+        生成下一帧（与 cv2.VideoCapture.read 兼容）
+
+        Args:
+            image: 可选的输出缓冲区，尺寸匹配时直接写入其中
+
+        Returns:
+            (是否成功, 帧图像)
+        """
+        if not self._opened:
+            return False, None
+        if image is None or image.shape != self._background.shape or image.dtype != np.uint8:
+            image = np.empty_like(self._background)
+        np.copyto(image, self._background)
+
+        t = time.monotonic() - self._start_time
+        if self.pattern == 'shapes':
+            self._draw_shapes(image, t)
+        if self._noise_pool:
+            positive, negative = self._noise_pool[self.frame_index % len(self._noise_pool)]
+            cv2.add(image, positive, dst=image)
+            cv2.subtract(image, negative, dst=image)
+
+        cv2.putText(image, f"SYNTHETIC #{self.frame_index}", (20, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+        cv2.putText(image, timestamp, (self.width - 230, self.height - 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+
+        self.frame_index += 1
+        return True, image
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def release(self):
+        self._opened = False
+
+
+class ReplayCameraSource:
+    """
+    录像回放帧源
+
+    支持视频文件（MP4/MJPEG等OpenCV可解码的格式）和JPEG/PNG图片目录
+    （如 static/posture_images，按文件名排序）。可以按原始时间节奏回放，
+    也可以尽可能快地回放，用于在没有摄像头的机器上确定性地压测整条分析流水线。
+    """
+    IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+    # 回放帧源自行控制节奏，摄像头管理器不再额外按目标帧率休眠
+    paced = True
+
+    def __init__(self, path: str, width: Optional[int] = None, height: Optional[int] = None,
+                 fps: Optional[float] = None, realtime: bool = True, loop: bool = True):
+        """
+        初始化回放帧源
+
+        Args:
+            path: 视频文件路径或图片目录路径
+            width: 输出帧宽度，与height同时给出时把帧缩放到该尺寸
+            height: 输出帧高度
+            fps: 回放帧率；视频文件默认使用文件自身帧率，图片目录默认30
+            realtime: True按原始时间节奏回放，False尽可能快地回放
+            loop: 回放结束后是否从头循环
+        """
+        self.path = path
+        self.size = (int(width), int(height)) if width and height else None
+        self.realtime = realtime
+        self.loop = loop
+        self.finished = False
+        self.frame_index = 0
+        self._cap = None
+        self._images: List[str] = []
+
+        if os.path.isdir(path):
+            self._images = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(self.IMAGE_EXTENSIONS)
+            )
+            self.fps = fps or 30.0
+            if not self._images:
+                logger.error(f"回放目录中没有图片: {path}")
+        else:
+            self._cap = cv2.VideoCapture(path)
+            if not self._cap.isOpened():
+                logger.error(f"无法打开回放文件: {path}")
+            file_fps = self._cap.get(cv2.CAP_PROP_FPS) if self._cap.isOpened() else 0
+            self.fps = fps or (file_fps if file_fps and file_fps > 0 else 30.0)
+
+        self._start_time = time.monotonic()
+        logger.info(f"回放帧源: {path}，帧率 {self.fps:.1f}，"
+                    f"{'原始节奏' if realtime else '全速'}{'，循环' if loop else ''}")
+
+    def _next_frame(self):
+        """读取下一帧原始图像，到达末尾时按loop设置回绕"""
+        for _ in range(2):
+            if self._cap is not None:
+                ret, frame = self._cap.read()
+                if ret:
+                    return frame
+                if not self.loop:
+                    return None
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            else:
+                if not self._images:
+                    return None
+                index = self.frame_index % len(self._images) if self.loop else self.frame_index
+                if index >= len(self._images):
+                    return None
+                frame = cv2.imread(self._images[index])
+                if frame is not None:
+                    return frame
+                logger.warning(f"无法读取回放图片: {self._images[index]}")
+                self.frame_index += 1
+        return None
+
+    def read(self, image: Optional[np.ndarray] = None):
+        """
+        读取下一帧（与 cv2.VideoCapture.read 兼容）
+
+        Args:
+            image: 可选的输出缓冲区，尺寸匹配时直接写入其中
+
+        Returns:
+            (是否成功, 帧图像)；不循环回放且已到末尾时返回 (False, None)
+        """
+        if not self.isOpened() or self.finished:
+            return False, None
+
+        if self.realtime:
+            # 按回放起点计算本帧应出现的时刻，避免误差累积
+            delay = self._start_time + self.frame_index / self.fps - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -1.0:
+                # 下游阻塞太久，重新对齐时钟而不是连续补帧
+                self._start_time = time.monotonic() - self.frame_index / self.fps
+
+        frame = self._next_frame()
+        if frame is None:
+            self.finished = True
+            logger.info(f"回放结束: {self.path}，共 {self.frame_index} 帧")
+            return False, None
+        self.frame_index += 1
+
+        target_shape = (self.size[1], self.size[0], 3) if self.size else frame.shape
+        use_buffer = image is not None and image.shape == target_shape and image.dtype == frame.dtype
+        if self.size and frame.shape[:2] != target_shape[:2]:
+            if use_buffer:
+                cv2.resize(frame, self.size, dst=image, interpolation=cv2.INTER_AREA)
+                return True, image
+            return True, cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if use_buffer:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def get(self, prop_id: int) -> float:
+        """兼容 cv2.VideoCapture.get 的常用属性"""
+        if prop_id == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop_id in (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT):
+            if self.size:
+                return float(self.size[0] if prop_id == cv2.CAP_PROP_FRAME_WIDTH else self.size[1])
+            if self._cap is not None:
+                return self._cap.get(prop_id)
+            return 0.0
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self._images)) if self._cap is None else self._cap.get(prop_id)
+        if self._cap is not None:
+            return self._cap.get(prop_id)
+        return 0.0
+
+    def set(self, prop_id: int, value) -> bool:
+        """回放帧源不支持修改采集参数"""
+        return False
+
+    def isOpened(self) -> bool:
+        if self._cap is not None:
+            return self._cap.isOpened()
+        return bool(self._images)
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+        self._images = []
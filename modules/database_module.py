@@ -139,8 +139,8 @@ def save_posture_image(image, angle, is_bad_posture, posture_status, emotion, no
     Returns:
         成功时返回图像ID和路径，失败时返回None
     """
-    import cv2
     from uuid import uuid4
+    from modules.jpeg_codec import encode_jpeg
     
     try:
         # 生成唯一文件名
@@ -148,8 +148,12 @@ def save_posture_image(image, angle, is_bad_posture, posture_status, emotion, no
         filename = f"posture_{timestamp.strftime('%Y%m%d_%H%M%S')}_{uuid4().hex[:8]}.jpg"
         image_path = os.path.join(POSTURE_IMAGES_DIR, filename)
         
-        # 保存图像
-        cv2.imwrite(image_path, image)
+        # 保存图像（与cv2.imwrite默认质量一致）
+        data = encode_jpeg(image, 95)
+        if data is None:
+            raise ValueError("图像编码失败")
+        with open(image_path, 'wb') as f:
+            f.write(data)
         
         # 相对路径，用于前端访问
         relative_path = f"/static/posture_images/{filename}"
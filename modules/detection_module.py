@@ -5,13 +5,37 @@ import threading
 import cv2
 import os
 
+from modules.camera_discovery import get_camera_discovery
+from modules.camera_manager import get_camera_manager
+
+try:
+    from config import DETECTION_MAX_FPS
+except ImportError:
+    DETECTION_MAX_FPS = 20
+
 class DetectionService:
     """检测服务类，用于管理目标检测"""
     
-    def __init__(self, model_path="Yolo/best6_rknn_model", camera_id=None, show_img=False):
+    def __init__(self, model_path="Yolo/best6_rknn_model", camera_id=None, show_img=False, camera_manager=None,
+                 private_capture=False):
+        """
+        Args:
+            model_path: 模型路径
+            camera_id: 摄像头ID，若为None则自动查找
+            show_img: 是否显示图像
+            camera_manager: 摄像头管理器（可选），从其共享帧中读取；
+                未提供但指定了camera_id时默认使用 get_camera_manager(camera_id=camera_id)
+            private_capture: 为True时不使用摄像头管理器，自行打开并独占摄像头
+        """
         self.detector = None
         self.model_path = model_path
         self.camera_id = camera_id
+        if camera_manager is None and camera_id is not None and not private_capture:
+            # 指定了设备时共享该设备的摄像头管理器，避免与其他模块争用同一设备
+            camera_manager = get_camera_manager(camera_id=camera_id)
+        self.camera_manager = camera_manager
+        self.cap = None
+        self._last_frame_seq = 0
         self.api_preference = None  # 存储成功的API类型
         
         # 检查是否在无显示环境中，如果是则禁用图像显示
@@ -37,139 +61,54 @@ class DetectionService:
         self.last_error_time = 0
         self.error_cooldown = 5.0  # 错误冷却时间（秒）
     
-    def _try_open_camera(self, camera_id, api_id, api_name, attempt=1):
-        """尝试打开单个摄像头
-        
-        Args:
-            camera_id: 摄像头ID
-            api_id: API ID
-            api_name: API名称
-            attempt: 尝试次数
-            
-        Returns:
-            tuple: (cv2.VideoCapture, 是否成功)
-        """
-        try:
-            if isinstance(camera_id, str):
-                cap = cv2.VideoCapture(camera_id, api_id)
-            else:
-                cap = cv2.VideoCapture(int(camera_id), api_id)
-                
-            if not cap.isOpened():
-                print(f"无法打开摄像头 {camera_id} (API: {api_name}, 尝试 {attempt})")
-                return None, False
-                
-            # 设置摄像头参数
-            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M','J','P','G'))
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            cap.set(cv2.CAP_PROP_FPS, 30)
-            
-            # 等待摄像头初始化
-            time.sleep(0.5)
-            
-            # 尝试读取第一帧
-            ret, frame = cap.read()
-            if not ret or frame is None:
-                print(f"无法从摄像头 {camera_id} 读取帧 (API: {api_name}, 尝试 {attempt})")
-                cap.release()
-                return None, False
-                
-            # 成功读取到帧
-            print(f"成功打开摄像头 {camera_id} (API: {api_name}, 尝试 {attempt})")
-            print(f"分辨率: {int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}")
-            print(f"帧率: {cap.get(cv2.CAP_PROP_FPS):.1f}")
-            return cap, True
-            
-        except Exception as e:
-            print(f"尝试打开摄像头 {camera_id} 时出错 (API: {api_name}, 尝试 {attempt}): {str(e)}")
-            if 'cap' in locals():
-                cap.release()
-            return None, False
-
-    def _try_camera_apis(self, camera_id):
-        """尝试使用不同的API打开摄像头
-        
-        Args:
-            camera_id: 摄像头ID，可以是数字或设备路径
-            
-        Returns:
-            tuple: (cv2.VideoCapture对象, 使用的API) 或 (None, None)
-        """
-        apis = [
-            (cv2.CAP_ANY, "ANY"),
-            (cv2.CAP_V4L2, "V4L2"),
-            (cv2.CAP_V4L, "V4L"),
-        ]
-        
-        for api_id, api_name in apis:
-            print(f"\n尝试对摄像头 {camera_id} 使用 {api_name} API...")
-            
-            # 每个API尝试3次
-            for attempt in range(1, 4):
-                cap, success = self._try_open_camera(camera_id, api_id, api_name, attempt)
-                if success:
-                    return cap, api_name
-                elif attempt < 3:  # 不是最后一次尝试
-                    print(f"等待1秒后重试...")
-                    time.sleep(1)
-                    
-            print(f"使用 {api_name} API的所有尝试均失败")
-            
-        return None, None
-
     def _initialize_camera(self):
-        """初始化摄像头，尝试不同的摄像头ID和API
+        """初始化摄像头：通过统一的摄像头发现服务打开，默认后端失败时再用OpenCV自动选择的后端
         
         Returns:
             bool: 是否成功初始化摄像头
         """
-        print("\n开始初始化摄像头...")
+        if self.camera_manager is not None:
+            print(f"使用摄像头管理器提供的共享帧，视频源: {self.camera_manager.source_id}")
+            self.api_preference = "camera_manager"
+            if not self.camera_manager.start():
+                print(f"摄像头管理器 {self.camera_manager.source_id} 启动失败")
+                return False
+            # 按检测帧率上限订阅，由摄像头管理器抽帧
+            self.camera_manager.register_consumer("detection_service", fps=DETECTION_MAX_FPS, with_queue=False)
+            return True
         
-        # 如果指定了摄像头ID，优先尝试
-        if self.camera_id is not None:
-            print(f"尝试使用指定的摄像头ID: {self.camera_id}")
-            cap, api = self._try_camera_apis(self.camera_id)
-            if cap is not None:
-                self.cap = cap
-                self.api_preference = api
-                print(f"成功初始化指定的摄像头 {self.camera_id}")
-                return True
-            print("指定的摄像头初始化失败，尝试其他摄像头...")
-            
-        # 尝试常用的摄像头索引
-        camera_ids = [0, 1, 2, 3, 4]
-        for camera_id in camera_ids:
-            print(f"\n尝试摄像头索引 {camera_id}...")
-            cap, api = self._try_camera_apis(camera_id)
-            if cap is not None:
-                self.cap = cap
-                self.camera_id = camera_id
-                self.api_preference = api
-                print(f"成功初始化摄像头索引 {camera_id}")
-                return True
-                
-        # 尝试设备文件路径
-        print("\n尝试通过设备文件路径查找摄像头...")
-        import glob
-        device_paths = glob.glob('/dev/video[0-9]*')
-        for device_path in sorted(device_paths):
-            if device_path.endswith(('dec0', 'enc0')):  # 跳过编解码器设备
-                print(f"跳过编解码器设备: {device_path}")
-                continue
-                
-            print(f"\n尝试设备路径: {device_path}")
-            cap, api = self._try_camera_apis(device_path)
+        print("\n开始初始化摄像头...")
+        discovery = get_camera_discovery()
+        for api_id, api_name in [(None, "默认"), (cv2.CAP_ANY, "ANY")]:
+            cap, profile = discovery.open(preferred=self.camera_id, api=api_id)
             if cap is not None:
                 self.cap = cap
-                self.camera_id = device_path
-                self.api_preference = api
-                print(f"成功通过设备路径初始化摄像头: {device_path}")
+                self.camera_id = profile.device
+                self.api_preference = api_name
+                print(f"成功初始化摄像头 {profile.device}（API: {api_name}）")
                 return True
                 
         print("\n无法找到可用的摄像头")
         return False
     
+    def _read_frame(self):
+        """
+        读取一帧：有摄像头管理器时等待其共享的新帧，否则直接读取摄像头
+        
+        Returns:
+            tuple: (是否成功, 帧图像)
+        """
+        if self.camera_manager is None:
+            return self.cap.read()
+        frame_ref = self.camera_manager.wait_for_frame(
+            self._last_frame_seq, timeout=1.0, consumer_id="detection_service")
+        if frame_ref is None:
+            return False, None
+        with frame_ref:
+            self._last_frame_seq = frame_ref.seq
+            # 推理线程池异步持有帧，需要独立副本
+            return True, frame_ref.copy()
+    
     def _is_low_performance_device(self):
         """检测当前设备是否为低性能设备，用于优化模型推理参数
         
@@ -352,10 +291,12 @@ class DetectionService:
                     self.detector.cleanup()
                 self.detector = None
             
-            # 释放摄像头资源
+            # 释放摄像头资源（共享的摄像头管理器由其所有者负责停止，这里只注销消费者）
             if hasattr(self, 'cap') and self.cap:
                 self.cap.release()
                 self.cap = None
+            if getattr(self, 'camera_manager', None) is not None:
+                self.camera_manager.unregister_consumer("detection_service")
             
             # 重置状态
             self.initialized = False
@@ -407,7 +348,7 @@ class DetectionService:
                 
                 # 预热检测器
                 print("预热检测器...")
-                ret, frame = self.cap.read()
+                ret, frame = self._read_frame()
                 if ret:
                     self.detector.put(frame)
                     result, success = self.detector.get()
@@ -531,7 +472,7 @@ class DetectionService:
         while self.detector and self.detector.running:
             try:
                 # 获取一帧图像
-                ret, frame = self.cap.read()
+                ret, frame = self._read_frame()
                 if not ret:
                     print("无法获取摄像头帧")
                     time.sleep(0.01)
@@ -0,0 +1,132 @@
+"""
+姿势引导的面部区域模块
+
+姿势模型已经给出鼻子、眼睛、耳朵和嘴角的位置，据此估计面部方框（加边距、时间平滑），
+面部网格（FaceMesh）只需处理这一小块裁剪画面，不必每帧扫描整幅图像。
+姿势与面部网格并行推理时，当前帧的姿势结果尚未得出，方框由上一帧的姿势关键点估计，
+边距足以覆盖相邻两帧之间的头部移动。
+"""
+import logging
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from config import FACE_ROI_SCALE, FACE_ROI_SMOOTHING, FACE_ROI_MIN_SIZE, FACE_ROI_MAX_FRACTION
+except ImportError:
+    FACE_ROI_SCALE = 2.2
+    FACE_ROI_SMOOTHING = 0.6
+    FACE_ROI_MIN_SIZE = 112
+    FACE_ROI_MAX_FRACTION = 0.8
+
+logger = logging.getLogger(__name__)
+
+# 姿势关键点中属于面部的部分：鼻子、双眼（内/中/外）、双耳、嘴角（MediaPipe Pose 0-10）
+FACE_POSE_LANDMARKS = tuple(range(11))
+# 面部关键点的最低可见度
+FACE_ROI_MIN_VISIBILITY = 0.5
+# 估计方框至少需要的可见面部关键点数
+FACE_ROI_MIN_POINTS = 3
+
+Roi = Tuple[int, int, int, int]
+
+
+class FaceRoiTracker:
+    """
+    由姿势关键点估计面部裁剪区域
+
+    方框为正方形（避免面部网格输入变形），边长为面部关键点跨度乘以 scale，
+    中心和边长按指数平滑，头部大幅移动时直接跳到新位置。
+    """
+    def __init__(self, scale: float = FACE_ROI_SCALE, smoothing: float = FACE_ROI_SMOOTHING,
+                 min_size: int = FACE_ROI_MIN_SIZE, max_fraction: float = FACE_ROI_MAX_FRACTION):
+        """
+        Args:
+            scale: 方框边长相对面部关键点跨度的倍数（覆盖额头、下巴和帧间移动）
+            smoothing: 新位置的权重（0-1），越小越平稳
+            min_size: 方框最小边长（像素）
+            max_fraction: 方框边长超过画面短边的该比例时不裁剪，直接处理整帧
+        """
+        self.scale = scale
+        self.smoothing = smoothing
+        self.min_size = min_size
+        self.max_fraction = max_fraction
+        self._box: Optional[np.ndarray] = None  # 平滑后的 (中心x, 中心y, 边长)，像素
+        self._skip_next = False  # 上一帧裁剪未命中，下一帧处理整帧
+
+        self.stats = {
+            'cropped': 0,      # 给出裁剪区域的帧数
+            'full_frame': 0,   # 没有可用姿势关键点、面部过大或裁剪未命中后处理整帧的帧数
+            'misses': 0,       # 面部网格在裁剪区域内没有找到面部的次数
+            'jumps': 0         # 头部大幅移动、方框不平滑直接跳转的次数
+        }
+
+    def reset(self):
+        """丢弃平滑状态"""
+        self._box = None
+        self._skip_next = False
+
+    def miss(self):
+        """面部网格在裁剪区域内没有找到面部：丢弃平滑的方框，下一帧改为处理整帧"""
+        self.stats['misses'] += 1
+        self.reset()
+        self._skip_next = True
+
+    def update(self, pose_landmarks, frame_shape: Sequence[int]) -> Optional[Roi]:
+        """
+        由姿势关键点更新面部方框
+
+        Args:
+            pose_landmarks: 姿势关键点（NormalizedLandmarkList），None表示没有检测到人
+            frame_shape: 帧形状 (高, 宽, ...)
+
+        Returns:
+            裁剪区域 (x0, y0, x1, y1)，像素坐标；不适合裁剪时返回None
+        """
+        h, w = frame_shape[:2]
+        box = None if self._skip_next else self._estimate(pose_landmarks, w, h)
+        self._skip_next = False
+        if box is None:
+            self.reset()
+            self.stats['full_frame'] += 1
+            return None
+
+        if self._box is None or np.hypot(*(box[:2] - self._box[:2])) > self._box[2] / 2:
+            if self._box is not None:
+                self.stats['jumps'] += 1
+            self._box = box
+        else:
+            self._box = self._box + self.smoothing * (box - self._box)
+
+        cx, cy, side = self._box
+        side = max(side, self.min_size)
+        if side > self.max_fraction * min(w, h):
+            self.stats['full_frame'] += 1
+            return None
+
+        half = side / 2
+        x0 = int(round(min(max(cx - half, 0), w - side)))
+        y0 = int(round(min(max(cy - half, 0), h - side)))
+        self.stats['cropped'] += 1
+        return x0, y0, x0 + int(round(side)), y0 + int(round(side))
+
+    def _estimate(self, pose_landmarks, w: int, h: int) -> Optional[np.ndarray]:
+        """本帧面部方框的 (中心x, 中心y, 边长)，可见面部关键点不足时返回None"""
+        if not pose_landmarks:
+            return None
+        landmarks = pose_landmarks.landmark
+        points = np.array([(landmarks[i].x * w, landmarks[i].y * h) for i in FACE_POSE_LANDMARKS
+                           if landmarks[i].visibility >= FACE_ROI_MIN_VISIBILITY])
+        if len(points) < FACE_ROI_MIN_POINTS:
+            return None
+        low, high = points.min(axis=0), points.max(axis=0)
+        span = max(high[0] - low[0], high[1] - low[1])
+        center = (low + high) / 2
+        return np.array([center[0], center[1], span * self.scale])
+
+    def get_status(self) -> dict:
+        box = self._box
+        return {
+            'box': [round(float(v), 1) for v in box] if box is not None else None,
+            **self.stats
+        }
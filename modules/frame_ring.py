@@ -0,0 +1,269 @@
+"""
+帧环形缓冲区模块 - 为摄像头帧提供预分配、引用计数的共享存储
+
+摄像头每捕获一帧只写入一次环形缓冲区（捕获线程可通过 reserve()/commit() 直接读入
+预分配槽位），所有消费者借用同一块内存的只读视图，分发成本与消费者数量无关。
+需要修改图像的消费者应显式调用 FrameRef.copy()。
+"""
+import threading
+import time
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class FrameRef:
+    """
+    环形缓冲区中一帧的借用句柄，同时作为帧信封携带元数据
+
+    image 为只读视图；持有者用完后必须调用 release()（或使用 with 语句），
+    否则该槽位不会被复用。需要把帧传给另一个持有者时先调用 retain()。
+
+    Attributes:
+        seq: 帧序号（单调递增，从1开始）
+        capture_time: 捕获时刻（time.monotonic()）
+        source_id: 视频源标识
+    """
+    __slots__ = ('_ring', '_slot', 'seq', 'image', 'capture_time', 'source_id')
+
+    def __init__(self, ring: 'FrameRing', slot: int, seq: int, image: np.ndarray,
+                 capture_time: float, source_id: str = ''):
+        self._ring = ring
+        self._slot = slot
+        self.seq = seq
+        self.image = image
+        self.capture_time = capture_time
+        self.source_id = source_id
+
+    def retain(self) -> 'FrameRef':
+        """增加一次引用，返回自身便于链式调用"""
+        self._ring._retain(self._slot, self.seq)
+        return self
+
+    def release(self):
+        """释放一次引用"""
+        self._ring._release(self._slot, self.seq)
+
+    def copy(self) -> np.ndarray:
+        """返回可写的独立副本（仅在需要修改图像时使用）"""
+        return self.image.copy()
+
+    @property
+    def shape(self):
+        return self.image.shape
+
+    def age(self) -> float:
+        """距捕获时刻经过的秒数"""
+        return time.monotonic() - self.capture_time
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def __repr__(self):
+        return f"FrameRef(seq={self.seq}, source={self.source_id!r}, slot={self._slot}, shape={self.image.shape})"
+
+
+class FrameRing:
+    """
+    预分配的帧环形缓冲区
+
+    每个槽位维护引用计数，写入时只选择引用计数为0的槽位；
+    若所有槽位都被占用（消费者处理过慢），则临时扩容一个槽位，避免覆盖正在使用的帧。
+    """
+    def __init__(self, capacity: int = 4, frame_shape=(480, 640, 3), dtype=np.uint8, max_capacity: int = 64):
+        """
+        初始化环形缓冲区
+
+        Args:
+            capacity: 初始槽位数量
+            frame_shape: 预分配帧的形状 (高, 宽, 通道)
+            dtype: 像素数据类型
+            max_capacity: 允许扩容到的最大槽位数
+        """
+        self.dtype = dtype
+        self.max_capacity = max(capacity, max_capacity)
+        self._lock = threading.Lock()
+        self._buffers: List[np.ndarray] = [np.empty(frame_shape, dtype=dtype) for _ in range(capacity)]
+        self._refcounts: List[int] = [0] * capacity
+        self._slot_seq: List[int] = [-1] * capacity
+        self._cursor = 0
+        self._seq = 0
+        self._latest: Optional[FrameRef] = None
+
+        # 统计信息
+        self.stats = {
+            'published': 0,
+            'grown_slots': 0,
+            'reallocated_slots': 0,
+            'overwrites_blocked': 0,
+            'reserved': 0,           # 借出给捕获线程直接写入的次数
+            'in_place_writes': 0,    # 直接写入槽位、无需拷贝的帧数
+            'copied_writes': 0       # 需要拷贝进槽位的帧数
+        }
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buffers)
+
+    @property
+    def latest_seq(self) -> int:
+        """最新一帧的序号，尚无帧时为0"""
+        return self._seq
+
+    def _find_free_slot(self) -> int:
+        """查找引用计数为0的槽位（调用方需持有锁）"""
+        n = len(self._buffers)
+        for offset in range(n):
+            idx = (self._cursor + offset) % n
+            if self._refcounts[idx] == 0:
+                self._cursor = (idx + 1) % n
+                return idx
+
+        # 所有槽位都在被借用，扩容一个槽位
+        self.stats['overwrites_blocked'] += 1
+        if n >= self.max_capacity:
+            raise RuntimeError(f"帧环形缓冲区已达到最大容量 {self.max_capacity}，存在未释放的帧引用")
+        shape = self._buffers[0].shape if n else (0,)
+        self._buffers.append(np.empty(shape, dtype=self.dtype))
+        self._refcounts.append(0)
+        self._slot_seq.append(-1)
+        self.stats['grown_slots'] += 1
+        logger.warning(f"帧环形缓冲区槽位全部被占用，扩容至 {n + 1} 个槽位")
+        return n
+
+    def publish(self, frame: np.ndarray, capture_time: Optional[float] = None, source_id: str = '',
+                seq: Optional[int] = None) -> FrameRef:
+        """
+        将一帧写入环形缓冲区并设为最新帧
+
+        Args:
+            frame: 摄像头捕获的原始帧
+            capture_time: 捕获时刻（time.monotonic()），默认为当前时刻
+            source_id: 视频源标识
+            seq: 指定帧序号（派生帧沿用源帧序号），默认自动递增
+
+        Returns:
+            最新帧的句柄（由缓冲区自身持有一次引用，调用方无需释放）
+        """
+        with self._lock:
+            idx = self._find_free_slot()
+            self._write_slot(idx, frame)
+            return self._commit_slot(idx, capture_time, source_id, seq)
+
+    def reserve(self) -> Tuple[int, np.ndarray]:
+        """
+        借出一个空闲槽位的可写缓冲区，供捕获线程直接读入（如 cap.read(image=buf)）
+
+        借出的槽位在 commit() 或 cancel() 之前不会被其他帧复用。
+
+        Returns:
+            (槽位索引, 可写缓冲区)
+        """
+        with self._lock:
+            idx = self._find_free_slot()
+            self._refcounts[idx] = 1
+            self._slot_seq[idx] = -1
+            self.stats['reserved'] += 1
+            return idx, self._buffers[idx]
+
+    def commit(self, slot: int, frame: Optional[np.ndarray] = None, capture_time: Optional[float] = None,
+               source_id: str = '', seq: Optional[int] = None) -> FrameRef:
+        """
+        将借出的槽位发布为最新帧
+
+        Args:
+            slot: reserve() 返回的槽位索引
+            frame: 实际读到的帧；为None或与槽位缓冲区共享内存时无需拷贝，
+                   否则（如读取时尺寸变化导致重新分配）拷贝进槽位
+            capture_time: 捕获时刻（time.monotonic()），默认为当前时刻
+            source_id: 视频源标识
+            seq: 指定帧序号，默认自动递增
+
+        Returns:
+            最新帧的句柄（由缓冲区自身持有一次引用，调用方无需释放）
+        """
+        with self._lock:
+            if frame is None or np.shares_memory(frame, self._buffers[slot]):
+                self.stats['in_place_writes'] += 1
+            else:
+                self._write_slot(slot, frame)
+            return self._commit_slot(slot, capture_time, source_id, seq)
+
+    def cancel(self, slot: int):
+        """归还借出但未发布的槽位（如读取失败）"""
+        with self._lock:
+            if self._slot_seq[slot] == -1:
+                self._refcounts[slot] = 0
+
+    def _write_slot(self, idx: int, frame: np.ndarray):
+        """把帧拷贝进槽位，尺寸或类型不符时重新分配（调用方需持有锁）"""
+        buf = self._buffers[idx]
+        if buf.shape != frame.shape or buf.dtype != frame.dtype:
+            buf = np.empty(frame.shape, dtype=frame.dtype)
+            self._buffers[idx] = buf
+            self.stats['reallocated_slots'] += 1
+        np.copyto(buf, frame)
+        self.stats['copied_writes'] += 1
+
+    def _commit_slot(self, idx: int, capture_time: Optional[float], source_id: str,
+                     seq: Optional[int]) -> FrameRef:
+        """把已写入的槽位设为最新帧（调用方需持有锁）"""
+        self._seq = self._seq + 1 if seq is None else seq
+        view = self._buffers[idx].view()
+        view.flags.writeable = False
+        if capture_time is None:
+            capture_time = time.monotonic()
+        ref = FrameRef(self, idx, self._seq, view, capture_time, source_id)
+
+        # 缓冲区持有最新帧的一次引用，替换时释放旧的
+        self._refcounts[idx] = 1
+        self._slot_seq[idx] = self._seq
+        previous = self._latest
+        self._latest = ref
+        if previous is not None:
+            self._refcounts[previous._slot] -= 1
+
+        self.stats['published'] += 1
+        return ref
+
+    def acquire_latest(self) -> Optional[FrameRef]:
+        """借用最新帧，调用方用完后需 release()"""
+        with self._lock:
+            ref = self._latest
+            if ref is None:
+                return None
+            self._refcounts[ref._slot] += 1
+            return ref
+
+    def _retain(self, slot: int, seq: int):
+        with self._lock:
+            if self._slot_seq[slot] != seq:
+                raise RuntimeError(f"帧 {seq} 已被回收，无法再次借用")
+            self._refcounts[slot] += 1
+
+    def _release(self, slot: int, seq: int):
+        with self._lock:
+            if self._slot_seq[slot] != seq or self._refcounts[slot] <= 0:
+                logger.warning(f"重复释放帧 {seq}（槽位 {slot}）")
+                return
+            self._refcounts[slot] -= 1
+
+    def get_status(self) -> dict:
+        """获取缓冲区占用情况"""
+        with self._lock:
+            in_use = sum(1 for c in self._refcounts if c > 0)
+            return {
+                'capacity': len(self._buffers),
+                'slots_in_use': in_use,
+                'occupancy': round(in_use / len(self._buffers), 2) if self._buffers else 0,
+                'bytes_allocated': sum(buf.nbytes for buf in self._buffers),
+                'latest_seq': self._seq,
+                **self.stats
+            }
@@ -0,0 +1,99 @@
+"""
+并行推理执行器
+
+姿势分析的每一帧需要运行多个相互独立的模型（MediaPipe Pose 与 FaceMesh）。
+ParallelInference 为每个模型固定一个工作线程，同一帧的各模型同时提交、全部完成后合并结果；
+MediaPipe 在图执行期间释放GIL，各模型可在多核上真正并行，单帧延迟接近最慢的模型而不是各模型之和。
+每个模型始终在同一线程上按帧序依次调用，模型实例及其跟踪/平滑状态不会被并发访问。
+"""
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# 统计耗时的最近帧数
+INFERENCE_TIMING_WINDOW = 100
+
+
+class ParallelInference:
+    """
+    按模型划分工作线程的推理执行器
+
+    各任务是形如 task(*args) 的可调用对象，run() 以相同参数调用全部任务并返回 {任务名: 结果}。
+    调用者需保证参数（如借用的帧）在 run() 返回前有效，run() 返回时所有任务都已结束。
+    """
+    def __init__(self, tasks: Dict[str, Callable[..., Any]], parallel: bool = True,
+                 name: str = 'inference'):
+        """
+        Args:
+            tasks: {任务名: 可调用对象}，按插入顺序执行（串行模式）或提交（并行模式）
+            parallel: 是否并行；False 时在调用线程中依次执行
+            name: 工作线程名前缀
+        """
+        self.tasks = dict(tasks)
+        self.parallel = parallel and len(self.tasks) > 1
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        if self.parallel:
+            self._executors = {
+                task: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-{task}")
+                for task in self.tasks
+            }
+        self._task_times = {task: deque(maxlen=INFERENCE_TIMING_WINDOW) for task in self.tasks}
+        self._wall_times = deque(maxlen=INFERENCE_TIMING_WINDOW)
+        self.frames = 0
+
+    def _timed(self, task: str, *args):
+        start = time.perf_counter()
+        try:
+            return self.tasks[task](*args)
+        finally:
+            self._task_times[task].append(time.perf_counter() - start)
+
+    def run(self, *args) -> Dict[str, Any]:
+        """
+        对同一帧运行全部任务
+
+        Returns:
+            {任务名: 结果}；任务抛出的异常在此重新抛出（其余任务仍会先执行完）
+        """
+        start = time.perf_counter()
+        if self.parallel:
+            futures = {task: self._executors[task].submit(self._timed, task, *args) for task in self.tasks}
+            # 先等待全部完成再取结果，保证返回时没有任务仍在使用参数
+            for future in futures.values():
+                future.exception()
+            results = {task: future.result() for task, future in futures.items()}
+        else:
+            results = {task: self._timed(task, *args) for task in self.tasks}
+        self._wall_times.append(time.perf_counter() - start)
+        self.frames += 1
+        return results
+
+    def shutdown(self, wait: bool = True):
+        """停止工作线程"""
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait)
+        self._executors = {}
+        self.parallel = False
+
+    def get_status(self) -> dict:
+        """
+        各任务与整帧的平均耗时，以及并发度（各任务耗时之和 / 整帧耗时）
+
+        CPU核心不足时各任务会因争用而变慢，并发度高但整帧耗时不降，需结合 frame_ms_avg 判断。
+        """
+        def avg_ms(times) -> float:
+            return sum(times) / len(times) * 1000 if times else 0.0
+
+        task_ms = {task: round(avg_ms(times), 2) for task, times in self._task_times.items()}
+        wall_ms = avg_ms(self._wall_times)
+        return {
+            'parallel': self.parallel,
+            'frames': self.frames,
+            'task_ms_avg': task_ms,
+            'frame_ms_avg': round(wall_ms, 2),
+            'concurrency': round(sum(task_ms.values()) / wall_ms, 2) if wall_ms else 0.0
+        }
@@ -0,0 +1,262 @@
+"""
+JPEG编码模块
+
+统一的JPEG编码入口，支持多种编码后端：
+    - cv2: OpenCV 自带的 libjpeg（始终可用）
+    - turbojpeg: PyTurboJPEG（libjpeg-turbo），支持快速DCT和色度抽样设置
+    - simplejpeg: simplejpeg（libjpeg-turbo），支持快速DCT和色度抽样设置
+配置为 'auto' 时，首次使用（应用启动时预热）对可用后端做一次简短的基准测试，选用最快的后端。
+所有编码点通过 encode_jpeg() 编码，后端出错时自动回退到OpenCV。
+"""
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+try:
+    from config import JPEG_ENCODER, JPEG_FAST_DCT, JPEG_SUBSAMPLING
+except ImportError:
+    JPEG_ENCODER = 'auto'
+    JPEG_FAST_DCT = True
+    JPEG_SUBSAMPLING = '420'
+
+try:
+    import turbojpeg
+    TURBOJPEG_AVAILABLE = True
+except ImportError:
+    TURBOJPEG_AVAILABLE = False
+
+try:
+    import simplejpeg
+    SIMPLEJPEG_AVAILABLE = True
+except ImportError:
+    SIMPLEJPEG_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 基准测试参数：画面尺寸、质量、每个后端的编码次数
+BENCHMARK_SIZE = (640, 480)
+BENCHMARK_QUALITY = 85
+BENCHMARK_ROUNDS = 10
+
+SUBSAMPLING_OPTIONS = ('444', '422', '420')
+
+
+class JpegEncoder:
+    """JPEG编码后端基类：encode() 接收BGR图像，返回JPEG字节，失败返回None"""
+    name = 'base'
+
+    def __init__(self, fast_dct: bool = JPEG_FAST_DCT, subsampling: str = JPEG_SUBSAMPLING):
+        if subsampling not in SUBSAMPLING_OPTIONS:
+            raise ValueError(f"不支持的色度抽样: {subsampling}")
+        self.fast_dct = fast_dct
+        self.subsampling = subsampling
+
+    def encode(self, image: np.ndarray, quality: int = 85) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(fast_dct={self.fast_dct}, subsampling={self.subsampling!r})"
+
+
+class OpenCVEncoder(JpegEncoder):
+    """OpenCV libjpeg编码（OpenCV不支持快速DCT，色度抽样需要 OpenCV >= 4.5.5）"""
+    name = 'cv2'
+
+    _SAMPLING_FLAGS = {
+        '444': 'IMWRITE_JPEG_SAMPLING_FACTOR_444',
+        '422': 'IMWRITE_JPEG_SAMPLING_FACTOR_422',
+        '420': 'IMWRITE_JPEG_SAMPLING_FACTOR_420',
+    }
+
+    def __init__(self, fast_dct: bool = JPEG_FAST_DCT, subsampling: str = JPEG_SUBSAMPLING):
+        super().__init__(fast_dct, subsampling)
+        self._extra_params: List[int] = []
+        if hasattr(cv2, 'IMWRITE_JPEG_SAMPLING_FACTOR'):
+            self._extra_params = [int(cv2.IMWRITE_JPEG_SAMPLING_FACTOR),
+                                  int(getattr(cv2, self._SAMPLING_FLAGS[subsampling]))]
+
+    def encode(self, image: np.ndarray, quality: int = 85) -> Optional[bytes]:
+        success, buffer = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)] + self._extra_params)
+        return buffer.tobytes() if success else None
+
+
+class TurboJPEGEncoder(JpegEncoder):
+    """PyTurboJPEG（libjpeg-turbo）编码"""
+    name = 'turbojpeg'
+
+    def __init__(self, fast_dct: bool = JPEG_FAST_DCT, subsampling: str = JPEG_SUBSAMPLING):
+        super().__init__(fast_dct, subsampling)
+        self._jpeg = turbojpeg.TurboJPEG()
+        self._subsample = {'444': turbojpeg.TJSAMP_444, '422': turbojpeg.TJSAMP_422,
+                           '420': turbojpeg.TJSAMP_420}[subsampling]
+        self._flags = turbojpeg.TJFLAG_FASTDCT if fast_dct else 0
+
+    def encode(self, image: np.ndarray, quality: int = 85) -> Optional[bytes]:
+        return self._jpeg.encode(image, quality=int(quality), pixel_format=turbojpeg.TJPF_BGR,
+                                 jpeg_subsample=self._subsample, flags=self._flags)
+
+
+class SimpleJPEGEncoder(JpegEncoder):
+    """simplejpeg（libjpeg-turbo）编码，要求C连续的图像"""
+    name = 'simplejpeg'
+
+    def encode(self, image: np.ndarray, quality: int = 85) -> Optional[bytes]:
+        return simplejpeg.encode_jpeg(np.ascontiguousarray(image), quality=int(quality), colorspace='BGR',
+                                      colorsubsampling=self.subsampling, fastdct=self.fast_dct)
+
+
+ENCODER_CLASSES = {
+    'cv2': OpenCVEncoder,
+    'turbojpeg': TurboJPEGEncoder,
+    'simplejpeg': SimpleJPEGEncoder,
+}
+
+
+def available_encoders() -> List[str]:
+    """当前环境可用的编码后端名称"""
+    names = ['cv2']
+    if TURBOJPEG_AVAILABLE:
+        names.append('turbojpeg')
+    if SIMPLEJPEG_AVAILABLE:
+        names.append('simplejpeg')
+    return names
+
+
+def _benchmark_image() -> np.ndarray:
+    """基准测试用画面：渐变背景叠加噪声，接近摄像头画面的压缩难度"""
+    w, h = BENCHMARK_SIZE
+    gradient = np.linspace(0, 255, w, dtype=np.float32)[None, :, None]
+    image = np.broadcast_to(gradient, (h, w, 3)).copy()
+    image += np.random.default_rng(0).normal(0, 12, (h, w, 3))
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def benchmark_encoders(names: Optional[List[str]] = None, rounds: int = BENCHMARK_ROUNDS,
+                       fast_dct: bool = JPEG_FAST_DCT, subsampling: str = JPEG_SUBSAMPLING) -> Dict[str, dict]:
+    """
+    对编码后端做基准测试
+
+    Returns:
+        {后端名称: {'ms': 单帧编码耗时中位数, 'bytes': 输出大小}}，初始化或编码失败的后端记录 'error'
+    """
+    image = _benchmark_image()
+    results: Dict[str, dict] = {}
+    for name in names or available_encoders():
+        try:
+            encoder = ENCODER_CLASSES[name](fast_dct, subsampling)
+            data = encoder.encode(image, BENCHMARK_QUALITY)  # 预热
+            if not data:
+                raise RuntimeError("编码结果为空")
+            times = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                encoder.encode(image, BENCHMARK_QUALITY)
+                times.append(time.perf_counter() - start)
+            results[name] = {'ms': round(sorted(times)[len(times) // 2] * 1000, 3), 'bytes': len(data)}
+        except Exception as e:
+            results[name] = {'error': str(e)}
+    return results
+
+
+_encoder: Optional[JpegEncoder] = None
+_fallback = OpenCVEncoder()
+_encoder_lock = threading.Lock()
+_encoder_info: dict = {}
+
+
+def select_encoder(preferred: str = JPEG_ENCODER, fast_dct: bool = JPEG_FAST_DCT,
+                   subsampling: str = JPEG_SUBSAMPLING) -> JpegEncoder:
+    """
+    选择编码后端
+
+    Args:
+        preferred: 'auto'（基准测试选最快）或后端名称；指定的后端不可用时回退到自动选择
+        fast_dct: libjpeg-turbo后端是否使用快速DCT
+        subsampling: 色度抽样 '444' / '422' / '420'
+
+    Returns:
+        选中的编码后端，同时成为 encode_jpeg() 使用的后端
+    """
+    with _encoder_lock:
+        return _select_encoder(preferred, fast_dct, subsampling)
+
+
+def _select_encoder(preferred: str, fast_dct: bool, subsampling: str) -> JpegEncoder:
+    """select_encoder() 的实现，调用方持有 _encoder_lock，同一时间只有一次选择与基准测试"""
+    global _encoder, _encoder_info
+    candidates = available_encoders()
+    benchmark: Dict[str, dict] = {}
+    if preferred != 'auto' and preferred in candidates:
+        name = preferred
+    else:
+        if preferred != 'auto':
+            logger.warning(f"JPEG编码后端 {preferred} 不可用，改为自动选择")
+        benchmark = benchmark_encoders(candidates, fast_dct=fast_dct, subsampling=subsampling)
+        timed = {n: r['ms'] for n, r in benchmark.items() if 'ms' in r}
+        name = min(timed, key=timed.get) if timed else 'cv2'
+
+    try:
+        encoder = ENCODER_CLASSES[name](fast_dct, subsampling)
+    except Exception as e:
+        logger.error(f"初始化JPEG编码后端 {name} 失败，使用OpenCV: {str(e)}")
+        encoder = OpenCVEncoder(fast_dct, subsampling)
+
+    _encoder = encoder
+    _encoder_info = {
+        'encoder': encoder.name,
+        'preferred': preferred,
+        'available': candidates,
+        'fast_dct': fast_dct,
+        'subsampling': subsampling,
+        'benchmark': benchmark,
+        'fallbacks': 0
+    }
+    logger.info(f"JPEG编码后端: {encoder.name}" + (f"（基准测试: {benchmark}）" if benchmark else ""))
+    return encoder
+
+
+def get_jpeg_encoder() -> JpegEncoder:
+    """获取当前编码后端，首次调用时完成选择（应用启动时调用以预热）"""
+    encoder = _encoder
+    if encoder is not None:
+        return encoder
+    with _encoder_lock:
+        # 多个线程同时首次编码时只选择一次，其余线程等待并直接使用选择结果
+        if _encoder is None:
+            return _select_encoder(JPEG_ENCODER, JPEG_FAST_DCT, JPEG_SUBSAMPLING)
+        return _encoder
+
+
+def encode_jpeg(image: np.ndarray, quality: int = 85) -> Optional[bytes]:
+    """
+    用当前编码后端把BGR图像编码为JPEG
+
+    Args:
+        image: BGR图像（灰度图等其他格式由OpenCV编码）
+        quality: JPEG质量 1-100
+
+    Returns:
+        JPEG字节；编码失败返回None
+    """
+    encoder = get_jpeg_encoder()
+    if isinstance(encoder, OpenCVEncoder):
+        return encoder.encode(image, quality)
+    if image.ndim == 3 and image.shape[2] == 3:
+        try:
+            data = encoder.encode(image, quality)
+            if data:
+                return data
+        except Exception as e:
+            logger.debug(f"{encoder.name} 编码失败，回退到OpenCV: {str(e)}")
+        _encoder_info['fallbacks'] = _encoder_info.get('fallbacks', 0) + 1
+    return _fallback.encode(image, quality)
+
+
+def get_encoder_status() -> dict:
+    """当前编码后端、可用后端与基准测试结果"""
+    get_jpeg_encoder()
+    return dict(_encoder_info)
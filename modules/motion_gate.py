@@ -0,0 +1,102 @@
+"""
+运动门控模块
+
+孩子在书桌前静坐时，连续几分钟的画面几乎一样，每帧都跑姿势和面部网格两个模型并无必要。
+运动门控在推理之前比较缩小后的灰度图与上一次推理所用画面的平均绝对差（SAD），
+差异低于阈值时沿用上一次的分析结果；沿用时间有上限，到期后即使画面不变也重新推理一次，
+保证坐姿计时、情绪平滑等依赖新结果的逻辑不会长时间停滞。
+"""
+import time
+import logging
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    from config import MOTION_GATE_SIZE, MOTION_GATE_THRESHOLD, MOTION_GATE_MAX_REUSE_S
+except ImportError:
+    MOTION_GATE_SIZE = (64, 48)
+    MOTION_GATE_THRESHOLD = 2.0
+    MOTION_GATE_MAX_REUSE_S = 2.0
+
+logger = logging.getLogger(__name__)
+
+
+class MotionGate:
+    """
+    基于缩小灰度图帧差的推理门控
+
+    参考画面是上一次实际推理的画面而不是上一帧，缓慢的渐变（如慢慢低头）累积超过阈值后同样会触发推理。
+    """
+    def __init__(self, threshold: float = MOTION_GATE_THRESHOLD,
+                 max_reuse_s: float = MOTION_GATE_MAX_REUSE_S,
+                 size: Tuple[int, int] = MOTION_GATE_SIZE):
+        """
+        Args:
+            threshold: 平均绝对差阈值（灰度级，0-255），低于该值视为画面未变化
+            max_reuse_s: 沿用结果的最长时间（秒），0表示不限制
+            size: 比较用灰度图的尺寸 (宽, 高)
+        """
+        self.threshold = threshold
+        self.max_reuse_s = max_reuse_s
+        self.size = tuple(size)
+        self._reference: Optional[np.ndarray] = None
+        self._reference_time = 0.0
+        self.last_diff = 0.0
+
+        self.stats = {
+            'frames': 0,
+            'processed': 0,      # 需要推理的帧数
+            'gated': 0,          # 沿用上一次结果的帧数
+            'forced': 0          # 画面未变化但沿用超时而重新推理的帧数
+        }
+
+    def reset(self):
+        """丢弃参考画面，下一帧必定推理"""
+        self._reference = None
+
+    def should_process(self, small_gray: np.ndarray) -> bool:
+        """
+        判断这一帧是否需要推理
+
+        Args:
+            small_gray: 缩小到 size 的灰度图（只读）
+
+        Returns:
+            True 需要推理（画面变化、沿用超时或尚无参考画面），False 可沿用上一次的结果
+        """
+        now = time.monotonic()
+        self.stats['frames'] += 1
+        reference = self._reference
+        if reference is None or reference.shape != small_gray.shape:
+            self.last_diff = 0.0
+            return self._accept(small_gray, now)
+
+        self.last_diff = float(cv2.absdiff(small_gray, reference).mean())
+        if self.last_diff >= self.threshold:
+            return self._accept(small_gray, now)
+        if self.max_reuse_s and now - self._reference_time >= self.max_reuse_s:
+            self.stats['forced'] += 1
+            return self._accept(small_gray, now)
+
+        self.stats['gated'] += 1
+        return False
+
+    def _accept(self, small_gray: np.ndarray, now: float) -> bool:
+        """以本帧为新的参考画面（拷贝一份，源缓冲区会被复用）"""
+        self._reference = small_gray.copy()
+        self._reference_time = now
+        self.stats['processed'] += 1
+        return True
+
+    def get_status(self) -> dict:
+        frames = self.stats['frames']
+        return {
+            'threshold': self.threshold,
+            'max_reuse_s': self.max_reuse_s,
+            'size': f"{self.size[0]}x{self.size[1]}",
+            'last_diff': round(self.last_diff, 2),
+            'gated_ratio': round(self.stats['gated'] / frames, 3) if frames else 0,
+            **self.stats
+        }
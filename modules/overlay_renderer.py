@@ -0,0 +1,338 @@
+"""
+标注叠加渲染模块
+
+分析线程只按帧序号保存关键点和分析结果（AnalysisRecord），不再为每一帧拷贝画面并绘制标注；
+标注视频流（'pose' / 'emotion'）有人观看时，才由 OverlayRenderer 在对应的已分析帧上合成标注。
+OverlayRenderer 实现视频源接口 wait_for_frame()，登记到流分发中心后与原始视频流一样
+只在有订阅者时编码，并支持按客户端自适应档位。
+"""
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Set, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    from modules.realtime_posture_analysis import mp_pose, mp_face_mesh, mp_drawing, mp_drawing_styles
+    DRAWING_AVAILABLE = True
+except ImportError:
+    DRAWING_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 按帧序号保留的分析结果条数
+ANALYSIS_HISTORY_SIZE = 64
+
+OVERLAY_KINDS = ('pose', 'emotion')
+
+# 坐姿类型对应的标注颜色与文字
+POSTURE_COLORS = {
+    'excellent': (0, 255, 0),   # 绿色
+    'good': (0, 255, 128),      # 浅绿色
+    'fair': (0, 128, 255),      # 橙色
+    'poor': (0, 0, 255)         # 红色
+}
+POSTURE_LABELS = {
+    'excellent': '优秀',
+    'good': '良好',
+    'fair': '一般',
+    'poor': '不良'
+}
+
+
+class AnalysisRecord(NamedTuple):
+    """
+    一帧的分析结果（只有关键点和数值，不含画面）
+
+    pose: 姿势结果，含 landmarks、angle、posture_type、is_occluded、valid_detection、points、last_valid_angle
+    emotion: 情绪结果，含 emotion（EmotionState）、face_landmarks
+    """
+    seq: int
+    capture_time: float
+    source_id: str
+    pose: Dict[str, Any]
+    emotion: Dict[str, Any]
+    process_time: float = 0.0
+    simple_style: bool = False    # 处理帧率低时使用简化绘制
+
+
+class RenderedFrame:
+    """渲染好的标注帧，带与FrameRef相同的帧信封属性，供MJPEGChannel编码"""
+    __slots__ = ('seq', 'image', 'capture_time', 'source_id')
+
+    def __init__(self, seq: int, image: np.ndarray, capture_time: float, source_id: str = ''):
+        self.seq = seq
+        self.image = image
+        self.capture_time = capture_time
+        self.source_id = source_id
+
+    def release(self):
+        """独立副本，无需归还"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+def _release_frame(frame):
+    if frame is not None and hasattr(frame, 'release'):
+        frame.release()
+
+
+class AnalysisStore:
+    """
+    按帧序号保存分析结果
+
+    有标注视频流在观看时（watched 为真），分析线程同时传入该帧画面：FrameRef 只增加引用、不拷贝，
+    仅保留最新一帧供渲染；无人观看时只保存数值结果。
+    """
+    def __init__(self, history: int = ANALYSIS_HISTORY_SIZE):
+        self._history = history
+        self._lock = threading.Lock()
+        self._frame_ready = threading.Condition(self._lock)
+        self._records: 'OrderedDict[int, AnalysisRecord]' = OrderedDict()
+        self._watchers: Set[str] = set()
+        # 最新一帧已分析画面（FrameRef 或只读ndarray）及其序号
+        self._frame = None
+        self._frame_seq = 0
+
+        self.stats = {
+            'records': 0,            # 保存的分析结果条数
+            'frames_retained': 0     # 因有人观看而保留画面的帧数
+        }
+
+    @property
+    def watched(self) -> bool:
+        """是否有标注视频流正在被观看"""
+        return bool(self._watchers)
+
+    @property
+    def latest(self) -> Optional[AnalysisRecord]:
+        with self._lock:
+            if not self._records:
+                return None
+            return next(reversed(self._records.values()))
+
+    def get(self, seq: int) -> Optional[AnalysisRecord]:
+        """按帧序号取分析结果，已淘汰时返回None"""
+        with self._lock:
+            return self._records.get(seq)
+
+    def add_watcher(self, watcher_id: str):
+        with self._lock:
+            if watcher_id not in self._watchers:
+                self._watchers.add(watcher_id)
+                logger.info(f"标注视频流开始观看: {watcher_id}")
+
+    def remove_watcher(self, watcher_id: str):
+        """移除观看者；最后一个观看者离开后释放保留的画面"""
+        frame = None
+        with self._lock:
+            self._watchers.discard(watcher_id)
+            if not self._watchers:
+                frame, self._frame = self._frame, None
+        _release_frame(frame)
+
+    def put(self, record: AnalysisRecord, frame=None):
+        """
+        保存一帧的分析结果
+
+        Args:
+            record: 分析结果
+            frame: 该帧画面（FrameRef 会被retain；ndarray 视为只读），只在 watched 时需要传入
+        """
+        if frame is not None and hasattr(frame, 'retain'):
+            frame.retain()
+        old_frame = None
+        with self._frame_ready:
+            self._records[record.seq] = record
+            while len(self._records) > self._history:
+                self._records.popitem(last=False)
+            self.stats['records'] += 1
+            if frame is not None:
+                old_frame, self._frame, self._frame_seq = self._frame, frame, record.seq
+                self.stats['frames_retained'] += 1
+            self._frame_ready.notify_all()
+        _release_frame(old_frame)
+
+    def wait_for_frame(self, after_seq: int = 0,
+                       timeout: Optional[float] = None) -> Optional[Tuple[AnalysisRecord, Any]]:
+        """
+        等待序号大于after_seq的已分析画面
+
+        Returns:
+            (分析结果, 画面)，画面为FrameRef时调用者用完需release()；超时返回None
+        """
+        with self._frame_ready:
+            if not self._frame_ready.wait_for(
+                    lambda: self._frame is not None and self._frame_seq > after_seq, timeout):
+                return None
+            record = self._records.get(self._frame_seq)
+            frame = self._frame
+            if record is None:
+                return None
+            if hasattr(frame, 'retain'):
+                frame.retain()
+            return record, frame
+
+    def get_status(self) -> dict:
+        with self._lock:
+            return {
+                'watched': bool(self._watchers),
+                'watchers': sorted(self._watchers),
+                'history': len(self._records),
+                'latest_seq': next(reversed(self._records)) if self._records else 0,
+                **self.stats
+            }
+
+
+def draw_pose_overlay(image: np.ndarray, record: AnalysisRecord):
+    """在图像上绘制姿势关键点、状态、角度和处理耗时"""
+    pose = record.pose
+    landmarks = pose.get('landmarks')
+    if landmarks is not None and DRAWING_AVAILABLE:
+        if record.simple_style:
+            mp_drawing.draw_landmarks(
+                image,
+                landmarks,
+                mp_pose.POSE_CONNECTIONS,
+                mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=1, circle_radius=1),
+                mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=1)
+            )
+        else:
+            mp_drawing.draw_landmarks(
+                image,
+                landmarks,
+                mp_pose.POSE_CONNECTIONS,
+                landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style()
+            )
+
+    if landmarks is not None:
+        occluded = pose.get('is_occluded', False)
+        state_text = f"State: {'Occluded' if occluded else 'Tracking'}"
+        color = (0, 0, 255) if occluded else (0, 255, 0)
+        cv2.putText(image, state_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+        angle = pose.get('angle')
+        last_valid_angle = pose.get('last_valid_angle')
+        if angle is not None and pose.get('valid_detection') and not occluded:
+            posture_type = pose.get('posture_type')
+            text = f"Angle: {angle:.1f}° [{POSTURE_LABELS.get(posture_type, '未知')}]"
+            cv2.putText(image, text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6,
+                        POSTURE_COLORS.get(posture_type, (0, 0, 255)), 2)
+            points = pose.get('points')
+            if points:
+                cv2.line(image, tuple(points['mid_shoulder']), tuple(points['nose']), (0, 255, 0), 2)
+        elif occluded and last_valid_angle:
+            text = f"Occluded | Last: {last_valid_angle:.1f}°"
+            cv2.putText(image, text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+
+    # 处理耗时和分辨率信息
+    size_text = f"{image.shape[1]}x{image.shape[0]}"
+    cv2.putText(image, f"Proc: {record.process_time * 1000:.1f}ms {size_text}",
+                (image.shape[1] - 200, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+
+
+def draw_emotion_overlay(image: np.ndarray, record: AnalysisRecord):
+    """在图像上绘制面部网格轮廓和当前情绪"""
+    emotion = record.emotion
+    face_landmarks = emotion.get('face_landmarks')
+    if not face_landmarks:
+        return
+    if DRAWING_AVAILABLE:
+        if record.simple_style:
+            mp_drawing.draw_landmarks(
+                image=image,
+                landmark_list=face_landmarks,
+                connections=mp_face_mesh.FACEMESH_CONTOURS,
+                landmark_drawing_spec=mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=1, circle_radius=1),
+                connection_drawing_spec=mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=1)
+            )
+        else:
+            mp_drawing.draw_landmarks(
+                image=image,
+                landmark_list=face_landmarks,
+                connections=mp_face_mesh.FACEMESH_CONTOURS,
+                connection_drawing_spec=mp_drawing_styles.get_default_face_mesh_contours_style()
+            )
+    state = emotion.get('emotion')
+    if state is not None:
+        cv2.putText(image, f"Emotion: {state.name}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 250), 2)
+
+
+_DRAWERS = {
+    'pose': draw_pose_overlay,
+    'emotion': draw_emotion_overlay
+}
+
+
+def render_overlay(image: np.ndarray, record: AnalysisRecord, kind: str) -> np.ndarray:
+    """在可写图像上原地绘制指定类型的标注并返回该图像"""
+    _DRAWERS[kind](image, record)
+    return image
+
+
+class OverlayRenderer:
+    """
+    标注视频流的视频源
+
+    MJPEGChannel 只在有订阅者时调用 wait_for_frame()，并在编码通道停止时调用 unregister_consumer()，
+    据此维护 AnalysisStore 的观看状态：没有人看标注视频流时分析线程不保留画面，也不做任何绘制。
+    """
+    def __init__(self, store: AnalysisStore, kind: str, frame_width: int = 640, frame_height: int = 480):
+        """
+        Args:
+            store: 分析结果存储
+            kind: 'pose' 或 'emotion'
+            frame_width: 源画面宽度（供自适应档位参考）
+            frame_height: 源画面高度
+        """
+        if kind not in _DRAWERS:
+            raise ValueError(f"未知的标注类型: {kind}")
+        self.store = store
+        self.kind = kind
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.stats = {
+            'rendered': 0,
+            'errors': 0
+        }
+
+    def wait_for_frame(self, after_seq: int = 0, timeout: Optional[float] = None,
+                       consumer_id: Optional[str] = None) -> Optional[RenderedFrame]:
+        """
+        等待下一帧已分析画面，拷贝后绘制标注
+
+        Returns:
+            RenderedFrame；超时返回None
+        """
+        if consumer_id:
+            self.store.add_watcher(consumer_id)
+        item = self.store.wait_for_frame(after_seq, timeout)
+        if item is None:
+            return None
+        record, frame = item
+        try:
+            image = (frame.image if hasattr(frame, 'image') else frame).copy()
+        finally:
+            _release_frame(frame)
+        try:
+            render_overlay(image, record, self.kind)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"{self.kind} 标注渲染失败: {str(e)}")
+        self.stats['rendered'] += 1
+        return RenderedFrame(record.seq, image, record.capture_time, record.source_id)
+
+    def unregister_consumer(self, consumer_id: str):
+        self.store.remove_watcher(consumer_id)
+
+    def get_status(self) -> dict:
+        return {
+            'kind': self.kind,
+            **self.stats
+        }
@@ -17,6 +17,34 @@ from config import (
     BAD_POSTURE_THRESHOLD,
 )
 
+try:
+    from config import POSTURE_PARALLEL_INFERENCE
+except ImportError:
+    POSTURE_PARALLEL_INFERENCE = True
+
+try:
+    from config import POSTURE_INFERENCE_MODE, POSTURE_SHARED_RING_SLOTS
+except ImportError:
+    POSTURE_INFERENCE_MODE = 'thread'
+    POSTURE_SHARED_RING_SLOTS = 4
+
+try:
+    from config import FACE_ROI_ENABLED
+except ImportError:
+    FACE_ROI_ENABLED = True
+
+try:
+    from config import MOTION_GATE_ENABLED
+except ImportError:
+    MOTION_GATE_ENABLED = True
+from modules.camera_discovery import get_camera_discovery
+from modules.face_roi import FaceRoiTracker
+from modules.inference_executor import ParallelInference
+from modules.motion_gate import MotionGate
+from modules.process_inference import ProcessInferencePool, array_to_landmarks
+from modules.overlay_renderer import AnalysisRecord, AnalysisStore, OverlayRenderer, OVERLAY_KINDS, render_overlay
+from modules.stream_hub import get_stream_hub
+
 # 尝试导入posture_analysis模块
 try:
     # 确保能找到posture_analysis包
@@ -135,6 +163,15 @@ class WebPostureMonitor:
         self.cap = None
         self.pose = None
         self.emotion_analyzer = None
+        self.inference = None  # 推理执行器（ParallelInference 或 ProcessInferencePool），start() 时创建
+        # 面部网格只处理由上一帧姿势关键点估计的面部区域
+        self.face_roi_tracker = FaceRoiTracker() if FACE_ROI_ENABLED else None
+        self.face_roi = None
+        self.last_pose_landmarks = None
+        # 画面没有变化时沿用上一次的推理结果
+        self.motion_gate = MotionGate() if MOTION_GATE_ENABLED else None
+        self.last_inference_results = None
+        self.last_frame_gated = False
         self.is_running = False
         self.thread = None
         self.video_stream_handler = video_stream_handler
@@ -154,10 +191,23 @@ class WebPostureMonitor:
             from modules.camera_manager import get_camera_manager
             self.camera_manager = get_camera_manager()
         
-        # 从摄像头管理器注册帧队列
+        # 通过摄像头管理器的wait_for_frame获取新帧，记录已处理的最后一帧序号
+        self.last_frame_seq = 0
         if self.camera_manager:
-            self.frame_queue = self.camera_manager.register_consumer("posture_monitor", max_queue_size=5)
-            print("DEBUG: 姿势分析器已注册为摄像头帧消费者")
+            print("DEBUG: 姿势分析器将从摄像头管理器等待新帧")
+        
+        # 分析结果（关键点/角度/情绪）按帧序号保存，不再为每帧绘制标注画面；
+        # 标注视频流登记到流分发中心，有人观看时才由渲染器按需合成
+        self.analysis_store = AnalysisStore()
+        frame_width = getattr(self.camera_manager, 'frame_width', None) or CAMERA_WIDTH
+        frame_height = getattr(self.camera_manager, 'frame_height', None) or CAMERA_HEIGHT
+        self.overlay_sources = {
+            kind: OverlayRenderer(self.analysis_store, kind, frame_width, frame_height)
+            for kind in OVERLAY_KINDS
+        }
+        hub = get_stream_hub()
+        for kind, renderer in self.overlay_sources.items():
+            hub.register_source(kind, renderer)
         
         # 初始化摄像头参数
         self.camera_fps = CAMERA_FPS_TARGET
@@ -206,6 +256,7 @@ class WebPostureMonitor:
             'camera_errors': 0,
             'processing_times': deque(maxlen=100),
             'skipped_frames': 0,
+            'gated_frames': 0,  # 运动门控沿用上一次结果、未运行模型的帧数
             'last_reconnect_time': 0,
             'reconnect_interval': 10.0  # 重连间隔（秒）
         }
@@ -289,6 +340,8 @@ class WebPostureMonitor:
             success = True
             # 为了兼容性，保持cap属性可用
             self.cap = self.camera_manager.cap if hasattr(self.camera_manager, 'cap') else None
+            # 按姿势分析的目标帧率订阅，摄像头帧率更高时由摄像头管理器抽帧，多出的帧不会唤醒分析线程
+            self.camera_manager.register_consumer("posture_monitor", fps=self.camera_fps, with_queue=False)
             print("使用共享摄像头管理器，跳过摄像头初始化")
         else:
             # 如果没有摄像头管理器，则使用传统方式初始化摄像头
@@ -303,17 +356,27 @@ class WebPostureMonitor:
             try:
                 print("正在初始化姿势分析和情绪分析组件...")
                 
-                # 使用正确的MediaPipe姿势检测
-                self.pose = mp_pose.Pose(
-                    static_image_mode=False,    # 视频流模式
-                    model_complexity=1,         # 模型复杂度（0-2）降低以提高性能
-                    smooth_landmarks=True,      # 启用关键点平滑
-                    min_detection_confidence=0.6, # 降低到0.6以提高检测率
-                    min_tracking_confidence=0.5
-                )
+                # 进程模式：模型在独立的推理进程中加载，本进程不创建模型
+                if POSTURE_INFERENCE_MODE == 'process':
+                    self.inference = self._start_process_inference()
                 
-                # 创建情绪分析器实例
-                self.emotion_analyzer = EmotionAnalyzer()
+                if self.inference is None:
+                    # 使用正确的MediaPipe姿势检测
+                    self.pose = mp_pose.Pose(
+                        static_image_mode=False,    # 视频流模式
+                        model_complexity=1,         # 模型复杂度（0-2）降低以提高性能
+                        smooth_landmarks=True,      # 启用关键点平滑
+                        min_detection_confidence=0.6, # 降低到0.6以提高检测率
+                        min_tracking_confidence=0.5
+                    )
+                    
+                    # 创建情绪分析器实例
+                    self.emotion_analyzer = EmotionAnalyzer()
+                    
+                    # 两个模型各用一个工作线程，同一帧并行推理
+                    self.inference = ParallelInference(
+                        {'pose': self._process_pose, 'emotion': self._process_emotion},
+                        parallel=POSTURE_PARALLEL_INFERENCE, name='posture')
                 
                 # 重置计数器和性能统计
                 self.capture_fps.reset()
@@ -321,6 +384,7 @@ class WebPostureMonitor:
                 self.emotion_process_fps.reset()
                 self.performance_stats['camera_errors'] = 0
                 self.performance_stats['skipped_frames'] = 0
+                self.performance_stats['gated_frames'] = 0
                 
                 # 启动处理线程
                 self.thread = threading.Thread(target=self._process_frames)
@@ -334,12 +398,61 @@ class WebPostureMonitor:
                 print(f"启动姿势分析系统失败，错误详情: {e}")
                 import traceback
                 traceback.print_exc()  # 打印详细错误堆栈
+                if self.inference is not None:
+                    self.inference.shutdown(wait=False)
+                    self.inference = None
                 return False
         else:
             self.is_running = False
             print("姿势分析模块不可用，请检查posture_analysis包是否正确安装")
             return False
     
+    def _start_process_inference(self):
+        """启动推理工作进程和共享内存帧环，失败时返回None（改为本进程内推理）"""
+        width = getattr(self.camera_manager, 'frame_width', None) or CAMERA_WIDTH
+        height = getattr(self.camera_manager, 'frame_height', None) or CAMERA_HEIGHT
+        try:
+            pool = ProcessInferencePool(slots=POSTURE_SHARED_RING_SLOTS)
+            pool.start((height, width, 3))
+            print(f"姿势/情绪分析在独立进程中运行（共享帧环 {width}x{height}，{pool.slots} 槽位）")
+            return pool
+        except Exception as e:
+            print(f"启动推理工作进程失败，改为在本进程内推理: {str(e)}")
+            return None
+    
+    def _motion_gate_passes(self, frame_ref, frame):
+        """这一帧是否需要推理
+        
+        比较用的缩小灰度图由摄像头管理器按帧序号缓存（其他消费者可共享），直接读取摄像头时在此缩放
+        """
+        size = self.motion_gate.size
+        if frame_ref is not None:
+            with self.camera_manager.acquire_variant(frame_ref, size=size, colour='gray') as gray_ref:
+                return self.motion_gate.should_process(gray_ref.image)
+        small_gray = cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        return self.motion_gate.should_process(small_gray)
+    
+    def _run_inference(self, inference, frame, frame_rgb):
+        """对一帧运行姿势与情绪分析
+        
+        进程模式下由工作进程推理并返回关键点数组，本进程只做遮挡/角度等轻量后处理；
+        线程模式下两个模型在本进程的工作线程上并行处理。
+        """
+        if isinstance(inference, ProcessInferencePool):
+            # 共享内存中直接放RGB帧，工作进程无需各自再转换一次
+            raw = inference.run(frame_rgb, self.last_frame_seq,
+                                {'emotion': {**posture_params, 'roi': self.face_roi}})
+            emotion_code, face_array, roi_missed = raw['emotion']
+            return {
+                'pose': self._analyze_pose_landmarks(array_to_landmarks(raw['pose']), frame.shape),
+                'emotion': {
+                    'emotion': EmotionState(emotion_code),
+                    'face_landmarks': array_to_landmarks(face_array),
+                    'roi_missed': roi_missed
+                }
+            }
+        return inference.run(frame, frame_rgb)
+    
     def stop(self):
         """停止姿势分析线程"""
         self.is_running = False
@@ -350,137 +463,49 @@ class WebPostureMonitor:
             except Exception:
                 pass
             self.thread = None
-            
-        if self.cap:
+        
+        if self.inference is not None:
+            self.inference.shutdown()
+            self.inference = None
+        if self.camera_manager:
+            self.camera_manager.unregister_consumer("posture_monitor")
+        
+        # 下次启动时重新由姿势关键点估计面部区域
+        self.last_pose_landmarks = None
+        self.face_roi = None
+        if self.face_roi_tracker is not None:
+            self.face_roi_tracker.reset()
+        self.last_inference_results = None
+        self.last_frame_gated = False
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+            
+        # 共享摄像头由摄像头管理器负责释放，只释放自行打开的摄像头
+        if self.cap and not self.camera_manager:
             self.cap.release()
-            self.cap = None
+        self.cap = None
             
         print("姿势分析系统已停止")
         return True
     
     def _init_camera(self):
-        """初始化摄像头设备"""
+        """初始化摄像头设备（无摄像头管理器时使用，通过统一的摄像头发现服务打开）"""
         try:
-            # 先使用_find_available_cameras找到所有可用的摄像头
-            available_cameras = self._find_available_cameras()
-            camera_found = False
-            
-            if available_cameras:
-                # 首先尝试available_cameras中的相机
-                for camera_index in available_cameras:
-                    try:
-                        print(f"尝试初始化摄像头索引 {camera_index}...")
-                        self.cap = cv2.VideoCapture(camera_index, self.camera_api)
-                        if self.cap.isOpened():
-                            # 读取一帧验证相机是否真正可用
-                            ret, test_frame = self.cap.read()
-                            if ret and test_frame is not None:
-                                print(f"找到可用摄像头：索引 {camera_index}")
-                                camera_found = True
-                                break
-                            else:
-                                print(f"摄像头索引 {camera_index} 无法读取帧")
-                                self.cap.release()
-                    except Exception as e:
-                        print(f"尝试摄像头索引 {camera_index} 失败: {e}")
-                        if self.cap:
-                            self.cap.release()
-            
-            # 如果上面的方法没找到摄像头，尝试直接使用索引6（对应Bus 006）
-            if not camera_found:
-                try:
-                    print("尝试直接访问Bus 006上的摄像头 (索引6)...")
-                    # 使用V4L2后端，这在Linux上对USB摄像头效果更好
-                    self.cap = cv2.VideoCapture(6, self.camera_api)
-                    if self.cap.isOpened():
-                        ret, test_frame = self.cap.read()
-                        if ret and test_frame is not None:
-                            print("成功连接到索引6的摄像头")
-                            camera_found = True
-                    else:
-                        print("无法打开索引6的摄像头")
-                except Exception as e:
-                    print(f"尝试访问索引6摄像头失败: {e}")
-            
-            # 继续尝试更多相机索引
-            if not camera_found:
-                for camera_index in range(10):
-                    if camera_index in available_cameras:
-                        continue  # 已经尝试过
-                    try:
-                        print(f"尝试初始化扩展搜索摄像头索引 {camera_index}...")
-                        self.cap = cv2.VideoCapture(camera_index, self.camera_api)
-                        if self.cap.isOpened():
-                            ret, test_frame = self.cap.read()
-                            if ret and test_frame is not None:
-                                print(f"扩展搜索找到可用摄像头：索引 {camera_index}")
-                                camera_found = True
-                                break
-                            else:
-                                self.cap.release()
-                    except Exception as e:
-                        print(f"扩展搜索摄像头索引 {camera_index} 失败: {e}")
-                        if self.cap:
-                            self.cap.release()
-            
-            # 最后尝试直接设备路径
-            if not camera_found:
-                for dev_path in ["/dev/video0", "/dev/video1", "/dev/video2", "/dev/video6"]:
-                    try:
-                        print(f"尝试使用设备路径 {dev_path} 访问摄像头...")
-                        self.cap = cv2.VideoCapture(dev_path, self.camera_api)
-                        if self.cap.isOpened():
-                            ret, test_frame = self.cap.read()
-                            if ret and test_frame is not None:
-                                print(f"通过设备路径 {dev_path} 找到可用摄像头")
-                                camera_found = True
-                                break
-                            else:
-                                self.cap.release()
-                    except Exception as e:
-                        print(f"尝试设备路径 {dev_path} 失败: {e}")
-                        if self.cap:
-                            self.cap.release()
-            
-            if not camera_found or not self.cap or not self.cap.isOpened():
+            self.cap, profile = get_camera_discovery().open(
+                width=CAMERA_WIDTH,
+                height=CAMERA_HEIGHT,
+                fps=self.camera_fps,
+                api=self.camera_api,
+                fourcc_options=CAMERA_FOURCC_OPTIONS,
+                fallback_resolutions=[(480, 360), (320, 240)],
+                buffer_size=self.camera_buffer_size
+            )
+            if self.cap is None:
                 print("未找到可用摄像头")
                 return False
-                
-            # 获取摄像头原始属性
-            original_width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-            original_height = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-            original_fps = self.cap.get(cv2.CAP_PROP_FPS)
-            
-            print(f"摄像头原始属性: {original_width}x{original_height}@{original_fps}fps")
-            
-            # 优化摄像头配置以提高捕获帧率
-            self._optimize_camera_settings()
-            
-            # 验证摄像头是否能够正常读取帧
-            ret, test_frame = self.cap.read()
-            if not ret or test_frame is None:
-                print("摄像头无法读取帧，初始化失败")
-                if self.cap:
-                    self.cap.release()
-                    self.cap = None
-                return False
-                
-            # 获取实际的摄像头属性
-            actual_width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-            actual_height = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-            actual_fps = self.cap.get(cv2.CAP_PROP_FPS)
-            actual_format = int(self.cap.get(cv2.CAP_PROP_FOURCC))
-            
-            # 将4字节格式代码转换为可读字符串
-            try:
-                format_chars = "".join([chr((int(actual_format) >> (8 * i)) & 0xFF) for i in range(4)])
-                print(f"摄像头最终配置: {actual_width}x{actual_height}@{actual_fps}fps, 格式: {format_chars}")
-            except:
-                print(f"摄像头最终配置: {actual_width}x{actual_height}@{actual_fps}fps")
             
-            # 测试实际帧率
-            measured_fps = self._test_camera_fps(self.cap, frames=15)
-            print(f"测量的实际摄像头帧率: {measured_fps:.1f} FPS")
+            self.camera_fourcc = cv2.VideoWriter_fourcc(*profile.fourcc) if profile.fourcc else None
+            print(f"摄像头最终配置: {profile.width}x{profile.height}@{profile.fps}fps, 格式: {profile.fourcc}")
             
             # 重置帧率计数器
             self.capture_fps = FPSCounter()
@@ -500,107 +525,6 @@ class WebPostureMonitor:
                 self.cap = None
             return False
     
-    def _optimize_camera_settings(self):
-        """优化摄像头设置以提高性能"""
-        try:
-            if not self.cap or not self.cap.isOpened():
-                return False
-            
-            # 设置缓冲区大小为1，减少延迟
-            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, self.camera_buffer_size)
-            
-            # 尝试设置目标FPS
-            self.cap.set(cv2.CAP_PROP_FPS, self.camera_fps)
-            
-            # 尝试不同的编码格式，优先使用MJPG
-            best_format = None
-            best_fps = 0
-            
-            for fourcc_code in CAMERA_FOURCC_OPTIONS:
-                try:
-                    fourcc = cv2.VideoWriter_fourcc(*fourcc_code)
-                    self.cap.set(cv2.CAP_PROP_FOURCC, fourcc)
-                    # 读取一帧测试格式是否生效
-                    ret, test = self.cap.read()
-                    if ret:
-                        # 测试这个格式下的帧率
-                        test_fps = self._test_camera_fps(self.cap, frames=10)
-                        print(f"{fourcc_code} 格式下测得帧率: {test_fps:.1f} FPS")
-                        
-                        if test_fps > best_fps:
-                            best_fps = test_fps
-                            best_format = fourcc_code
-                            self.camera_fourcc = fourcc
-                except Exception as e:
-                    print(f"设置 {fourcc_code} 格式失败: {e}")
-            
-            if best_format:
-                print(f"选择最佳格式: {best_format} 帧率: {best_fps:.1f} FPS")
-                # 再次设置最佳格式
-                fourcc = cv2.VideoWriter_fourcc(*best_format)
-                self.cap.set(cv2.CAP_PROP_FOURCC, fourcc)
-            
-            # 尝试不同的分辨率以找到最佳性能
-            resolutions_to_try = [(640, 480), (480, 360), (320, 240)]
-            
-            for width, height in resolutions_to_try:
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-                
-                # 检查设置是否成功
-                actual_width = self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-                actual_height = self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-                
-                print(f"尝试设置分辨率 {width}x{height}, 实际: {actual_width}x{actual_height}")
-                
-                # 只有在成功设置到接近目标分辨率时才进行测试
-                if abs(actual_width - width) < 30 and abs(actual_height - height) < 30:
-                    ret, test = self.cap.read()
-                    if ret:
-                        fps = self._test_camera_fps(self.cap, frames=10)
-                        print(f"分辨率 {width}x{height} 下测得帧率: {fps:.1f} FPS")
-                        
-                        # 如果帧率超过15fps就可以使用这个分辨率
-                        if fps >= 15:
-                            print(f"选择分辨率 {width}x{height} 帧率足够")
-                            break
-            
-            return True
-        except Exception as e:
-            print(f"优化摄像头设置失败(非致命错误): {e}")
-            return False
-    
-    def _test_camera_fps(self, cap, frames=20):
-        """测试摄像头的实际FPS"""
-        if not cap or not cap.isOpened():
-            return 0
-            
-        # 丢弃前几帧以稳定摄像头
-        for _ in range(5):
-            cap.grab()
-            
-        # 测量获取指定数量帧所需的时间
-        start_time = time.time()
-        frames_read = 0
-        
-        for _ in range(frames):
-            if self.use_separate_grab_retrieve:
-                if cap.grab():
-                    _, _ = cap.retrieve()
-                    frames_read += 1
-            else:
-                ret, _ = cap.read()
-                if ret:
-                    frames_read += 1
-        
-        end_time = time.time()
-        
-        elapsed_time = end_time - start_time
-        if elapsed_time > 0 and frames_read > 0:
-            return frames_read / elapsed_time
-        else:
-            return 0
-    
     def _adjust_processing_resolution(self):
         """根据当前帧率动态调整处理分辨率 - 已禁用自动降低以保证识别效果"""
         current_time = time.time()
@@ -641,6 +565,11 @@ class WebPostureMonitor:
             self.skip_count = 0
             return False
         
+        # 画面静止、运动门控沿用结果时处理帧率只反映推理次数，此时并不存在处理积压，无需跳帧
+        if self.last_frame_gated:
+            self.skip_count = 0
+            return False
+        
         # 计算平均处理时间
         avg_processing_time = 0
         if self.performance_stats['processing_times']:
@@ -671,12 +600,16 @@ class WebPostureMonitor:
         if not POSTURE_MODULE_AVAILABLE:
             return
         
+        # 本次运行使用的推理执行器（stop() 会将属性置空）
+        inference = self.inference
         last_fps_update_time = time.time()
         consecutive_read_failures = 0
         last_frame_time = time.time()
         last_reconnect_time = time.time()
         
         while self.is_running:
+            frame_ref = None
+            rgb_ref = None
             try:
                 current_time = time.time()
                 
@@ -684,26 +617,23 @@ class WebPostureMonitor:
                 frame = None
                 
                 if hasattr(self, 'camera_manager') and self.camera_manager:
-                    # 使用摄像头管理器获取帧
+                    # 阻塞等待摄像头管理器的新帧（借用环形缓冲区中的只读视图，不拷贝）
+                    # 新帧到达时立即唤醒，不会重复处理同一帧，也不会空转占用CPU
                     try:
-                        # 首先尝试从队列获取
-                        if hasattr(self, 'frame_queue'):
-                            try:
-                                frame = self.frame_queue.get(timeout=0.1)
-                            except queue.Empty:
-                                # 队列为空，直接从管理器获取最新帧
-                                frame = self.camera_manager.get_latest_frame()
-                        else:
-                            # 没有队列，直接获取最新帧
-                            frame = self.camera_manager.get_latest_frame()
-                            
-                        if frame is not None:
-                            consecutive_read_failures = 0
+                        frame_ref = self.camera_manager.wait_for_frame(
+                            self.last_frame_seq, timeout=0.5, consumer_id="posture_monitor")
                     except Exception as e:
                         print(f"从摄像头管理器获取帧失败: {str(e)}")
-                        frame = None
+                        frame_ref = None
+                    
+                    if frame_ref is None:
+                        # 超时说明摄像头暂时没有新帧，重新检查运行状态后继续等待
+                        continue
+                    frame = frame_ref.image
+                    self.last_frame_seq = frame_ref.seq
+                    consecutive_read_failures = 0
                         
-                # 如果从摄像头管理器获取帧失败，尝试直接从摄像头读取（向后兼容）
+                # 没有摄像头管理器时，直接从摄像头读取（向后兼容）
                 if frame is None and self.cap and self.cap.isOpened():
                     # 如果摄像头出现多次错误，尝试重新连接摄像头
                     if consecutive_read_failures > 5 and (current_time - self.performance_stats['last_reconnect_time']) > self.performance_stats['reconnect_interval']:
@@ -733,6 +663,7 @@ class WebPostureMonitor:
                             print("无法读取摄像头帧")
                             time.sleep(0.01)
                             continue
+                        self.last_frame_seq += 1
                     else:
                         # 常规读取模式
                         ret, frame = self.cap.read()
@@ -742,6 +673,7 @@ class WebPostureMonitor:
                             print("无法读取摄像头帧")
                             time.sleep(0.01)
                             continue
+                        self.last_frame_seq += 1
                 
                 # 如果所有方法都无法获取帧，则跳过这次循环
                 if frame is None:
@@ -771,36 +703,77 @@ class WebPostureMonitor:
                 # 记录处理开始时间
                 process_start_time = time.time()
                 
-                # 保持原始分辨率640x480直接传给视觉模型，不进行任何缩放处理
-                # 为了保证识别效果，使用原始图像进行分析
-                pose_frame = frame.copy()  # 直接使用原始640x480图像
-                emotion_frame = frame.copy()  # 直接使用原始640x480图像
-                
-                # 处理姿势 - 使用原始分辨率
-                pose_results = self._process_pose(pose_frame)
-                self.pose_process_fps.update()  # 更新姿势处理帧率
+                # 运动门控：画面与上一次推理时相比几乎没有变化时沿用上一次的结果，两个模型都不运行
+                reuse_results = False
+                if self.motion_gate is not None:
+                    if self.last_inference_results is None:
+                        self.motion_gate.reset()
+                    reuse_results = not self._motion_gate_passes(frame_ref, frame)
                 
-                # 处理情绪 - 使用原始分辨率
-                emotion_results = self._process_emotion(emotion_frame)
-                self.emotion_process_fps.update()  # 更新情绪处理帧率
+                if reuse_results:
+                    # 沿用上一次的关键点和情绪，但姿势后处理（遮挡计数、角度、坐姿计时）照常逐帧进行，
+                    # 遮挡状态不会在门控期间停滞
+                    inference_results = {
+                        'pose': self._analyze_pose_landmarks(self.last_pose_landmarks, frame.shape),
+                        'emotion': self.last_inference_results['emotion']
+                    }
+                    self.performance_stats['gated_frames'] += 1
+                else:
+                    # 保持原始分辨率640x480直接传给视觉模型，不进行任何缩放处理
+                    # 模型只读取图像，两路分析共享同一只读视图
+                    # 两个模型都需要RGB输入，每帧只转换一次：摄像头管理器按帧序号缓存派生帧并共享只读视图，
+                    # 直接读取摄像头时在此转换一次后交给两个模型
+                    if frame_ref is not None:
+                        rgb_ref = self.camera_manager.acquire_variant(frame_ref, colour='rgb')
+                        frame_rgb = rgb_ref.image
+                    else:
+                        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                        frame_rgb.flags.writeable = False
+                    
+                    # 姿势与情绪两个模型在各自的工作线程上并行处理同一帧（原始分辨率），
+                    # 全部完成后才继续，借用的帧在此之前不会被归还
+                    # 姿势与面部网格同时推理，面部区域只能由上一帧的姿势关键点估计
+                    if self.face_roi_tracker is not None:
+                        self.face_roi = self.face_roi_tracker.update(self.last_pose_landmarks, frame.shape)
+                    # 推理失败时不留下可被门控沿用的旧结果
+                    self.last_inference_results = None
+                    inference_results = self._run_inference(inference, frame, frame_rgb)
+                    self.last_inference_results = inference_results
+                    # 裁剪区域内没有找到面部：丢弃平滑的方框，下一帧由整帧的面部网格重新定位
+                    if self.face_roi_tracker is not None and inference_results['emotion'].get('roi_missed'):
+                        self.face_roi_tracker.miss()
+                pose_results = inference_results['pose']
+                emotion_results = inference_results['emotion']
+                self.last_pose_landmarks = pose_results['landmarks']
+                self.last_frame_gated = reuse_results
                 
-                # 记录处理时间
+                # 处理帧率与处理时间只统计实际推理的帧，反映模型的真实推理速度
                 process_time = time.time() - process_start_time
-                self.performance_stats['processing_times'].append(process_time)
+                if not reuse_results:
+                    self.pose_process_fps.update()  # 更新姿势处理帧率
+                    self.emotion_process_fps.update()  # 更新情绪处理帧率
+                    self.performance_stats['processing_times'].append(process_time)
                 
-                # 添加处理时间和分辨率信息到显示帧
-                # 显示使用原始分辨率信息
-                size_text = f"{frame.shape[1]}x{frame.shape[0]}"  # 使用实际分辨率
-                cv2.putText(pose_results['display_frame'], 
-                          f"Proc: {process_time*1000:.1f}ms {size_text}", 
-                          (pose_results['display_frame'].shape[1] - 200, 25), 
-                          cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+                # 只按帧序号保存关键点和分析结果；有标注视频流在观看时才附带该帧画面
+                # （FrameRef只增加引用，不拷贝），标注由OverlayRenderer在编码前按需绘制
+                current_fps = min(self.pose_process_fps.get_fps(), self.emotion_process_fps.get_fps())
+                record = AnalysisRecord(
+                    seq=self.last_frame_seq,
+                    capture_time=frame_ref.capture_time if frame_ref is not None else time.monotonic(),
+                    source_id=frame_ref.source_id if frame_ref is not None else '',
+                    pose=pose_results,
+                    emotion=emotion_results,
+                    process_time=process_time,
+                    simple_style=current_fps < 10
+                )
+                watched = self.analysis_store.watched
+                self.analysis_store.put(record, (frame_ref if frame_ref is not None else frame) if watched else None)
                 
-                # 将处理后的帧放入队列供Web端点使用
+                # 旧版视频流处理器的标注流只在开启视频流传输时才需要标注帧
                 # 重要：为了保证识别效果，向情绪检测传输原始的、未标注的帧
-                if self.video_stream_handler:
+                if self.video_stream_handler and getattr(self.video_stream_handler, 'is_streaming', False):
                     # 向姿势队列传输带标注的显示帧（用于Web显示）
-                    self.video_stream_handler.add_pose_frame(pose_results['display_frame'])
+                    self.video_stream_handler.add_pose_frame(render_overlay(frame.copy(), record, 'pose'))
                     # 向情绪队列传输原始的、未标注的帧（用于情绪检测）
                     # 使用原始摄像头帧而非处理过的帧，确保情绪检测准确性
                     self.video_stream_handler.add_emotion_frame(frame)
@@ -836,7 +809,6 @@ class WebPostureMonitor:
                     last_fps_update_time = current_time
                 
                 # 根据实际帧率动态调整延迟时间
-                current_fps = min(self.pose_process_fps.get_fps(), self.emotion_process_fps.get_fps())
                 target_interval = 1.0 / TARGET_FPS
                 
                 # 如果处理太快，增加一点延迟以减少CPU使用
@@ -848,12 +820,23 @@ class WebPostureMonitor:
                 import traceback
                 traceback.print_exc()
                 time.sleep(0.1)
+            finally:
+                # 归还从摄像头管理器借用的帧
+                if rgb_ref is not None:
+                    rgb_ref.release()
+                if frame_ref is not None:
+                    frame_ref.release()
     
-    def _process_pose(self, frame):
-        """处理姿势检测"""
+    def _process_pose(self, frame, frame_rgb=None):
+        """处理姿势检测，只返回关键点和分析结果，不绘制
+        
+        Args:
+            frame: BGR帧（只读）
+            frame_rgb: 同一帧的RGB版本，为None时在此转换
+        """
         if not POSTURE_MODULE_AVAILABLE:
             return {
-                'display_frame': frame,
+                'landmarks': None,
                 'angle': None,
                 'is_bad_posture': False,
                 'is_occluded': True,
@@ -862,7 +845,7 @@ class WebPostureMonitor:
             }
         
         results = {
-            'display_frame': frame,
+            'landmarks': None,
             'angle': None,
             'is_bad_posture': False,
             'is_occluded': True,
@@ -872,122 +855,83 @@ class WebPostureMonitor:
         
         try:
             # 姿势检测
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            if frame_rgb is None:
+                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             pose_results = self.pose.process(frame_rgb)
-            if not pose_results.pose_landmarks:
-                return results
-            
-            # 遮挡检测
-            is_occluded, occlusion_status = check_occlusion(pose_results.pose_landmarks.landmark)
-            self._update_occlusion_counters(is_occluded)
-            final_occlusion = self.occlusion_counter >= OCCLUSION_FRAMES_THRESHOLD
-            valid_detection = self.clear_counter >= CLEAR_FRAMES_THRESHOLD
-            
-            # 头部角度计算
-            angle_info = calculate_head_angle(pose_results.pose_landmarks.landmark, frame.shape)
-            angle = None
-            is_bad_posture = False
-            points = {}
-            posture_type = 'unknown'
-            
-            if angle_info[0] is not None:
-                angle, is_bad_posture, points = angle_info
-                self.last_valid_angle = angle
-                
-                # 根据角度确定坐姿类型
-                if angle <= self.posture_thresholds['excellent']:
-                    posture_type = 'excellent'  # 优秀坐姿
-                elif angle <= self.posture_thresholds['good']:
-                    posture_type = 'good'  # 良好坐姿
-                elif angle <= self.posture_thresholds['fair']:
-                    posture_type = 'fair'  # 一般坐姿
-                else:
-                    posture_type = 'poor'  # 不良坐姿
-                
-                # 记录坐姿时间
-                self._record_posture_time(angle, posture_type)
-            
-            # 绘制姿势关键点和信息
-            display_frame = frame.copy()
-            
-            # 根据当前帧率优化绘制效果
-            drawing_style = None
-            current_fps = min(self.pose_process_fps.get_fps(), self.emotion_process_fps.get_fps())
-            if current_fps < 10:
-                # 帧率低，使用简化绘制模式
-                mp_drawing.draw_landmarks(
-                    display_frame,
-                    pose_results.pose_landmarks,
-                    mp_pose.POSE_CONNECTIONS,
-                    mp_drawing.DrawingSpec(color=(0,255,0), thickness=1, circle_radius=1),
-                    mp_drawing.DrawingSpec(color=(255,0,0), thickness=1)
-                )
-            else:
-                # 帧率正常，使用标准绘制模式
-                mp_drawing.draw_landmarks(
-                    display_frame,
-                    pose_results.pose_landmarks,
-                    mp_pose.POSE_CONNECTIONS,
-                    landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style()
-                )
-            
-            # 绘制状态信息
-            state_text = f"State: {'Occluded' if final_occlusion else 'Tracking'}"
-            color = (0, 0, 255) if final_occlusion else (0, 255, 0)
-            cv2.putText(display_frame, state_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-            
-            # 绘制角度信息
-            if angle is not None and valid_detection and not final_occlusion:
-                # 根据不同坐姿类型设置不同颜色
-                posture_color = {
-                    'excellent': (0, 255, 0),   # 绿色
-                    'good': (0, 255, 128),      # 浅绿色
-                    'fair': (0, 128, 255),      # 橙色
-                    'poor': (0, 0, 255)         # 红色
-                }.get(posture_type, (0, 0, 255))
-                
-                posture_text = {
-                    'excellent': '优秀',
-                    'good': '良好',
-                    'fair': '一般',
-                    'poor': '不良'
-                }.get(posture_type, '未知')
-                
-                text = f"Angle: {angle:.1f}° [{posture_text}]"
-                cv2.putText(display_frame, text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, posture_color, 2)
-                
-                if points:
-                    cv2.line(display_frame, tuple(points['mid_shoulder']), tuple(points['nose']), (0, 255, 0), 2)
-            elif final_occlusion and self.last_valid_angle:
-                text = f"Occluded | Last: {self.last_valid_angle:.1f}°"
-                cv2.putText(display_frame, text, (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-            
-            # 更新结果
-            results = {
-                'display_frame': display_frame,
-                'angle': angle if angle is not None else (self.last_valid_angle if final_occlusion else None),
-                'is_bad_posture': is_bad_posture,
-                'is_occluded': final_occlusion,
-                'status': occlusion_status if final_occlusion else 'Tracking',
-                'posture_type': posture_type
-            }
-            
-            return results
+            return self._analyze_pose_landmarks(pose_results.pose_landmarks, frame.shape)
         except Exception as e:
             print(f"姿势处理异常: {str(e)}")
             return results
     
-    def _process_emotion(self, frame):
-        """处理情绪分析"""
+    def _analyze_pose_landmarks(self, pose_landmarks, frame_shape):
+        """由姿势关键点计算遮挡状态、头部角度和坐姿类型（关键点来自本进程的模型或推理工作进程）"""
+        if not pose_landmarks:
+            return {
+                'landmarks': None,
+                'angle': None,
+                'is_bad_posture': False,
+                'is_occluded': True,
+                'status': 'No Detection',
+                'posture_type': 'unknown'
+            }
+        
+        # 遮挡检测
+        is_occluded, occlusion_status = check_occlusion(pose_landmarks.landmark)
+        self._update_occlusion_counters(is_occluded)
+        final_occlusion = self.occlusion_counter >= OCCLUSION_FRAMES_THRESHOLD
+        valid_detection = self.clear_counter >= CLEAR_FRAMES_THRESHOLD
+        
+        # 头部角度计算
+        angle_info = calculate_head_angle(pose_landmarks.landmark, frame_shape)
+        angle = None
+        is_bad_posture = False
+        points = {}
+        posture_type = 'unknown'
+        
+        if angle_info[0] is not None:
+            angle, is_bad_posture, points = angle_info
+            self.last_valid_angle = angle
+            
+            # 根据角度确定坐姿类型
+            if angle <= self.posture_thresholds['excellent']:
+                posture_type = 'excellent'  # 优秀坐姿
+            elif angle <= self.posture_thresholds['good']:
+                posture_type = 'good'  # 良好坐姿
+            elif angle <= self.posture_thresholds['fair']:
+                posture_type = 'fair'  # 一般坐姿
+            else:
+                posture_type = 'poor'  # 不良坐姿
+            
+            # 记录坐姿时间
+            self._record_posture_time(angle, posture_type)
+        
+        # 更新结果（关键点和绘制所需的数值随结果保存，由OverlayRenderer按需绘制）
+        return {
+            'landmarks': pose_landmarks,
+            'angle': angle if angle is not None else (self.last_valid_angle if final_occlusion else None),
+            'is_bad_posture': is_bad_posture,
+            'is_occluded': final_occlusion,
+            'status': occlusion_status if final_occlusion else 'Tracking',
+            'posture_type': posture_type,
+            'valid_detection': valid_detection,
+            'points': points,
+            'last_valid_angle': self.last_valid_angle
+        }
+    
+    def _process_emotion(self, frame, frame_rgb=None):
+        """处理情绪分析，只返回情绪和面部关键点，不绘制
+        
+        Args:
+            frame: BGR帧（只读）
+            frame_rgb: 同一帧的RGB版本，为None时由情绪分析器转换
+        """
         if not POSTURE_MODULE_AVAILABLE:
             return {
-                'display_frame': frame,
                 'emotion': None,
                 'face_landmarks': None
             }
         
         results = {
-            'display_frame': frame,
             'emotion': None,
             'face_landmarks': None
         }
@@ -1000,39 +944,13 @@ class WebPostureMonitor:
             self.emotion_analyzer.brow_down_threshold = posture_params['brow_down_threshold']
             
             # 分析情绪
-            emotion_state, face_landmarks, _ = self.emotion_analyzer.analyze(frame)
-            
-            # 绘制情绪界面
-            display_frame = frame.copy()
-            if face_landmarks:
-                # 根据当前帧率优化绘制效果
-                current_fps = min(self.pose_process_fps.get_fps(), self.emotion_process_fps.get_fps())
-                if current_fps < 10:
-                    # 帧率低，使用简化绘制
-                    mp_drawing.draw_landmarks(
-                        image=display_frame,
-                        landmark_list=face_landmarks,
-                        connections=mp_face_mesh.FACEMESH_CONTOURS,
-                        landmark_drawing_spec=mp_drawing.DrawingSpec(color=(0,255,0), thickness=1, circle_radius=1),
-                        connection_drawing_spec=mp_drawing.DrawingSpec(color=(0,255,0), thickness=1)
-                    )
-                else:
-                    # 帧率正常，使用标准绘制
-                    mp_drawing.draw_landmarks(
-                        image=display_frame,
-                        landmark_list=face_landmarks,
-                        connections=mp_face_mesh.FACEMESH_CONTOURS,
-                        connection_drawing_spec=mp_drawing_styles.get_default_face_mesh_contours_style()
-                    )
-                
-                # 显示当前情绪状态
-                emotion_text = f"Emotion: {emotion_state.name}"
-                cv2.putText(display_frame, emotion_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 250), 2)
+            emotion_state, face_landmarks, _, roi_missed = self.emotion_analyzer.analyze(
+                frame, frame_rgb, self.face_roi)
             
             results = {
-                'display_frame': display_frame,
                 'emotion': emotion_state,
-                'face_landmarks': face_landmarks
+                'face_landmarks': face_landmarks,
+                'roi_missed': roi_missed
             }
             
             return results
@@ -1148,6 +1066,7 @@ class WebPostureMonitor:
         
         return {
             'skipped_frames': self.performance_stats['skipped_frames'],
+            'gated_frames': self.performance_stats['gated_frames'],
             'camera_errors': self.performance_stats['camera_errors'],
             'avg_processing_time_ms': round(avg_processing_ms, 2),
             'capture_fps': round(self.capture_fps.get_fps(), 1),
@@ -1155,35 +1074,19 @@ class WebPostureMonitor:
             'emotion_process_fps': round(self.emotion_process_fps.get_fps(), 1),
             'current_resolution': f"{self.process_width}x{self.process_height}",
             'adaptive_mode': self.adaptive_resolution,
-            'skip_frames_enabled': self.skip_frames_when_slow
+            'skip_frames_enabled': self.skip_frames_when_slow,
+            'inference_mode': 'process' if isinstance(self.inference, ProcessInferencePool) else 'thread',
+            'inference': self.inference.get_status() if self.inference is not None else None,
+            'face_roi': self.face_roi_tracker.get_status() if self.face_roi_tracker is not None else None,
+            'motion_gate': self.motion_gate.get_status() if self.motion_gate is not None else None,
+            # 每帧派生图像（RGB/缩放/灰度）的缓存命中情况
+            'preprocess': self.camera_manager.get_variant_status() if self.camera_manager is not None else None,
+            'overlay': {
+                **self.analysis_store.get_status(),
+                'renderers': {kind: r.get_status() for kind, r in self.overlay_sources.items()}
+            }
         }
 
-    def _find_available_cameras(self):
-        """查找系统中所有可用的摄像头并返回可用的索引列表"""
-        available_cameras = []
-        
-        # 尝试前10个摄像头索引
-        for i in range(10):
-            try:
-                cap = cv2.VideoCapture(i, self.camera_api)
-                if cap.isOpened():
-                    ret, frame = cap.read()
-                    if ret and frame is not None:
-                        print(f"摄像头索引 {i} 可用，分辨率: {frame.shape[1]}x{frame.shape[0]}")
-                        available_cameras.append(i)
-                    else:
-                        print(f"摄像头索引 {i} 打开成功但无法读取帧")
-                cap.release()
-            except Exception as e:
-                print(f"测试摄像头索引 {i} 失败: {e}")
-        
-        if available_cameras:
-            print(f"找到 {len(available_cameras)} 个可用摄像头: {available_cameras}")
-        else:
-            print("未找到任何可用摄像头")
-        
-        return available_cameras
-
     def _check_and_record_bad_posture(self, frame, pose_results):
         """检查并记录不良坐姿
         逻辑：如果坐姿变为不良保存一次，每十分钟只允许保存一次，如果十分钟内没有不良坐姿则保存一次良好坐姿
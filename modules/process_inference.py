@@ -0,0 +1,354 @@
+"""
+进程隔离的推理工作进程
+
+姿势（Pose）与情绪（FaceMesh）分析器各运行在一个独立的 multiprocessing 进程中，
+主进程把待分析的帧写入共享内存帧环（SharedFrameRing），通过队列只发送槽位号和帧序号；
+工作进程在共享内存上直接推理，返回紧凑的结果（关键点数组和情绪编号）。
+模型推理及其Python侧的后处理不再与Web服务、串口、语音助手争用主进程的GIL。
+
+工作进程使用 spawn 方式启动，不继承主进程的线程和摄像头等资源；
+进程异常退出时在下一帧自动重启。
+"""
+import os
+import time
+import queue
+import signal
+import logging
+import multiprocessing
+from collections import deque
+from typing import Any, Dict, Optional, Sequence, Set
+
+import numpy as np
+
+from modules.shared_frame_ring import SharedFrameRing
+
+logger = logging.getLogger(__name__)
+
+PROCESS_INFERENCE_KINDS = ('pose', 'emotion')
+# 等待一帧全部结果的超时（秒）
+PROCESS_INFERENCE_TIMEOUT = 2.0
+# 工作进程启动（加载模型）的超时（秒）
+PROCESS_INFERENCE_START_TIMEOUT = 30.0
+# 统计耗时的最近帧数
+PROCESS_TIMING_WINDOW = 100
+
+
+def landmarks_to_array(landmark_list, with_visibility: bool = False) -> np.ndarray:
+    """把MediaPipe关键点列表转换为 (N, 3) 或 (N, 4) 的float32数组"""
+    if with_visibility:
+        return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in landmark_list.landmark], dtype=np.float32)
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmark_list.landmark], dtype=np.float32)
+
+
+def array_to_landmarks(array: Optional[np.ndarray]):
+    """把关键点数组还原为MediaPipe的 NormalizedLandmarkList（供遮挡/角度计算和标注绘制使用）"""
+    if array is None:
+        return None
+    from mediapipe.framework.formats import landmark_pb2
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for row in array.tolist():
+        landmark = landmark_list.landmark.add()
+        landmark.x, landmark.y, landmark.z = row[0], row[1], row[2]
+        if len(row) > 3:
+            landmark.visibility = row[3]
+    return landmark_list
+
+
+def _create_analyzer(kind: str):
+    """在工作进程中创建分析器，返回 analyze(RGB图像, 参数) -> 紧凑结果"""
+    from modules.realtime_posture_analysis import EmotionAnalyzer, mp_pose
+
+    if kind == 'pose':
+        pose = mp_pose.Pose(
+            static_image_mode=False,
+            model_complexity=1,
+            smooth_landmarks=True,
+            min_detection_confidence=0.6,
+            min_tracking_confidence=0.5
+        )
+
+        def analyze_pose(image: np.ndarray, params: dict):
+            results = pose.process(image)
+            if not results.pose_landmarks:
+                return None
+            return landmarks_to_array(results.pose_landmarks, with_visibility=True)
+        return analyze_pose
+
+    if kind == 'emotion':
+        analyzer = EmotionAnalyzer()
+
+        def analyze_emotion(image: np.ndarray, params: dict):
+            params = dict(params or {})
+            roi = params.pop('roi', None)
+            for name, value in params.items():
+                setattr(analyzer, name, value)
+            # 情绪分析只用BGR帧取尺寸，直接传入RGB帧
+            emotion_state, face_landmarks, _, roi_missed = analyzer.analyze(image, image, roi)
+            landmarks = landmarks_to_array(face_landmarks) if face_landmarks is not None else None
+            return emotion_state.value, landmarks, roi_missed
+        return analyze_emotion
+
+    raise ValueError(f"未知的分析类型: {kind}")
+
+
+def _worker_main(kind: str, ring_name: str, shape: Sequence[int], slots: int,
+                 task_queue, result_queue):
+    """
+    工作进程入口
+
+    任务为 (槽位, 帧序号, 参数)，None 表示退出；结果为 (类型, 槽位, 帧序号, 结果, 耗时, 错误)。
+    启动完成后先发送 (类型, -1, 0, 'ready', 0, None)。
+    """
+    # 由主进程负责停止，不响应终端的Ctrl+C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ring = SharedFrameRing.attach(ring_name, shape, slots)
+    try:
+        analyze = _create_analyzer(kind)
+    except Exception as e:
+        result_queue.put((kind, -1, 0, None, 0.0, f"初始化失败: {str(e)}"))
+        ring.close()
+        return
+    result_queue.put((kind, -1, 0, 'ready', 0.0, None))
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            slot, seq, params = task
+            start = time.perf_counter()
+            payload, error = None, None
+            try:
+                ring_seq, image = ring.read(slot)
+                if ring_seq != seq:
+                    error = f"槽位 {slot} 帧序号不符: {ring_seq} != {seq}"
+                else:
+                    payload = analyze(image, params)
+            except Exception as e:
+                error = str(e)
+            result_queue.put((kind, slot, seq, payload, time.perf_counter() - start, error))
+    finally:
+        ring.close()
+
+
+class ProcessInferencePool:
+    """
+    姿势/情绪分析工作进程池
+
+    run() 把一帧写入共享内存帧环并同时提交给各工作进程，等全部结果返回后
+    以 {类型: 结果} 返回；与 ParallelInference 一样，返回时该帧已不再被任何工作进程使用。
+    结果格式：'pose' 为 (33, 4) 关键点数组或None；'emotion' 为 (情绪编号, (N, 3) 关键点数组或None, 面部裁剪区域是否未命中)。
+    """
+    def __init__(self, kinds: Sequence[str] = PROCESS_INFERENCE_KINDS, slots: int = 4,
+                 timeout: float = PROCESS_INFERENCE_TIMEOUT):
+        """
+        Args:
+            kinds: 分析类型，每种一个工作进程
+            slots: 共享内存帧环的槽位数（至少2，超时未归还的槽位不会被覆盖）
+            timeout: 等待一帧全部结果的超时（秒）
+        """
+        self.kinds = tuple(kinds)
+        self.slots = max(2, int(slots))
+        self.timeout = timeout
+        self._ctx = multiprocessing.get_context('spawn')
+        self.ring: Optional[SharedFrameRing] = None
+        self._processes: Dict[str, Any] = {}
+        self._task_queues: Dict[str, Any] = {}
+        self._result_queue = None
+        # 各工作进程已提交、尚未交回结果的槽位；槽位在所有进程交回后才可复用
+        self._pending: Dict[str, Set[int]] = {kind: set() for kind in self.kinds}
+        self._task_times = {kind: deque(maxlen=PROCESS_TIMING_WINDOW) for kind in self.kinds}
+        self._round_trips = deque(maxlen=PROCESS_TIMING_WINDOW)
+        self.stats = {
+            'frames': 0,
+            'timeouts': 0,
+            'errors': 0,
+            'restarts': 0,
+            'no_free_slot': 0
+        }
+
+    @property
+    def running(self) -> bool:
+        return self.ring is not None
+
+    def start(self, frame_shape: Sequence[int]):
+        """按帧形状创建共享内存帧环并启动全部工作进程，等待模型加载完成（失败时清理后抛出异常）"""
+        self.ring = SharedFrameRing(frame_shape, self.slots)
+        self._pending = {kind: set() for kind in self.kinds}
+        self._result_queue = self._ctx.Queue()
+        try:
+            for kind in self.kinds:
+                self._start_worker(kind)
+            self._wait_ready(set(self.kinds))
+        except Exception:
+            self.shutdown()
+            raise
+        logger.info(f"推理工作进程已启动: {', '.join(self.kinds)}（共享帧环 {self.ring.name}，"
+                    f"{self.slots} 槽位 × {tuple(self.ring.shape)}）")
+
+    def _start_worker(self, kind: str):
+        task_queue = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main, name=f"inference-{kind}", daemon=True,
+            args=(kind, self.ring.name, self.ring.shape, self.slots, task_queue, self._result_queue))
+        process.start()
+        self._task_queues[kind] = task_queue
+        self._processes[kind] = process
+
+    def _wait_ready(self, pending: set):
+        deadline = time.monotonic() + PROCESS_INFERENCE_START_TIMEOUT
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"推理工作进程启动超时: {', '.join(sorted(pending))}")
+            try:
+                kind, slot, _, payload, _, error = self._result_queue.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if slot >= 0:
+                self._pending[kind].discard(slot)
+                continue
+            if error:
+                raise RuntimeError(f"推理工作进程 {kind} {error}")
+            pending.discard(kind)
+
+    def _restart_dead_workers(self):
+        """重启已退出的工作进程，收回其未交回结果的槽位"""
+        dead = [kind for kind, process in self._processes.items() if not process.is_alive()]
+        if not dead:
+            return
+        for kind in dead:
+            logger.warning(f"推理工作进程 {kind} 已退出（exitcode={self._processes[kind].exitcode}），正在重启")
+            self.stats['restarts'] += 1
+            self._pending[kind].clear()
+            self._start_worker(kind)
+        self._wait_ready(set(dead))
+
+    def _drain(self):
+        """取出所有已到达的过期结果，归还其槽位"""
+        while True:
+            try:
+                kind, slot, _, _, _, _ = self._result_queue.get_nowait()
+            except queue.Empty:
+                return
+            if slot >= 0:
+                self._pending[kind].discard(slot)
+
+    def _free_slot(self) -> Optional[int]:
+        busy = set().union(*self._pending.values())
+        return next((slot for slot in range(self.slots) if slot not in busy), None)
+
+    def _acquire_slot(self) -> Optional[int]:
+        slot = self._free_slot()
+        if slot is None:
+            self._drain()
+            slot = self._free_slot()
+        return slot
+
+    def run(self, image: np.ndarray, seq: int, params: Optional[Dict[str, dict]] = None) -> Dict[str, Any]:
+        """
+        对一帧运行全部分析
+
+        Args:
+            image: RGB帧（只读），形状变化时重建帧环
+            seq: 帧序号
+            params: {类型: 参数}，随任务发送给对应的工作进程（如情绪阈值）
+
+        Returns:
+            {类型: 结果}
+
+        Raises:
+            TimeoutError: 工作进程未在超时内返回结果
+            RuntimeError: 没有空闲槽位或工作进程出错
+        """
+        if self.ring is None or image.shape != self.ring.shape:
+            if self.ring is not None:
+                logger.info(f"帧形状变为 {image.shape}，重建共享帧环")
+                self.shutdown()
+            self.start(image.shape)
+        self._restart_dead_workers()
+
+        slot = self._acquire_slot()
+        if slot is None:
+            self.stats['no_free_slot'] += 1
+            raise RuntimeError("共享帧环没有空闲槽位（工作进程处理过慢）")
+
+        start = time.perf_counter()
+        self.ring.write(slot, image, seq)
+        for kind in self.kinds:
+            self._pending[kind].add(slot)
+            self._task_queues[kind].put((slot, seq, (params or {}).get(kind)))
+
+        results: Dict[str, Any] = {}
+        errors = []
+        deadline = time.monotonic() + self.timeout
+        while len(results) < len(self.kinds):
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise queue.Empty
+                kind, result_slot, result_seq, payload, elapsed, error = self._result_queue.get(timeout=remaining)
+            except queue.Empty:
+                self.stats['timeouts'] += 1
+                missing = [kind for kind in self.kinds if kind not in results]
+                for kind in missing:
+                    # 积压的帧占满帧环说明工作进程已卡死，结束它以便下一帧重启
+                    if len(self._pending[kind]) >= self.slots - 1:
+                        self._processes[kind].terminate()
+                raise TimeoutError(f"推理工作进程超时未返回帧 {seq}: {', '.join(missing)}")
+            if result_slot < 0:
+                continue
+            self._pending[kind].discard(result_slot)
+            if result_seq != seq or result_slot != slot:
+                # 之前超时帧的迟到结果
+                continue
+            self._task_times[kind].append(elapsed)
+            if error:
+                errors.append(f"{kind}: {error}")
+            results[kind] = payload
+
+        self._round_trips.append(time.perf_counter() - start)
+        self.stats['frames'] += 1
+        if errors:
+            self.stats['errors'] += 1
+            raise RuntimeError(f"推理工作进程出错: {'; '.join(errors)}")
+        return results
+
+    def shutdown(self, wait: bool = True):
+        """
+        停止工作进程并释放共享内存
+
+        Args:
+            wait: 是否等待工作进程处理完当前帧后退出，False时直接结束进程
+        """
+        for kind, task_queue in self._task_queues.items():
+            try:
+                task_queue.put(None)
+            except Exception:
+                pass
+        for kind, process in self._processes.items():
+            if wait:
+                process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=1.0)
+        self._processes.clear()
+        self._task_queues.clear()
+        self._result_queue = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+    def get_status(self) -> dict:
+        def avg_ms(times) -> float:
+            return round(sum(times) / len(times) * 1000, 2) if times else 0.0
+
+        return {
+            'workers': {kind: {'pid': process.pid, 'alive': process.is_alive()}
+                        for kind, process in self._processes.items()},
+            'ring': self.ring.get_status() if self.ring is not None else None,
+            'slots_in_use': len(set().union(*self._pending.values())),
+            'task_ms_avg': {kind: avg_ms(times) for kind, times in self._task_times.items()},
+            'frame_ms_avg': avg_ms(self._round_trips),
+            'main_pid': os.getpid(),
+            **self.stats
+        }
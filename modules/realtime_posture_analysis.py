@@ -123,6 +123,17 @@ def calculate_head_angle(landmarks, frame_shape):
     except (IndexError, AttributeError, ValueError):
         return None, False, {}
 
+def _map_crop_landmarks(face_landmarks, roi, frame_shape):
+    """把裁剪区域内的归一化关键点就地换算为整帧的归一化坐标（z与x同一尺度）"""
+    h, w = frame_shape[:2]
+    x0, y0, x1, y1 = roi
+    sx, sy = (x1 - x0) / w, (y1 - y0) / h
+    ox, oy = x0 / w, y0 / h
+    for point in face_landmarks.landmark:
+        point.x = point.x * sx + ox
+        point.y = point.y * sy + oy
+        point.z = point.z * sx
+
 class EmotionAnalyzer:
     """面部情绪分析器"""
     def __init__(self):
@@ -133,6 +144,9 @@ class EmotionAnalyzer:
             min_detection_confidence=0.7,  # 检测置信度阈值
             min_tracking_confidence=0.5     # 跟踪置信度阈值
         )
+        # 面部裁剪区域的位置和大小逐帧变化，单独用静态图像模式的实例处理，
+        # 不打乱整帧实例的跟踪状态（首次使用时创建）
+        self.roi_face_mesh = None
         
         # 使用实例属性而非全局常量，便于动态调整
         self.emotion_smoothing_window = EMOTION_SMOOTHING_WINDOW
@@ -149,14 +163,40 @@ class EmotionAnalyzer:
         self.LEFT_BROW = [70, 63, 105, 66]   # 左眉毛特征点
         self.RIGHT_BROW = [300, 293, 334, 296] # 右眉毛特征点
 
-    def analyze(self, frame):
-        """分析当前帧面部情绪"""
+    def analyze(self, frame, frame_rgb=None, roi=None):
+        """分析当前帧面部情绪
+        
+        Args:
+            frame: BGR帧
+            frame_rgb: 同一帧的RGB版本（可选），已有时避免重复转换
+            roi: 面部裁剪区域 (x0, y0, x1, y1)（可选），面部网格只处理该区域，
+                 关键点映射回整帧坐标
+        
+        Returns:
+            (情绪, 面部关键点, 耗时, 裁剪区域内是否未找到面部)；
+            裁剪未命中时本帧不再处理整帧，由调用方下一帧改用整帧
+        """
         start_time = time.time()
-        results = self.face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if frame_rgb is None:
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if roi is not None:
+            if self.roi_face_mesh is None:
+                self.roi_face_mesh = mp_face_mesh.FaceMesh(
+                    static_image_mode=True,
+                    max_num_faces=1,
+                    refine_landmarks=True,
+                    min_detection_confidence=0.5
+                )
+            x0, y0, x1, y1 = roi
+            results = self.roi_face_mesh.process(np.ascontiguousarray(frame_rgb[y0:y1, x0:x1]))
+            if results.multi_face_landmarks:
+                _map_crop_landmarks(results.multi_face_landmarks[0], roi, frame.shape)
+        else:
+            results = self.face_mesh.process(frame_rgb)
         process_time = time.time() - start_time
         
         if not results.multi_face_landmarks:
-            return EmotionState.NEUTRAL, None, process_time
+            return EmotionState.NEUTRAL, None, process_time, roi is not None
         
         landmarks = results.multi_face_landmarks[0].landmark
         h, w = frame.shape[:2]
@@ -170,7 +210,7 @@ class EmotionAnalyzer:
         emotion = self._determine_emotion(mouth_ratio, eye_ratio, brow_pos)
         self.emotion_history.append(emotion)
         
-        return self._smooth_emotion(), results.multi_face_landmarks[0], process_time
+        return self._smooth_emotion(), results.multi_face_landmarks[0], process_time, False
 
     def _mouth_open_ratio(self, landmarks, h, w):
         """计算嘴部开合比例（垂直距离/水平宽度）"""
@@ -337,7 +377,7 @@ class PostureMonitor:
 
                 # 并行处理姿势和情绪检测
                 pose_result, is_occluded, angle_info, pose_time = self._process_pose(pose_frame)
-                emotion_state, face_landmarks, face_time = self.emotion_analyzer.analyze(emotion_frame)
+                emotion_state, face_landmarks, face_time, _ = self.emotion_analyzer.analyze(emotion_frame)
                 self.face_times.append(face_time)
 
                 # 绘制姿势界面
@@ -11,6 +11,7 @@ import numpy as np
 import cv2
 from modules.database_module import save_record_to_db, get_history_records, clear_history, clear_all_posture_records
 from modules.posture_module import WebPostureMonitor, posture_params
+from modules.jpeg_codec import encode_jpeg
 from config import DEBUG_BUTTON_VISIBLE  # 从config导入调试按钮显示配置
 
 # 尝试导入虚拟检测服务模块
@@ -2064,11 +2065,11 @@ def video_feed():
             img = np.ones((480, 640, 3), dtype=np.uint8) * 200
             
             # 将图像编码为JPEG并返回
-            success, buffer = cv2.imencode('.jpg', img, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-            if success:
+            buffer = encode_jpeg(img, 80)
+            if buffer is not None:
                 return Response(
                     (b'--frame\r\n'
-                     b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n'),
+                     b'Content-Type: image/jpeg\r\n\r\n' + buffer + b'\r\n'),
                     mimetype='multipart/x-mixed-replace; boundary=frame'
                 )
             return "视频流处理器未初始化", 503
@@ -2116,10 +2117,10 @@ def video_feed():
                             frame = cv2.resize(frame, (width, height))
                     
                     # 编码并返回帧
-                    success, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 90])
-                    if success:
+                    buffer = encode_jpeg(frame, 90)
+                    if buffer is not None:
                         yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+                               b'Content-Type: image/jpeg\r\n\r\n' + buffer + b'\r\n')
                     
                     # 控制帧率
                     time.sleep(0.033)  # 约30fps
@@ -2133,10 +2134,10 @@ def video_feed():
                 img = np.ones((480, 640, 3), dtype=np.uint8) * 200
                 
                 # 将图像编码为JPEG并返回
-                success, buffer = cv2.imencode('.jpg', img, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-                if success:
+                buffer = encode_jpeg(img, 80)
+                if buffer is not None:
                     yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+                           b'Content-Type: image/jpeg\r\n\r\n' + buffer + b'\r\n')
                 
                 # 防止循环过快
                 time.sleep(2)
@@ -0,0 +1,62 @@
+"""
+标注视频流API模块
+提供带姿势/情绪标注的MJPEG视频流；标注只在有人观看时按需绘制，异步推送，不占用线程池线程
+"""
+
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from modules.overlay_renderer import OVERLAY_KINDS
+from modules.stream_hub import ViewerLimitError, get_stream_hub, get_stream_profile, iter_mjpeg, request_device_type
+from modules.video_sessions import open_video_session
+from modules.video_stream_module import STREAM_RESOLUTION_LEVELS, RESOLUTION_ADJUST_INTERVAL
+
+def register_annotated_video_routes(app):
+    """
+    注册标注视频流路由
+
+    标注视频流（'pose' / 'emotion'）由 WebPostureMonitor 登记到流分发中心。
+
+    Args:
+        app: FastAPI应用
+    """
+
+    @app.get('/api/video/annotated/{kind}')
+    async def annotated_video_stream(request: Request, kind: str, adaptive: bool = True,
+                                     quality: Optional[int] = None, profile: Optional[str] = None):
+        """
+        姿势/情绪标注视频流
+
+        参数:
+            kind: 'pose' 或 'emotion'
+            adaptive: 是否按该客户端的网络状况自动选择分辨率和质量
+            quality: JPEG质量上限，默认使用视频流规格的质量
+            profile: 视频流规格 'mobile' / 'pc'，默认按设备类型选择
+
+        返回:
+            MJPEG视频流；标注视频流不可用时返回404，同时观看人数达到上限时返回503
+        """
+        hub = get_stream_hub()
+        if kind not in OVERLAY_KINDS or hub.get_source(kind) is None:
+            raise HTTPException(status_code=404, detail=f"标注视频流不可用: {kind}")
+        stream_profile = get_stream_profile(profile, request_device_type(request))
+        if quality:
+            stream_profile = stream_profile._replace(quality=min(stream_profile.quality, quality))
+        try:
+            subscription = hub.subscribe_profile(kind, stream_profile, adaptive,
+                                                 resolution_levels=STREAM_RESOLUTION_LEVELS,
+                                                 adjust_interval=RESOLUTION_ADJUST_INTERVAL)
+        except ViewerLimitError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        open_video_session(subscription, request, f'/api/video/annotated/{kind}', kind, stream_profile.name)
+
+        return StreamingResponse(
+            iter_mjpeg(subscription),
+            media_type="multipart/x-mixed-replace; boundary=frame",
+            headers={
+                "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
+                "Pragma": "no-cache",
+                "Expires": "0"
+            }
+        )
@@ -0,0 +1,58 @@
+"""
+原始视频流API模块
+提供家长监护用的原始（无标注）MJPEG视频流，异步推送，不占用线程池线程
+"""
+
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from modules.stream_hub import ViewerLimitError, get_stream_profile, request_device_type
+from modules.video_sessions import open_video_session
+
+def register_raw_video_routes(app, video_stream_handler):
+    """
+    注册原始视频流路由
+
+    Args:
+        app: FastAPI应用
+        video_stream_handler: VideoStreamHandler实例
+    """
+
+    @app.get('/api/video/raw')
+    async def raw_video_stream(request: Request, resolution: str = 'auto', profile: Optional[str] = None):
+        """
+        家长监护原始视频流
+
+        参数:
+            resolution: 'auto' 按该客户端的网络状况自动选择分辨率和质量；
+                        或固定分辨率 'high' / 'medium' / 'low' / '720p' / '480p' / '360p' / '240p'
+            profile: 'auto' 时的视频流规格 'mobile' / 'pc'，默认按设备类型选择
+
+        返回:
+            MJPEG视频流；同时观看人数达到上限时返回503
+        """
+        if resolution.isdigit():
+            resolution = f"{resolution}p"
+        try:
+            stream_profile = get_stream_profile(profile, request_device_type(request))
+            subscription = video_stream_handler.subscribe_raw_stream(resolution, stream_profile)
+        except ViewerLimitError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        try:
+            open_video_session(subscription, request, '/api/video/raw', 'raw',
+                               stream_profile.name if resolution == 'auto' else resolution)
+
+            return StreamingResponse(
+                video_stream_handler.generate_raw_video_stream_async(subscription),
+                media_type="multipart/x-mixed-replace; boundary=frame",
+                headers={
+                    "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
+                    "Pragma": "no-cache",
+                    "Expires": "0"
+                }
+            )
+        except Exception:
+            # 生成器尚未开始运行，不会替我们退订
+            subscription.close()
+            raise
@@ -6,12 +6,15 @@
 from fastapi import APIRouter, Request
 from fastapi.responses import JSONResponse
 from modules.camera_manager import get_camera_manager
+from modules.stream_hub import get_stream_profile
+from modules.video_sessions import get_video_session_registry
 
 def register_video_status_routes(app):
     """
     注册视频状态路由
     """
     camera_manager = get_camera_manager()
+    sessions = get_video_session_registry()
     
     @app.get('/api/video/status')
     async def video_status():
@@ -19,7 +22,8 @@ def register_video_status_routes(app):
         获取视频流状态API
         
         返回:
-            JSON: 包含摄像头状态信息
+            JSON: 包含摄像头状态信息；frame_rate 为实测的采集帧率，quality 为当前各会话中最高的JPEG质量，
+                  sessions 为正在观看的客户端及其实际投递统计
         """
         try:
             # 检查摄像头是否可用
@@ -34,22 +38,27 @@ def register_video_status_routes(app):
             elif camera_manager.running:
                 is_available = True
                 mode = "模拟摄像头"
-                
+
+            session_status = sessions.get_status()
+            qualities = [s["quality"] for s in session_status["sessions"] if s.get("quality")]
             return {
                 "available": is_available,
                 "running": camera_manager.running,
-                "frame_rate": 30,
-                "quality": 85,
+                "frame_rate": round(camera_manager.fps, 2),
+                "target_frame_rate": camera_manager.fps_target,
+                "quality": max(qualities) if qualities else get_stream_profile().quality,
                 "mode": mode,
-                "streaming": True
+                "streaming": session_status["active"] > 0,
+                "sessions": session_status,
+                "capture_buffers": camera_manager.get_buffer_pool_status()
             }
             
         except Exception as e:
             return {
                 "available": False,
                 "running": False,
-                "frame_rate": 30,
-                "quality": 85,
+                "frame_rate": 0,
+                "quality": get_stream_profile().quality,
                 "mode": "错误",
                 "streaming": False,
                 "error": str(e)
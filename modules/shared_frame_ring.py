@@ -0,0 +1,108 @@
+"""
+跨进程共享内存帧环
+
+在 multiprocessing.shared_memory 中开辟固定尺寸的帧槽位，主进程把待分析的帧拷贝进槽位后
+只把 (槽位, 帧序号) 发给推理进程，推理进程直接在共享内存上读取画面，帧数据不经过管道、不做序列化。
+
+内存布局：slots 个 int64 帧序号，随后是 slots 个 shape 大小的 uint8 帧。
+槽位的分配与回收由写入方（主进程）负责：槽位在所有读取方交回结果之前不会被覆盖。
+"""
+import sys
+import logging
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+    SHARED_MEMORY_AVAILABLE = True
+except ImportError:
+    SHARED_MEMORY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_SEQ_BYTES = np.dtype(np.int64).itemsize
+
+
+class SharedFrameRing:
+    """
+    共享内存帧环
+
+    写入方用 SharedFrameRing(shape, slots) 创建并负责 unlink；读取方用 SharedFrameRing.attach() 连接。
+    """
+    def __init__(self, shape: Sequence[int], slots: int = 4, name: Optional[str] = None):
+        """
+        Args:
+            shape: 帧形状，如 (480, 640, 3)
+            slots: 槽位数
+            name: 已有共享内存的名称（读取方），None表示新建（写入方）
+        """
+        if not SHARED_MEMORY_AVAILABLE:
+            raise RuntimeError("当前Python不支持 multiprocessing.shared_memory")
+        self.shape: Tuple[int, ...] = tuple(int(d) for d in shape)
+        self.slots = int(slots)
+        self.frame_bytes = int(np.prod(self.shape))
+        self._owner = name is None
+        if self._owner:
+            size = self.slots * (_SEQ_BYTES + self.frame_bytes)
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        elif sys.version_info >= (3, 13):
+            # 读取方不登记到资源跟踪器，避免其退出时误删写入方的共享内存
+            self._shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._seqs = np.ndarray((self.slots,), dtype=np.int64, buffer=self._shm.buf)
+        self._frames = np.ndarray((self.slots,) + self.shape, dtype=np.uint8,
+                                  buffer=self._shm.buf, offset=self.slots * _SEQ_BYTES)
+        if self._owner:
+            self._seqs[:] = 0
+
+    @classmethod
+    def attach(cls, name: str, shape: Sequence[int], slots: int) -> 'SharedFrameRing':
+        """连接写入方创建的帧环"""
+        return cls(shape, slots, name=name)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def nbytes(self) -> int:
+        return self._shm.size
+
+    def write(self, slot: int, image: np.ndarray, seq: int):
+        """把帧拷贝进槽位（一次内存拷贝），形状必须与帧环一致"""
+        if image.shape != self.shape:
+            raise ValueError(f"帧形状 {image.shape} 与共享帧环 {self.shape} 不一致")
+        np.copyto(self._frames[slot], image)
+        self._seqs[slot] = seq
+
+    def read(self, slot: int) -> Tuple[int, np.ndarray]:
+        """
+        读取槽位
+
+        Returns:
+            (帧序号, 只读视图)；视图直接引用共享内存，在交回结果前有效
+        """
+        view = self._frames[slot]
+        view.flags.writeable = False
+        return int(self._seqs[slot]), view
+
+    def close(self):
+        """断开共享内存；写入方同时删除共享内存"""
+        self._seqs = None
+        self._frames = None
+        try:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+        except (FileNotFoundError, BufferError) as e:
+            logger.debug(f"关闭共享帧环 {self._shm.name} 时出错: {str(e)}")
+
+    def get_status(self) -> dict:
+        return {
+            'name': self.name,
+            'shape': list(self.shape),
+            'slots': self.slots,
+            'bytes': self.nbytes
+        }
@@ -0,0 +1,159 @@
+"""
+快照缓存模块
+
+在内存中缓存视频源最新一帧的JPEG快照，按帧序号失效，不写磁盘。
+原尺寸快照直接使用摄像头管理器的JPEG（MJPEG直通数据或每帧一次的编码结果），
+缩小版本按 (宽度, 质量) 每帧只编码一次；配合ETag，客户端在没有新帧时得到304。
+"""
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import cv2
+
+from modules.camera_manager import JpegFrame
+from modules.jpeg_codec import encode_jpeg
+
+logger = logging.getLogger(__name__)
+
+# 缩小快照的最小宽度
+SNAPSHOT_MIN_WIDTH = 64
+# 同一帧最多缓存的缩小版本数
+SNAPSHOT_MAX_VARIANTS = 8
+
+# 进程启动标识，避免重启后帧序号从头计数导致客户端误判ETag未变
+_BOOT_ID = f"{int(time.time()):x}"
+
+
+def snapshot_etag(jpeg: JpegFrame, quality: Optional[int] = None) -> str:
+    """快照的强ETag：视频源、帧序号、尺寸（和重新编码时的质量）唯一确定JPEG内容"""
+    tag = f"{_BOOT_ID}-{jpeg.source_id}-{jpeg.seq}-{jpeg.width}x{jpeg.height}"
+    if quality is not None and not jpeg.passthrough:
+        tag += f"-q{quality}"
+    return f'"{tag}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较，支持多个ETag和 *）"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class SnapshotCache:
+    """
+    视频源最新一帧的JPEG快照缓存
+
+    视频源需提供 wait_for_jpeg()；缩小版本还需要 acquire_latest_frame()（CameraManager）。
+    """
+    def __init__(self, source, quality: int = 85, max_variants: int = SNAPSHOT_MAX_VARIANTS):
+        """
+        Args:
+            source: 视频源（CameraManager）
+            quality: 默认JPEG质量（MJPEG直通的原尺寸快照不重新编码，质量不生效）
+            max_variants: 同一帧最多缓存的缩小版本数
+        """
+        self.source = source
+        self.quality = quality
+        self.max_variants = max_variants
+        self._lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+        # 缩小版本 {(宽度, 质量): JpegFrame}，只保留最新一帧的结果
+        self._variants: 'OrderedDict[Tuple[int, int], JpegFrame]' = OrderedDict()
+        self._variants_seq = 0
+
+        self.stats = {
+            'requests': 0,
+            'hits': 0,          # 直接使用已有JPEG（源JPEG或已缓存的缩小版本）
+            'encoded': 0,       # 新编码的缩小版本
+            'not_modified': 0   # 返回304的请求
+        }
+
+    def get(self, width: Optional[int] = None, quality: Optional[int] = None) -> Optional[JpegFrame]:
+        """
+        获取最新一帧的快照
+
+        Args:
+            width: 输出宽度（按比例缩小，不放大），None表示原尺寸
+            quality: JPEG质量，None使用默认质量
+
+        Returns:
+            JpegFrame；视频源尚无帧时返回None
+        """
+        quality = int(quality or self.quality)
+        self.stats['requests'] += 1
+        jpeg = self.source.wait_for_jpeg(0, timeout=0, quality=quality)
+        if jpeg is None:
+            return None
+        if not width or width >= jpeg.width:
+            self.stats['hits'] += 1
+            return jpeg
+
+        width = max(SNAPSHOT_MIN_WIDTH, int(width))
+        key = (width, quality)
+        with self._lock:
+            if self._variants_seq != jpeg.seq:
+                self._variants.clear()
+                self._variants_seq = jpeg.seq
+            cached = self._variants.get(key)
+            if cached is not None:
+                self._variants.move_to_end(key)
+                self.stats['hits'] += 1
+                return cached
+
+        # 同一时刻的多个请求只编码一次
+        with self._encode_lock:
+            with self._lock:
+                cached = self._variants.get(key) if self._variants_seq == jpeg.seq else None
+            if cached is not None:
+                self.stats['hits'] += 1
+                return cached
+            variant = self._encode_variant(width, quality)
+        if variant is None:
+            return jpeg
+
+        with self._lock:
+            if variant.seq >= self._variants_seq:
+                if variant.seq != self._variants_seq:
+                    self._variants.clear()
+                    self._variants_seq = variant.seq
+                self._variants[key] = variant
+                while len(self._variants) > self.max_variants:
+                    self._variants.popitem(last=False)
+        return variant
+
+    def _encode_variant(self, width: int, quality: int) -> Optional[JpegFrame]:
+        """把最新的解码帧按比例缩小到width并编码"""
+        ref = self.source.acquire_latest_frame()
+        if ref is None:
+            return None
+        with ref:
+            src_h, src_w = ref.image.shape[:2]
+            height = max(1, round(src_h * width / src_w))
+            # 任意宽度的缩放结果不登记为摄像头管理器的派生帧，避免为每种宽度各建一个环形缓冲区
+            image = cv2.resize(ref.image, (width, height), interpolation=cv2.INTER_AREA)
+            data = encode_jpeg(image, quality)
+            if data is None:
+                return None
+            self.stats['encoded'] += 1
+            return JpegFrame(ref.seq, ref.capture_time, data, width, height, ref.source_id)
+
+    def get_status(self) -> dict:
+        with self._lock:
+            variants = [f"{w}px q{q}" for w, q in self._variants]
+        return {
+            'quality': self.quality,
+            'latest_seq': self._variants_seq,
+            'variants': variants,
+            **self.stats
+        }
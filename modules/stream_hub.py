@@ -0,0 +1,787 @@
+"""
+MJPEG流分发中心 - 一次编码，多路广播
+
+每个 (视频流, JPEG质量, 输出尺寸, 帧率上限) 组合对应一个编码通道，每帧只编码一次，
+所有订阅者拿到的是同一个bytes对象；通道只在有订阅者时运行编码线程，
+最后一个订阅者离开后自动停止，没人观看时不做任何编码。
+
+异步接口（next_part_async / iter_mjpeg）由新帧事件驱动，不占用线程池线程；
+订阅者只取最新帧，慢速客户端直接跳到最新一帧而不会堆积。
+
+视频流规格（STREAM_PROFILES，如 mobile: 320x240 q60 10fps；pc: 640x480 q85 25fps）按设备类型
+或请求参数选择，同一规格的客户端共用编码通道。
+"""
+import asyncio
+import threading
+import time
+import weakref
+import logging
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, NamedTuple, Sequence, Tuple
+
+import cv2
+
+from modules.camera_manager import JpegFrame, get_camera_manager
+from modules.jpeg_codec import encode_jpeg
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import MJPEG_MAX_VIEWERS
+except ImportError:
+    MJPEG_MAX_VIEWERS = 8
+
+try:
+    from config import STREAM_PASSTHROUGH_MIN_QUALITY
+except ImportError:
+    STREAM_PASSTHROUGH_MIN_QUALITY = 80
+
+try:
+    from config import STREAM_PROFILES
+except ImportError:
+    STREAM_PROFILES = {
+        'mobile': {'size': (320, 240), 'quality': 60, 'fps': 10},
+        'pc': {'size': (640, 480), 'quality': 85, 'fps': 25},
+    }
+
+DEFAULT_STREAM_PROFILE = 'pc'
+
+# User-Agent 中表示移动设备的关键字
+MOBILE_UA_KEYWORDS = ('iphone', 'android', 'mobile', 'tablet')
+
+MJPEG_BOUNDARY = b'frame'
+
+# 自适应订阅默认的JPEG质量档位（从高到低）
+STREAM_QUALITY_LEVELS = (85, 65, 50)
+
+
+def mjpeg_part(data: bytes) -> bytes:
+    """把一帧JPEG封装为multipart/x-mixed-replace的一个分段"""
+    return b'--' + MJPEG_BOUNDARY + b'\r\nContent-Type: image/jpeg\r\n\r\n' + data + b'\r\n'
+
+
+class ViewerLimitError(RuntimeError):
+    """同时观看的客户端数量已达上限"""
+
+
+class StreamKey(NamedTuple):
+    """编码通道键：视频流名称、JPEG质量、输出尺寸 (宽, 高)（None表示源尺寸）、编码帧率上限（None表示不限）"""
+    stream: str
+    quality: int
+    size: Optional[Tuple[int, int]] = None
+    fps: Optional[float] = None
+
+
+class StreamProfile(NamedTuple):
+    """命名的视频流规格：输出尺寸、JPEG质量和帧率的上限"""
+    name: str
+    size: Tuple[int, int]
+    quality: int
+    fps: float
+
+
+def get_stream_profile(name: Optional[str] = None, device_type: Optional[str] = None) -> StreamProfile:
+    """
+    选择视频流规格
+
+    Args:
+        name: 请求显式指定的规格名（如查询参数 profile），优先使用
+        device_type: 设备类型 'pc' / 'mobile'（由请求头检测）
+
+    Returns:
+        StreamProfile；名称都未知时使用 'pc' 规格
+    """
+    for candidate in (name, device_type, DEFAULT_STREAM_PROFILE):
+        if candidate and candidate in STREAM_PROFILES:
+            break
+    else:
+        candidate = next(iter(STREAM_PROFILES))
+    spec = STREAM_PROFILES[candidate]
+    return StreamProfile(candidate, tuple(spec['size']), int(spec['quality']), float(spec['fps']))
+
+
+def request_device_type(request) -> str:
+    """
+    HTTP/WebSocket请求的设备类型 'pc' / 'mobile'
+
+    优先使用查询参数 device 覆盖和设备检测中间件的结果（scope['device_type']），
+    否则按 X-Device-Type 请求头和 User-Agent 判断。
+    """
+    override = request.query_params.get('device')
+    if override in ('pc', 'mobile'):
+        return override
+    device = request.scope.get('device_type')
+    if device in ('pc', 'mobile'):
+        return device
+    hint = request.headers.get('x-device-type', '').lower()
+    if hint in ('pc', 'mobile'):
+        return hint
+    ua = request.headers.get('user-agent', '').lower()
+    return 'mobile' if any(keyword in ua for keyword in MOBILE_UA_KEYWORDS) else 'pc'
+
+
+class MJPEGChannel:
+    """
+    单个编码通道
+
+    编码线程从视频源等待新帧，编码一次后更新最新帧并唤醒所有订阅者。
+    视频源需提供 wait_for_frame(after_seq, timeout, consumer_id)（返回FrameRef）；
+    若同时提供 wait_for_jpeg 且不需要缩放，则直接取源的JPEG（如MJPEG直通数据）。
+    """
+    def __init__(self, key: StreamKey, source):
+        self.key = key
+        self.source = source
+        self.consumer_id = f"stream_hub:{key.stream}:q{key.quality}" + (
+            f":{key.size[0]}x{key.size[1]}" if key.size else "") + (f":{key.fps:g}fps" if key.fps else "")
+
+        self._lock = threading.Lock()
+        self._frame_ready = threading.Condition(self._lock)
+        self._subscribers = 0
+        self._thread: Optional[threading.Thread] = None
+        # 异步订阅者的新帧事件 {订阅: (事件循环, asyncio.Event)}
+        self._async_waiters: Dict['StreamSubscription', Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = {}
+
+        # 最新一帧及其multipart分段（所有订阅者共享同一个bytes对象）
+        self.latest: Optional[JpegFrame] = None
+        self.latest_part: Optional[bytes] = None
+        self.published = 0   # 已发布的帧数（latest 为第 published 帧）
+
+        self.stats = {
+            'encoded': 0,        # 本通道编码的帧数
+            'reused': 0,         # 直接使用源JPEG（直通或源侧已编码）的帧数
+            'errors': 0,
+            'started': 0         # 编码线程启动次数
+        }
+
+    @property
+    def subscribers(self) -> int:
+        return self._subscribers
+
+    def acquire(self):
+        """增加一个订阅者，必要时启动编码线程"""
+        with self._lock:
+            self._subscribers += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True,
+                                                name=f"MJPEGChannel-{self.consumer_id}")
+                self.stats['started'] += 1
+                self._thread.start()
+
+    def release(self, subscription: Optional['StreamSubscription'] = None):
+        """减少一个订阅者，编码线程在没有订阅者后自行退出"""
+        with self._lock:
+            self._subscribers = max(0, self._subscribers - 1)
+            self._async_waiters.pop(subscription, None)
+
+    def add_async_waiter(self, subscription: 'StreamSubscription', loop: asyncio.AbstractEventLoop,
+                         event: asyncio.Event):
+        """登记异步订阅者的新帧事件，新帧编码完成后在其事件循环中置位"""
+        with self._lock:
+            self._async_waiters[subscription] = (loop, event)
+
+    def wait(self, after_seq: int = 0, timeout: Optional[float] = None) -> Optional[JpegFrame]:
+        """
+        等待序号大于after_seq的已编码帧
+
+        Returns:
+            JpegFrame；超时返回None
+        """
+        with self._frame_ready:
+            if not self._frame_ready.wait_for(
+                    lambda: self.latest is not None and self.latest.seq > after_seq, timeout):
+                return None
+            return self.latest
+
+    def _run(self):
+        """编码线程：有订阅者时持续编码新帧"""
+        logger.info(f"编码通道 {self.consumer_id} 已启动")
+        last_seq = 0
+        interval = 1.0 / self.key.fps if self.key.fps else 0.0
+        next_due = 0.0
+        while True:
+            with self._lock:
+                if self._subscribers == 0:
+                    # 在锁内注销并清除线程：同一通道重新启动的编码线程沿用同一个consumer_id，
+                    # 只有在旧线程注销完成后才会启动，不会被旧线程误注销
+                    if hasattr(self.source, 'unregister_consumer'):
+                        self.source.unregister_consumer(self.consumer_id)
+                    self._thread = None
+                    break
+            if interval:
+                # 按帧率上限编码，期间到达的帧直接跳过（不解码、不编码）
+                wait = next_due - time.monotonic()
+                if wait > 0:
+                    time.sleep(min(wait, 0.5))
+                    continue
+            try:
+                jpeg = self._next_frame(last_seq)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"编码通道 {self.consumer_id} 出错: {str(e)}")
+                time.sleep(0.5)
+                continue
+            if jpeg is None:
+                continue
+            last_seq = jpeg.seq
+            if interval:
+                now = time.monotonic()
+                # 落后不足一个周期时按固定节拍推进，否则从当前时刻重新计时
+                next_due = next_due + interval if now - next_due < interval else now + interval
+            part = mjpeg_part(jpeg.data)
+            with self._frame_ready:
+                self.latest = jpeg
+                self.latest_part = part
+                self.published += 1
+                self._frame_ready.notify_all()
+                waiters = list(self._async_waiters.values())
+            for loop, event in waiters:
+                try:
+                    loop.call_soon_threadsafe(event.set)
+                except RuntimeError:
+                    # 事件循环已关闭
+                    pass
+
+        logger.info(f"编码通道 {self.consumer_id} 已停止（无订阅者）")
+
+    def _next_frame(self, last_seq: int) -> Optional[JpegFrame]:
+        """从视频源取下一帧并编码，超时返回None（以便检查订阅者数量）"""
+        quality, size = self.key.quality, self.key.size
+        if size is None and hasattr(self.source, 'wait_for_jpeg'):
+            # 摄像头直通的JPEG不受quality控制：低质量档位要求重新编码，降档才能真正减少码率
+            jpeg = self.source.wait_for_jpeg(last_seq, timeout=0.5, consumer_id=self.consumer_id, quality=quality,
+                                             passthrough=quality >= STREAM_PASSTHROUGH_MIN_QUALITY)
+            if jpeg is not None:
+                self.stats['reused'] += 1
+            return jpeg
+
+        ref = self.source.wait_for_frame(last_seq, timeout=0.5, consumer_id=self.consumer_id)
+        if ref is None:
+            return None
+        with ref:
+            if size is not None and hasattr(self.source, 'acquire_variant'):
+                # 缩放结果与其他同尺寸订阅共享
+                with self.source.acquire_variant(ref, size) as variant:
+                    data = encode_jpeg(variant.image, quality)
+                    shape = variant.image.shape
+            else:
+                image = ref.image
+                if size is not None and (image.shape[1], image.shape[0]) != tuple(size):
+                    image = cv2.resize(image, tuple(size), interpolation=cv2.INTER_AREA)
+                data = encode_jpeg(image, quality)
+                shape = image.shape
+            if data is None:
+                self.stats['errors'] += 1
+                return None
+            self.stats['encoded'] += 1
+            return JpegFrame(ref.seq, ref.capture_time, data, shape[1], shape[0], ref.source_id)
+
+    def get_status(self) -> dict:
+        latest = self.latest
+        return {
+            "stream": self.key.stream,
+            "quality": self.key.quality,
+            "size": f"{self.key.size[0]}x{self.key.size[1]}" if self.key.size else None,
+            "fps_limit": self.key.fps,
+            "subscribers": self._subscribers,
+            "running": self._thread is not None,
+            "latest_seq": latest.seq if latest is not None else 0,
+            "latest_bytes": len(latest.data) if latest is not None else 0,
+            **self.stats
+        }
+
+
+class StreamSubscription:
+    """
+    一个客户端对编码通道的订阅
+
+    用完后必须调用 close()（或使用 with 语句），否则通道会一直编码。
+    """
+    def __init__(self, channel: MJPEGChannel):
+        self.channel = channel
+        self.last_seq = 0
+        self.closed = False
+        self.sent = 0
+        self.skipped = 0     # 客户端跟不上时跳过的帧数
+        self.session = None  # 视频会话（VideoSession），登记后每取一帧计入会话统计
+        self.last_frame: Optional[JpegFrame] = None  # 最近一次取到的帧（multipart接口只返回分段字节）
+        self._last_index = 0  # 上次取到的帧在通道中的发布序号
+        self._event: Optional[asyncio.Event] = None
+        channel.acquire()
+
+    def _take(self, jpeg: JpegFrame):
+        """记录取到的一帧，统计跳过的帧数"""
+        # 按通道发布的帧计算，通道按帧率上限未编码的源帧不算客户端跳帧
+        index = self.channel.published
+        skipped = max(0, index - self._last_index - 1) if self._last_index else 0
+        self._last_index = index
+        self.skipped += skipped
+        self.last_seq = jpeg.seq
+        self.last_frame = jpeg
+        self.sent += 1
+        if self.session is not None:
+            self.session.record_frame(len(jpeg.data), skipped)
+
+    def next_frame(self, timeout: Optional[float] = None) -> Optional[JpegFrame]:
+        """等待比上次取到的更新的一帧，超时返回None"""
+        jpeg = self.channel.wait(self.last_seq, timeout)
+        if jpeg is not None:
+            self._take(jpeg)
+        return jpeg
+
+    def next_part(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """等待下一帧并返回其multipart分段（与其他订阅者共享同一个bytes对象）"""
+        with self.channel._frame_ready:
+            if not self.channel._frame_ready.wait_for(
+                    lambda: self.channel.latest is not None and self.channel.latest.seq > self.last_seq, timeout):
+                return None
+            self._take(self.channel.latest)
+            return self.channel.latest_part
+
+    def _poll_frame(self) -> Optional[JpegFrame]:
+        """不阻塞地取比上次更新的最新帧"""
+        with self.channel._lock:
+            latest = self.channel.latest
+            if latest is None or latest.seq <= self.last_seq:
+                return None
+            self._take(latest)
+            return latest
+
+    def _poll_part(self) -> Optional[bytes]:
+        """不阻塞地取比上次更新的最新帧分段"""
+        with self.channel._lock:
+            latest = self.channel.latest
+            if latest is None or latest.seq <= self.last_seq:
+                return None
+            self._take(latest)
+            return self.channel.latest_part
+
+    async def _wait_async(self, poll, timeout: Optional[float]):
+        """异步轮询 poll()，无新帧时等待编码线程的新帧事件"""
+        if self._event is None:
+            self._event = asyncio.Event()
+            self.channel.add_async_waiter(self, asyncio.get_running_loop(), self._event)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._event.clear()
+            result = poll()
+            if result is not None:
+                return result
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    async def next_part_async(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """
+        异步等待下一帧的multipart分段，由编码线程的新帧事件唤醒
+
+        客户端发送较慢时，期间到达的帧不会排队，下次直接取最新一帧。
+
+        Returns:
+            分段字节；超时返回None
+        """
+        return await self._wait_async(self._poll_part, timeout)
+
+    async def next_frame_async(self, timeout: Optional[float] = None) -> Optional[JpegFrame]:
+        """异步等待下一帧（JpegFrame，供WebSocket等非multipart通道使用），超时返回None"""
+        return await self._wait_async(self._poll_frame, timeout)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.channel.release(self)
+            if self.session is not None:
+                self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class AdaptiveSubscription:
+    """
+    按客户端自身网络状况自动选择质量/分辨率档位的订阅
+
+    每个客户端单独测量发送耗时（上一帧交给服务器到请求下一帧的间隔，即发送完成时间）、
+    帧延迟（捕获到发送的时间）和因跟不上而跳过的帧比例，定期在档位表中升降一档。
+    各档位都是流分发中心的共享编码通道，同档位的客户端共享编码结果，
+    一个网络差的客户端降档不会影响其他客户端。
+    """
+    def __init__(self, hub: 'StreamHub', stream: str, tiers: Sequence[StreamKey], start_tier: int = 0,
+                 target_fps: float = 25, adjust_interval: float = 5.0):
+        """
+        Args:
+            hub: 流分发中心
+            stream: 视频流名称
+            tiers: 档位表，从最高质量到最低质量排列
+            start_tier: 初始档位索引
+            target_fps: 目标帧率，发送一帧的耗时超过其帧间隔视为带宽不足
+            adjust_interval: 两次调整档位之间的最短间隔（秒）
+        """
+        self.hub = hub
+        self.stream = stream
+        self.tiers = list(tiers)
+        self.tier = max(0, min(start_tier, len(self.tiers) - 1))
+        self.target_fps = target_fps
+        self.adjust_interval = adjust_interval
+        self.switches = 0
+        self.closed = False
+
+        self._sub = hub._open(self.tiers[self.tier], check_limit=True)
+        self._send_times = deque(maxlen=30)
+        self._lags = deque(maxlen=30)
+        self._sent_at: Optional[float] = None
+        self._reset_window(time.monotonic())
+
+    @property
+    def channel(self) -> MJPEGChannel:
+        return self._sub.channel
+
+    @property
+    def last_seq(self) -> int:
+        return self._sub.last_seq
+
+    @property
+    def sent(self) -> int:
+        return self._sub.sent
+
+    @property
+    def skipped(self) -> int:
+        return self._sub.skipped
+
+    @property
+    def session(self):
+        return self._sub.session
+
+    @session.setter
+    def session(self, session):
+        self._sub.session = session
+
+    def _reset_window(self, now: float):
+        self._window_start = now
+        self._window_sent = 0
+        self._window_skipped = 0
+
+    def _before_request(self):
+        """请求下一帧前：记录上一帧的发送耗时，并按需调整档位"""
+        now = time.monotonic()
+        if self._sent_at is not None:
+            # 从交出上一帧到再次请求之间的时间即该帧的发送耗时
+            self._send_times.append(now - self._sent_at)
+            self._sent_at = None
+        self._maybe_adjust(now)
+
+    def _after_take(self, jpeg: Optional[JpegFrame], skipped_before: int):
+        """取到一帧后：记录跳帧数与帧延迟"""
+        if jpeg is None:
+            return
+        self._window_sent += 1
+        self._window_skipped += self._sub.skipped - skipped_before
+        self._lags.append(jpeg.age())
+        self._sent_at = time.monotonic()
+
+    async def next_part_async(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """异步等待下一帧的multipart分段，并按测得的发送状况调整档位"""
+        self._before_request()
+        skipped_before = self._sub.skipped
+        part = await self._sub.next_part_async(timeout)
+        if part is not None:
+            # 等待期间通道可能已发布更新的帧，按订阅实际取到的帧计算延迟
+            self._after_take(self._sub.last_frame, skipped_before)
+        return part
+
+    async def next_frame_async(self, timeout: Optional[float] = None) -> Optional[JpegFrame]:
+        """
+        异步等待下一帧（JpegFrame），并按测得的发送状况调整档位
+
+        对带确认的通道，交出一帧到再次请求的间隔包含等待客户端确认的时间，
+        因此测得的"发送耗时"反映的是客户端实际的接收速度。
+        """
+        self._before_request()
+        skipped_before = self._sub.skipped
+        jpeg = await self._sub.next_frame_async(timeout)
+        self._after_take(jpeg, skipped_before)
+        return jpeg
+
+    def _maybe_adjust(self, now: float):
+        """每个调整周期根据发送耗时、帧延迟和跳帧比例升降一档"""
+        if now - self._window_start < self.adjust_interval or not self._window_sent:
+            return
+        frame_interval = 1.0 / self.target_fps
+        send_time = sum(self._send_times) / len(self._send_times) if self._send_times else 0.0
+        lag = sum(self._lags) / len(self._lags) if self._lags else 0.0
+        skip_ratio = self._window_skipped / (self._window_sent + self._window_skipped)
+
+        if (send_time > frame_interval or lag > 0.5 or skip_ratio > 0.3) and self.tier < len(self.tiers) - 1:
+            self._switch(self.tier + 1, f"发送 {send_time * 1000:.0f}ms，延迟 {lag * 1000:.0f}ms，跳帧 {skip_ratio:.0%}")
+        elif send_time < frame_interval * 0.3 and lag < 0.2 and skip_ratio < 0.05 and self.tier > 0:
+            self._switch(self.tier - 1, f"发送 {send_time * 1000:.0f}ms，延迟 {lag * 1000:.0f}ms")
+        self._reset_window(now)
+
+    def _switch(self, tier: int, reason: str):
+        """切换到另一个档位的编码通道（先订阅新通道再退订旧通道，不计入观看人数上限）"""
+        key = self.tiers[tier]
+        new_sub = self.hub._open(key)
+        new_sub.last_seq = self._sub.last_seq
+        new_sub.sent, new_sub.skipped = self._sub.sent, self._sub.skipped
+        new_sub.session, self._sub.session = self._sub.session, None
+        old_sub, self._sub = self._sub, new_sub
+        old_sub.close()
+        direction = "降至" if tier > self.tier else "升至"
+        self.tier = tier
+        self.switches += 1
+        self._send_times.clear()
+        self._lags.clear()
+        size = f"{key.size[0]}x{key.size[1]}" if key.size else "源分辨率"
+        logger.info(f"视频流 {self.stream} 客户端{direction}档位 {tier}（{size}，质量 {key.quality}）：{reason}")
+
+    def get_status(self) -> dict:
+        key = self.tiers[self.tier]
+        send_time = sum(self._send_times) / len(self._send_times) if self._send_times else 0.0
+        lag = sum(self._lags) / len(self._lags) if self._lags else 0.0
+        return {
+            "stream": self.stream,
+            "tier": self.tier,
+            "quality": key.quality,
+            "size": f"{key.size[0]}x{key.size[1]}" if key.size else None,
+            "switches": self.switches,
+            "send_ms_avg": round(send_time * 1000, 2),
+            "lag_ms_avg": round(lag * 1000, 2),
+            "sent": self._sub.sent,
+            "skipped": self._sub.skipped
+        }
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._sub.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class StreamHub:
+    """
+    MJPEG流分发中心
+
+    视频流按名称登记（默认 'raw' 为主摄像头的原始画面），客户端通过 subscribe() 获取订阅，
+    相同 (视频流, 质量, 尺寸) 的订阅共享同一个编码通道。
+    """
+    def __init__(self, max_viewers: int = MJPEG_MAX_VIEWERS):
+        """
+        Args:
+            max_viewers: 所有视频流合计的同时观看客户端上限，0表示不限制
+        """
+        self.max_viewers = max_viewers
+        self._lock = threading.Lock()
+        self._sources: Dict[str, object] = {}
+        self._channels: Dict[StreamKey, MJPEGChannel] = {}
+        self._adaptive = weakref.WeakSet()
+        self.rejected = 0
+
+    def register_source(self, name: str, source):
+        """登记（或替换）一个视频流"""
+        with self._lock:
+            self._sources[name] = source
+        logger.info(f"视频流 {name} 已登记到流分发中心")
+
+    def get_source(self, name: str):
+        """获取视频流对应的视频源，'raw' 未登记时使用默认摄像头管理器"""
+        with self._lock:
+            source = self._sources.get(name)
+        if source is None and name == 'raw':
+            source = get_camera_manager()
+            self.register_source('raw', source)
+        return source
+
+    def subscribe(self, stream: str = 'raw', quality: int = 85,
+                  size: Optional[Tuple[int, int]] = None, fps: Optional[float] = None) -> StreamSubscription:
+        """
+        订阅一个视频流
+
+        Args:
+            stream: 视频流名称
+            quality: JPEG质量
+            size: 输出尺寸 (宽, 高)，None表示保持源尺寸
+            fps: 编码帧率上限，None表示跟随视频源
+
+        Returns:
+            StreamSubscription，用完后需 close()
+
+        Raises:
+            ViewerLimitError: 同时观看的客户端数量已达上限
+        """
+        key = StreamKey(stream, int(quality), tuple(size) if size else None, fps)
+        return self._open(key, check_limit=True)
+
+    def subscribe_profile(self, stream: str, profile: StreamProfile, adaptive: bool = True,
+                          resolution_levels: Sequence[Tuple[int, int]] = (),
+                          quality_levels: Sequence[int] = STREAM_QUALITY_LEVELS,
+                          adjust_interval: float = 5.0):
+        """
+        按视频流规格订阅：输出尺寸、JPEG质量和编码帧率都不超过规格
+
+        同一规格的客户端共用编码通道，每帧只编码一次。
+
+        Args:
+            stream: 视频流名称
+            profile: 视频流规格（get_stream_profile()）
+            adaptive: 是否在规格以下的档位中按客户端发送状况自动升降
+            resolution_levels: 自适应时的分辨率档位，超过规格尺寸的档位被忽略
+            quality_levels: 自适应时的JPEG质量档位，以规格质量为上限
+            adjust_interval: 两次调整档位之间的最短间隔（秒）
+
+        Returns:
+            StreamSubscription 或 AdaptiveSubscription，用完后需 close()
+
+        Raises:
+            ViewerLimitError: 同时观看的客户端数量已达上限
+        """
+        if not adaptive:
+            key = self._build_tiers(stream, [profile.size], [profile.quality], profile.quality,
+                                    max_size=profile.size, fps=profile.fps)[0]
+            return self._open(key, check_limit=True)
+        return self.subscribe_adaptive(stream, [profile.size] + list(resolution_levels), quality_levels,
+                                       max_quality=profile.quality, target_fps=profile.fps,
+                                       adjust_interval=adjust_interval, max_size=profile.size, fps=profile.fps)
+
+    def subscribe_adaptive(self, stream: str = 'raw', resolution_levels: Sequence[Tuple[int, int]] = (),
+                           quality_levels: Sequence[int] = STREAM_QUALITY_LEVELS, max_quality: Optional[int] = None,
+                           target_fps: float = 25, adjust_interval: float = 5.0,
+                           max_size: Optional[Tuple[int, int]] = None,
+                           fps: Optional[float] = None) -> AdaptiveSubscription:
+        """
+        订阅一个视频流，按客户端自身的发送状况自动选择质量/分辨率档位
+
+        档位表由分辨率档位（不超过源分辨率）与质量档位组合而成，从最高档开始。
+
+        Args:
+            stream: 视频流名称
+            resolution_levels: 分辨率档位 [(宽, 高), ...]，从高到低
+            quality_levels: JPEG质量档位，从高到低
+            max_quality: 质量上限（如页面配置的质量），None表示不限制
+            target_fps: 目标帧率
+            adjust_interval: 两次调整档位之间的最短间隔（秒）
+            max_size: 输出尺寸上限 (宽, 高)，None表示以源分辨率为上限
+            fps: 各档位的编码帧率上限，None表示跟随视频源
+
+        Returns:
+            AdaptiveSubscription，用完后需 close()
+
+        Raises:
+            ViewerLimitError: 同时观看的客户端数量已达上限
+        """
+        tiers = self._build_tiers(stream, resolution_levels, quality_levels, max_quality, max_size, fps)
+        subscription = AdaptiveSubscription(self, stream, tiers, target_fps=target_fps,
+                                            adjust_interval=adjust_interval)
+        self._adaptive.add(subscription)
+        return subscription
+
+    def _build_tiers(self, stream: str, resolution_levels: Sequence[Tuple[int, int]],
+                     quality_levels: Sequence[int], max_quality: Optional[int],
+                     max_size: Optional[Tuple[int, int]] = None, fps: Optional[float] = None) -> List[StreamKey]:
+        """
+        组合分辨率与质量档位；不放大超过源分辨率（和max_size），与源分辨率一致的档位不缩放（可使用直通数据）
+        """
+        source = self.get_source(stream)
+        source_size = None
+        if getattr(source, 'frame_width', None) and getattr(source, 'frame_height', None):
+            source_size = (int(source.frame_width), int(source.frame_height))
+
+        def fits(level, limit):
+            return not limit or (level[0] <= limit[0] and level[1] <= limit[1])
+
+        sizes: List[Optional[Tuple[int, int]]] = []
+        for level in resolution_levels:
+            level = tuple(level)
+            if not fits(level, source_size) or not fits(level, max_size):
+                continue
+            size = None if level == source_size else level
+            if size not in sizes:
+                sizes.append(size)
+        if source_size is None or fits(source_size, max_size):
+            if not sizes or (source_size and None not in sizes):
+                sizes.insert(0, None)
+        elif not sizes:
+            sizes.append(tuple(max_size))
+
+        qualities = sorted({q if max_quality is None else min(q, max_quality) for q in quality_levels}, reverse=True)
+        return [StreamKey(stream, q, size, fps) for size in sizes for q in qualities]
+
+    def _open(self, key: StreamKey, check_limit: bool = False) -> StreamSubscription:
+        """
+        订阅指定编码通道
+
+        Args:
+            key: 编码通道键
+            check_limit: 是否检查观看人数上限（自适应订阅切换档位时不检查）
+        """
+        source = self.get_source(key.stream)
+        if source is None:
+            raise KeyError(f"未登记的视频流: {key.stream}")
+        with self._lock:
+            if check_limit and self.max_viewers and \
+                    sum(c.subscribers for c in self._channels.values()) >= self.max_viewers:
+                self.rejected += 1
+                raise ViewerLimitError(f"视频流观看人数已达上限 {self.max_viewers}")
+            channel = self._channels.get(key)
+            if channel is None or channel.source is not source:
+                channel = MJPEGChannel(key, source)
+                self._channels[key] = channel
+            return StreamSubscription(channel)
+
+    def get_status(self) -> dict:
+        """各编码通道的订阅者数量与编码统计"""
+        with self._lock:
+            channels = list(self._channels.values())
+        return {
+            "streams": list(self._sources.keys()),
+            "channels": [channel.get_status() for channel in channels],
+            "subscribers": sum(channel.subscribers for channel in channels),
+            "adaptive_clients": [sub.get_status() for sub in list(self._adaptive) if not sub.closed],
+            "max_viewers": self.max_viewers,
+            "rejected": self.rejected
+        }
+
+
+async def iter_mjpeg(subscription, timeout: float = 1.0,
+                     idle_part: Optional[bytes] = None) -> AsyncIterator[bytes]:
+    """
+    把订阅转换为StreamingResponse可用的异步MJPEG生成器
+
+    Args:
+        subscription: StreamSubscription 或 AdaptiveSubscription，生成器结束（包括客户端断开）时自动关闭
+        timeout: 等待新帧的超时秒数
+        idle_part: 超时时发送的占位分段（如"摄像头未连接"提示图），None表示继续等待
+    """
+    try:
+        while True:
+            part = await subscription.next_part_async(timeout)
+            if part is not None:
+                yield part
+            elif idle_part is not None:
+                yield idle_part
+    finally:
+        subscription.close()
+
+
+_hub_instance: Optional[StreamHub] = None
+_hub_lock = threading.Lock()
+
+def get_stream_hub() -> StreamHub:
+    """获取全局MJPEG流分发中心"""
+    global _hub_instance
+    with _hub_lock:
+        if _hub_instance is None:
+            _hub_instance = StreamHub()
+        return _hub_instance
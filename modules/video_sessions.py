@@ -0,0 +1,200 @@
+"""
+视频会话登记模块
+
+每个正在观看的视频流客户端（MJPEG 或 /ws/video）对应一个会话，记录客户端、视频流规格、
+开始时间以及实际投递情况：发送帧数、跳过帧数、发送字节数、实际帧率和帧间隔P95。
+会话挂在流分发中心的订阅上，由订阅在取帧时记录、关闭时注销，
+/api/video/status 和性能统计据此报告视频推流的真实开销。
+"""
+import itertools
+import threading
+import time
+import logging
+from collections import deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 用于计算帧率和帧间隔的最近发送时刻数
+SESSION_TIMING_WINDOW = 300
+# 实际帧率的统计时间窗口（秒）
+SESSION_FPS_WINDOW = 5.0
+
+
+class VideoSession:
+    """一个视频流客户端的投递统计"""
+    def __init__(self, session_id: int, client: str, endpoint: str, stream: str,
+                 profile: Optional[str] = None, subscription=None, registry=None):
+        """
+        Args:
+            session_id: 会话编号
+            client: 客户端地址 "ip:port"
+            endpoint: 接口路径，如 /api/video、/ws/video
+            stream: 视频流名称
+            profile: 视频流规格名称
+            subscription: 对应的订阅（用于报告当前的质量/分辨率档位）
+            registry: 所属的会话登记表
+        """
+        self.session_id = session_id
+        self.client = client
+        self.endpoint = endpoint
+        self.stream = stream
+        self.profile = profile
+        self.subscription = subscription
+        self.registry = registry
+        self.started_at = time.time()
+        self.closed = False
+
+        self.frames_sent = 0
+        self.frames_skipped = 0   # 客户端跟不上时跳过的帧数
+        self.bytes_sent = 0
+        self._send_times = deque(maxlen=SESSION_TIMING_WINDOW)  # 最近的发送时刻（monotonic）
+        self._lock = threading.Lock()
+
+    def record_frame(self, nbytes: int, skipped: int = 0):
+        """记录发送一帧"""
+        with self._lock:
+            self.frames_sent += 1
+            self.frames_skipped += skipped
+            self.bytes_sent += nbytes
+            self._send_times.append(time.monotonic())
+
+    def close(self):
+        """结束会话（订阅关闭时调用）"""
+        if self.registry is not None:
+            self.registry.close(self)
+
+    def get_status(self) -> dict:
+        """导出会话统计（帧间隔单位为毫秒）"""
+        now = time.monotonic()
+        with self._lock:
+            times = list(self._send_times)
+            sent, skipped, sent_bytes = self.frames_sent, self.frames_skipped, self.bytes_sent
+        duration = time.time() - self.started_at
+
+        # 实际帧率：最近时间窗口内的发送帧数（会话不足一个窗口时按会话时长）
+        window = min(SESSION_FPS_WINDOW, max(duration, 1e-3))
+        recent = sum(1 for t in times if now - t <= window)
+        gaps = sorted(b - a for a, b in zip(times, times[1:]))
+        p95_ms = gaps[min(len(gaps) - 1, int(len(gaps) * 0.95))] * 1000 if gaps else 0
+
+        status = {
+            "id": self.session_id,
+            "client": self.client,
+            "endpoint": self.endpoint,
+            "stream": self.stream,
+            "profile": self.profile,
+            "started_at": round(self.started_at, 3),
+            "duration_s": round(duration, 1),
+            "frames_sent": sent,
+            "frames_skipped": skipped,
+            "bytes_sent": sent_bytes,
+            "fps": round(recent / window, 2),
+            "frame_gap_ms_p95": round(p95_ms, 2),
+            "kbps": round(sent_bytes * 8 / 1000 / duration, 1) if duration > 0 else 0
+        }
+        channel = getattr(self.subscription, 'channel', None)
+        if channel is not None:
+            key = channel.key
+            status["quality"] = key.quality
+            status["size"] = f"{key.size[0]}x{key.size[1]}" if key.size else None
+        return status
+
+
+class VideoSessionRegistry:
+    """当前视频流会话的登记表，并累计已结束会话的总量"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[int, VideoSession] = {}
+        self._ids = itertools.count(1)
+        self.totals = {
+            'sessions': 0,
+            'frames_sent': 0,
+            'frames_skipped': 0,
+            'bytes_sent': 0
+        }
+
+    def open(self, subscription, client: str, endpoint: str, stream: str,
+             profile: Optional[str] = None) -> VideoSession:
+        """
+        为订阅登记一个会话，此后订阅每取一帧都计入该会话，订阅关闭时会话自动注销
+
+        Args:
+            subscription: StreamSubscription 或 AdaptiveSubscription
+            client: 客户端地址
+            endpoint: 接口路径
+            stream: 视频流名称
+            profile: 视频流规格名称
+        """
+        with self._lock:
+            session = VideoSession(next(self._ids), client, endpoint, stream, profile, subscription, self)
+            self._sessions[session.session_id] = session
+            self.totals['sessions'] += 1
+        subscription.session = session
+        logger.info(f"视频会话 {session.session_id} 开始: {client} {endpoint}（{stream}，规格 {profile}）")
+        return session
+
+    def close(self, session: VideoSession):
+        """注销会话，统计计入累计总量"""
+        with self._lock:
+            if self._sessions.pop(session.session_id, None) is None:
+                return
+            session.closed = True
+            session.subscription = None
+            self.totals['frames_sent'] += session.frames_sent
+            self.totals['frames_skipped'] += session.frames_skipped
+            self.totals['bytes_sent'] += session.bytes_sent
+        logger.info(f"视频会话 {session.session_id} 结束: 发送 {session.frames_sent} 帧，"
+                    f"跳过 {session.frames_skipped} 帧，{session.bytes_sent / 1024:.0f} KB")
+
+    @property
+    def active_count(self) -> int:
+        return len(self._sessions)
+
+    def get_status(self) -> dict:
+        """当前会话及合计（合计包含已结束的会话）"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            totals = dict(self.totals)
+        active = [session.get_status() for session in sessions]
+        for item in active:
+            totals['frames_sent'] += item['frames_sent']
+            totals['frames_skipped'] += item['frames_skipped']
+            totals['bytes_sent'] += item['bytes_sent']
+        return {
+            "active": len(active),
+            "sessions": active,
+            "fps_total": round(sum(item['fps'] for item in active), 2),
+            "kbps_total": round(sum(item['kbps'] for item in active), 1),
+            "totals": totals
+        }
+
+
+_registry_instance: Optional[VideoSessionRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_video_session_registry() -> VideoSessionRegistry:
+    """获取全局视频会话登记表"""
+    global _registry_instance
+    if _registry_instance is None:
+        with _registry_lock:
+            if _registry_instance is None:
+                _registry_instance = VideoSessionRegistry()
+    return _registry_instance
+
+
+def open_video_session(subscription, request, endpoint: str, stream: str,
+                       profile: Optional[str] = None) -> VideoSession:
+    """
+    为HTTP/WebSocket请求的订阅登记会话
+
+    Args:
+        subscription: 流分发中心的订阅
+        request: Request 或 WebSocket（取客户端地址）
+        endpoint: 接口路径
+        stream: 视频流名称
+        profile: 视频流规格名称
+    """
+    client = getattr(request, 'client', None)
+    address = f"{client.host}:{client.port}" if client else "unknown"
+    return get_video_session_registry().open(subscription, address, endpoint, stream, profile)
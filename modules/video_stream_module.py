@@ -9,10 +9,17 @@ import traceback
 from collections import deque
 import queue
 from config import DEBUG
+from modules.jpeg_codec import encode_jpeg, get_encoder_status
+from modules.video_sessions import get_video_session_registry
+
+try:
+    from config import VIDEO_STREAM_QUEUE_BUDGET_MB
+except ImportError:
+    VIDEO_STREAM_QUEUE_BUDGET_MB = 4
 
 # 帧率和分辨率相关配置
 STREAM_FPS_TARGET = 25  # 目标流帧率
-MAX_QUEUE_SIZE = 100    # 大幅增加队列大小以应对高频帧消费
+MAX_QUEUE_SIZE = 100    # 队列深度上限，实际深度由内存预算决定
 DEFAULT_STREAM_WIDTH = 800  # 默认流宽度，使用最高分辨率确保视觉模型准确性
 DEFAULT_STREAM_HEIGHT = 600  # 默认流高度，使用最高分辨率确保视觉模型准确性
 
@@ -27,6 +34,104 @@ FPS_THRESHOLD_LOW = 15.0  # 低帧率阈值，低于此值降低分辨率
 FPS_THRESHOLD_HIGH = 28.0  # 高帧率阈值，高于此值可以尝试提高分辨率
 RESOLUTION_ADJUST_INTERVAL = 5.0  # 分辨率调整间隔（秒）
 
+# 家长监护原始视频流的分辨率参数
+RAW_STREAM_RESOLUTIONS = {
+    'high': (720, 540),     # 720p equivalent for 4:3
+    'medium': (640, 480),   # 480p 标准
+    'low': (320, 240),      # 240p 低分辨率
+    '720p': (720, 540),
+    '480p': (640, 480),
+    '360p': (480, 360),
+    '240p': (320, 240)
+}
+RAW_STREAM_QUALITY = 95  # 原始视频流JPEG质量，尽量保持原始画面质量
+
+class BoundedFrameQueue:
+    """
+    按内存预算限定容量的帧队列
+    
+    队列深度不固定，而是按入队帧的实际字节数换算：总字节数超过预算时丢弃最旧的帧，
+    但至少保留最新一帧。另外始终保存最新入队的一帧（latest），队列被取空后仍可重复使用。
+    接口兼容 queue.Queue 的 get_nowait / put_nowait / qsize / empty / full。
+    """
+    def __init__(self, budget_bytes: int, max_depth: int = MAX_QUEUE_SIZE):
+        """
+        Args:
+            budget_bytes: 队列中帧可占用的总字节数
+            max_depth: 深度上限（帧很小时也不超过该值）
+        """
+        self.budget_bytes = max(0, int(budget_bytes))
+        self.max_depth = max(1, max_depth)
+        self._frames = deque()
+        self._lock = threading.Lock()
+        self.bytes_held = 0
+        self.latest = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.peak_depth = 0
+    
+    def put(self, frame):
+        """
+        入队一帧，超出预算或深度上限时丢弃最旧的帧
+        
+        Returns:
+            本次丢弃的帧数
+        """
+        dropped = 0
+        with self._lock:
+            self._frames.append(frame)
+            self.bytes_held += frame.nbytes
+            self.latest = frame
+            self.enqueued += 1
+            while len(self._frames) > 1 and (self.bytes_held > self.budget_bytes or
+                                             len(self._frames) > self.max_depth):
+                self.bytes_held -= self._frames.popleft().nbytes
+                dropped += 1
+            self.dropped += dropped
+            self.peak_depth = max(self.peak_depth, len(self._frames))
+        return dropped
+    
+    def put_nowait(self, frame):
+        self.put(frame)
+    
+    def get_nowait(self):
+        with self._lock:
+            if not self._frames:
+                raise queue.Empty
+            frame = self._frames.popleft()
+            self.bytes_held -= frame.nbytes
+            return frame
+    
+    def qsize(self) -> int:
+        return len(self._frames)
+    
+    def empty(self) -> bool:
+        return not self._frames
+    
+    def full(self) -> bool:
+        """再入队一帧是否会丢弃旧帧"""
+        with self._lock:
+            if not self._frames:
+                return False
+            frame_bytes = self._frames[-1].nbytes
+            return (len(self._frames) >= self.max_depth or
+                    self.bytes_held + frame_bytes > self.budget_bytes)
+    
+    def get_status(self) -> dict:
+        """队列深度、占用字节数与丢帧统计"""
+        with self._lock:
+            frame_bytes = self.latest.nbytes if self.latest is not None else 0
+            return {
+                'depth': len(self._frames),
+                'capacity': min(self.max_depth, max(1, self.budget_bytes // frame_bytes)) if frame_bytes else None,
+                'peak_depth': self.peak_depth,
+                'bytes_held': self.bytes_held,
+                'latest_bytes': frame_bytes,
+                'budget_bytes': self.budget_bytes,
+                'enqueued': self.enqueued,
+                'dropped': self.dropped
+            }
+
 # 帧率计算类
 class FPSCounter:
     """计算并跟踪帧率"""
@@ -83,18 +188,15 @@ class VideoStreamHandler:
             camera_manager: 摄像头管理器实例（可选），若未提供则使用全局实例
         """
         print(f"DEBUG: 初始化VideoStreamHandler，宽度={process_width}，高度={process_height}")
-        # 初始化队列
-        self.pose_frame_queue = queue.Queue(maxsize=MAX_QUEUE_SIZE)
-        self.emotion_frame_queue = queue.Queue(maxsize=MAX_QUEUE_SIZE)
+        # 初始化队列：深度按内存预算换算，避免堆积大量没人显示的旧帧
+        queue_budget = int(VIDEO_STREAM_QUEUE_BUDGET_MB * 1024 * 1024)
+        self.pose_frame_queue = BoundedFrameQueue(queue_budget)
+        self.emotion_frame_queue = BoundedFrameQueue(queue_budget)
         
         # 默认空帧（灰色）
         self.default_frame = self._create_default_frame()
         print(f"DEBUG: 创建默认帧大小 {self.default_frame.shape}")
         
-        # 最后一帧（用于无帧时重复输出）
-        self.last_pose_frame = self.default_frame.copy()
-        self.last_emotion_frame = self.default_frame.copy()
-        
         # 初始化原始帧属性
         self.last_raw_frame = None
         
@@ -108,8 +210,8 @@ class VideoStreamHandler:
         else:
             self.camera_manager = camera_manager
             
-        # 注册为摄像头帧的消费者
-        self.frame_queue = self.camera_manager.register_consumer("video_stream_handler", max_queue_size=10)
+        # 已处理的最后一帧序号，用于wait_for_frame等待新帧
+        self.last_frame_seq = 0
         
         # 启动帧处理线程
         threading.Thread(target=self._process_frames, daemon=True, name="VideoStreamProcessor").start()
@@ -139,7 +241,6 @@ class VideoStreamHandler:
         
         # 处理压缩质量
         self.jpeg_quality = 90  # 默认JPEG压缩质量
-        self.stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
         
         # 自适应质量控制
         self.adaptive_quality = True  # 是否启用自适应质量控制
@@ -149,6 +250,8 @@ class VideoStreamHandler:
         # 性能监控
         self.performance_stats = {
             'dropped_frames': 0,
+            'pose_dropped_frames': 0,     # 姿势队列因满被丢弃的帧数
+            'emotion_dropped_frames': 0,  # 情绪队列因满被丢弃的帧数
             'compression_time': deque(maxlen=50),
             'transmission_time': deque(maxlen=50)
         }
@@ -178,24 +281,9 @@ class VideoStreamHandler:
         resized_frame = self._prepare_frame_for_streaming(frame)
         if resized_frame is None:
             return
-            
-        # 更新最后一帧，便于重复使用
-        self.last_pose_frame = resized_frame
         
-        # 尝试向队列添加帧，如果队列满则丢弃旧帧
-        if self.pose_frame_queue.full():
-            try:
-                self.pose_frame_queue.get_nowait()  # 丢弃最旧的帧
-                self.performance_stats['dropped_frames'] += 1
-            except queue.Empty:
-                pass
-                
-        try:
-            self.pose_frame_queue.put_nowait(resized_frame)
-        except queue.Full:
-            # 队列已满，忽略
-            self.performance_stats['dropped_frames'] += 1
-            pass
+        # 向队列添加帧，超出内存预算时丢弃最旧的帧
+        self._count_dropped('pose', self.pose_frame_queue.put(resized_frame))
     
     def _add_emotion_frame(self, frame):
         """
@@ -211,25 +299,22 @@ class VideoStreamHandler:
         resized_frame = self._prepare_frame_for_streaming(frame)
         if resized_frame is None:
             return
-            
-        # 更新最后一帧，便于重复使用
-        self.last_emotion_frame = resized_frame
         
-        # 尝试向队列添加帧，如果队列满则丢弃旧帧
-        if self.emotion_frame_queue.full():
-            try:
-                self.emotion_frame_queue.get_nowait()  # 丢弃最旧的帧
-                self.performance_stats['dropped_frames'] += 1
-            except queue.Empty:
-                pass
-                
-        try:
-            self.emotion_frame_queue.put_nowait(resized_frame)
-        except queue.Full:
-            # 队列已满，忽略
-            self.performance_stats['dropped_frames'] += 1
-            pass
+        # 向队列添加帧，超出内存预算时丢弃最旧的帧
+        self._count_dropped('emotion', self.emotion_frame_queue.put(resized_frame))
             
+    def _count_dropped(self, stream, count=1):
+        """累计丢帧数
+        
+        Args:
+            stream: 'pose' 或 'emotion'
+            count: 丢弃的帧数
+        """
+        if count <= 0:
+            return
+        self.performance_stats['dropped_frames'] += count
+        self.performance_stats[f'{stream}_dropped_frames'] += count
+    
     def _process_frames(self):
         """
         处理从摄像头管理器接收到的帧
@@ -239,39 +324,35 @@ class VideoStreamHandler:
         
         while True:
             try:
-                # 尝试从队列获取最新帧
-                try:
-                    frame = self.frame_queue.get(timeout=0.1)
-                except queue.Empty:
-                    # 队列为空，尝试直接从管理器获取最新帧
-                    frame = self.camera_manager.get_latest_frame()
-                    if frame is None:
+                # 阻塞等待新帧（借用摄像头管理器环形缓冲区中的只读视图），新帧到达即唤醒
+                frame_ref = self.camera_manager.wait_for_frame(
+                    self.last_frame_seq, timeout=0.5, consumer_id="video_stream_handler")
+                if frame_ref is None:
+                    continue
+                self.last_frame_seq = frame_ref.seq
+                
+                # 本模块的队列会长期持有帧，因此只拷贝一次，三处共享同一份数据
+                # 共享帧视为只读，需要绘制叠加信息的地方自行拷贝
+                with frame_ref:
+                    if frame_ref.image.size == 0:
                         time.sleep(0.05)
                         continue
-                
-                if frame is None or frame.size == 0:
-                    time.sleep(0.05)
-                    continue
+                    frame = frame_ref.copy()
                     
                 # 保存为最新原始帧
-                self.last_raw_frame = frame.copy()
+                self.last_raw_frame = frame
                 
                 # 为姿势分析队列准备帧
                 try:
-                    pose_frame = frame.copy()  # 为姿势分析准备帧副本
-                    self._add_pose_frame(pose_frame)
+                    self._add_pose_frame(frame)
                 except Exception as e:
                     print(f"ERROR: 处理姿势帧时出错: {str(e)}")
                 
                 # 为情绪分析队列准备帧
                 try:
-                    emotion_frame = frame.copy()  # 为情绪分析准备帧副本
-                    self._add_emotion_frame(emotion_frame)
+                    self._add_emotion_frame(frame)
                 except Exception as e:
                     print(f"ERROR: 处理情绪帧时出错: {str(e)}")
-                
-                # 处理完一帧后短暂休眠，避免CPU占用过高
-                time.sleep(0.01)
             except Exception as e:
                 print(f"ERROR: 帧处理线程异常: {str(e)}")
                 traceback.print_exc()
@@ -335,32 +416,18 @@ class VideoStreamHandler:
         if not isinstance(frame, np.ndarray) or frame.size == 0:
             return
             
-        # 更新最后的姿势帧（用于队列为空时的备用）
-        self.last_pose_frame = frame.copy()
-            
-        try:
-            # 如果队列满了，智能地移除一些旧帧
-            while self.pose_frame_queue.full():
-                try:
-                    # 移除最旧的帧，但保留至少2帧作为缓冲
-                    if self.pose_frame_queue.qsize() > 2:
-                        self.pose_frame_queue.get_nowait()
-                    else:
-                        break  # 保留最后几帧
-                except queue.Empty:
-                    break
-            
-            # 添加新帧
-            self.pose_frame_queue.put_nowait(frame)
-        except queue.Full:
-            # 如果仍然无法添加，记录但不阻塞
-            self.pose_queue_stats['overrun_count'] += 1
+        # 添加新帧，超出内存预算时丢弃最旧的帧（至少保留最新一帧）
+        self._count_dropped('pose', self.pose_frame_queue.put(frame))
 
     def add_emotion_frame(self, frame):
         """添加情绪分析帧到队列"""
         if frame is None or frame.size == 0:
             return
             
+        # 只读帧来自摄像头管理器的环形缓冲区，入队长期持有前需要拷贝
+        if not frame.flags.writeable:
+            frame = frame.copy()
+            
         with self._emotion_lock:
             resized_frame = self._prepare_frame_for_streaming(frame)
             
@@ -369,23 +436,9 @@ class VideoStreamHandler:
                 if self.debug:
                     print("警告：情绪帧处理后无效，跳过添加到队列")
                 return
-                
-            self.last_emotion_frame = resized_frame
             
-            # 尝试向队列添加帧，如果队列满则丢弃旧帧
-            if self.emotion_frame_queue.full():
-                try:
-                    self.emotion_frame_queue.get_nowait()  # 丢弃最旧的帧
-                    self.performance_stats['dropped_frames'] += 1
-                except queue.Empty:
-                    pass
-                    
-            try:
-                self.emotion_frame_queue.put_nowait(resized_frame)
-            except queue.Full:
-                # 队列已满，忽略
-                self.performance_stats['dropped_frames'] += 1
-                pass
+            # 向队列添加帧，超出内存预算时丢弃最旧的帧
+            self._count_dropped('emotion', self.emotion_frame_queue.put(resized_frame))
     
     def _prepare_frame_for_streaming(self, frame):
         """准备帧用于流传输（为640x480原始帧保持原样，无需处理）"""
@@ -462,15 +515,12 @@ class VideoStreamHandler:
         if stream_fps < 10 and self.current_resolution_index >= len(STREAM_RESOLUTION_LEVELS) - 1:
             if self.jpeg_quality > 70:
                 self.jpeg_quality = 70
-                self.stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
                 print(f"帧率低于10FPS，降低JPEG质量至 {self.jpeg_quality}")
             elif self.jpeg_quality > 50 and stream_fps < 7:
                 self.jpeg_quality = 50
-                self.stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
                 print(f"帧率极低，进一步降低JPEG质量至 {self.jpeg_quality}")
             elif self.jpeg_quality > 30 and stream_fps < 5:
                 self.jpeg_quality = 30
-                self.stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
                 print(f"帧率严重不足，将JPEG质量降至最低 {self.jpeg_quality}")
         
         # 当帧率恢复时提高JPEG质量
@@ -478,13 +528,11 @@ class VideoStreamHandler:
             if self.jpeg_quality < 90:
                 new_quality = min(90, self.jpeg_quality + 10)
                 self.jpeg_quality = new_quality
-                self.stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
                 print(f"帧率恢复至 {stream_fps:.1f} FPS，提高JPEG质量至 {self.jpeg_quality}")
         
         # 压缩时间过长时降低质量
         elif avg_compression_time > 0.02 and self.jpeg_quality > 50:  # 如果压缩一帧超过20ms
             self.jpeg_quality = max(50, self.jpeg_quality - 10)
-            self.stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
             print(f"压缩时间过长 ({avg_compression_time*1000:.1f}ms)，降低JPEG质量至 {self.jpeg_quality}")
         
         self.last_quality_adjust_time = current_time
@@ -529,7 +577,7 @@ class VideoStreamHandler:
                 
             # 仍然更新帧率计数器（如果重复使用上一帧也计入）
             self.pose_stream_fps.update()
-            return self.last_pose_frame
+            return self._latest_or_default(self.pose_frame_queue)
     
     def get_emotion_frame(self):
         """获取下一帧情绪分析帧"""
@@ -544,7 +592,12 @@ class VideoStreamHandler:
                 
             # 仍然更新帧率计数器（如果重复使用上一帧也计入）
             self.emotion_stream_fps.update()
-            return self.last_emotion_frame
+            return self._latest_or_default(self.emotion_frame_queue)
+    
+    def _latest_or_default(self, frame_queue):
+        """队列取空后重复输出最新入队的一帧，尚无帧时输出默认帧"""
+        latest = frame_queue.latest
+        return latest if latest is not None else self.default_frame
     
     def generate_pose_video_stream(self):
         """生成姿势分析视频流"""
@@ -553,11 +606,11 @@ class VideoStreamHandler:
             static_frame = self._create_info_frame("姿势检测", "视频流已禁用", "仅显示角度信息")
             
             # 压缩并编码为JPEG
-            success, encoded_image = cv2.imencode('.jpg', static_frame, self.stream_params)
-            if success:
+            encoded_image = encode_jpeg(static_frame, self.jpeg_quality)
+            if encoded_image is not None:
                 # 返回静态帧
                 yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n')
+                       b'Content-Type: image/jpeg\r\n\r\n' + encoded_image + b'\r\n')
                 
                 # 重要：只返回一帧，而不是持续生成帧
                 return
@@ -567,6 +620,9 @@ class VideoStreamHandler:
             # 获取下一帧
             frame = self.get_pose_frame()
             
+            # 队列中的帧可能被多处共享，叠加文字前先拷贝
+            frame = frame.copy()
+            
             # 添加帧率和质量信息
             fps = self.pose_stream_fps.get_fps()
             fps_text = f"FPS: {fps:.1f} Q:{self.jpeg_quality}"
@@ -577,13 +633,13 @@ class VideoStreamHandler:
             compress_start = time.time()
             
             # 压缩并编码为JPEG
-            success, encoded_image = cv2.imencode('.jpg', frame, self.stream_params)
+            encoded_image = encode_jpeg(frame, self.jpeg_quality)
             
             # 记录压缩时间
             compress_time = time.time() - compress_start
             self.performance_stats['compression_time'].append(compress_time)
             
-            if not success:
+            if encoded_image is None:
                 continue
             
             # 记录传输开始时间
@@ -592,7 +648,7 @@ class VideoStreamHandler:
             # 生成帧数据
             yield (
                 b'--frame\r\n'
-                b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n'
+                b'Content-Type: image/jpeg\r\n\r\n' + encoded_image + b'\r\n'
             )
             
             # 记录传输时间
@@ -618,11 +674,11 @@ class VideoStreamHandler:
             static_frame = self._create_info_frame("情绪检测", "视频流已禁用", "仅显示情绪状态")
             
             # 压缩并编码为JPEG
-            success, encoded_image = cv2.imencode('.jpg', static_frame, self.stream_params)
-            if success:
+            encoded_image = encode_jpeg(static_frame, self.jpeg_quality)
+            if encoded_image is not None:
                 # 返回静态帧
                 yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n')
+                       b'Content-Type: image/jpeg\r\n\r\n' + encoded_image + b'\r\n')
                 
                 # 重要：只返回一帧，而不是持续生成帧
                 return
@@ -632,6 +688,9 @@ class VideoStreamHandler:
             # 获取下一帧
             frame = self.get_emotion_frame()
             
+            # 队列中的帧可能被多处共享，叠加文字前先拷贝
+            frame = frame.copy()
+            
             # 添加帧率和质量信息
             fps = self.emotion_stream_fps.get_fps()
             fps_text = f"FPS: {fps:.1f} Q:{self.jpeg_quality}"
@@ -642,12 +701,12 @@ class VideoStreamHandler:
             compress_start = time.time()
             
             # 压缩并编码为JPEG
-            success, encoded_image = cv2.imencode('.jpg', frame, self.stream_params)
+            encoded_image = encode_jpeg(frame, self.jpeg_quality)
             
             # 记录压缩时间
             compress_time = time.time() - compress_start
             
-            if not success:
+            if encoded_image is None:
                 continue
             
             # 记录传输开始时间
@@ -656,7 +715,7 @@ class VideoStreamHandler:
             # 生成帧数据
             yield (
                 b'--frame\r\n'
-                b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n'
+                b'Content-Type: image/jpeg\r\n\r\n' + encoded_image + b'\r\n'
             )
             
             # 记录传输时间
@@ -680,6 +739,9 @@ class VideoStreamHandler:
             'current_resolution': f"{self.stream_width}x{self.stream_height}",
             'jpeg_quality': self.jpeg_quality,
             'dropped_frames': self.performance_stats['dropped_frames'],
+            'pose_dropped_frames': self.performance_stats['pose_dropped_frames'],
+            'emotion_dropped_frames': self.performance_stats['emotion_dropped_frames'],
+            'frame_queues': self.get_queue_status(),
             'adaptive_mode': {
                 'resolution': self.adaptive_resolution,
                 'quality': self.adaptive_quality
@@ -714,7 +776,6 @@ class VideoStreamHandler:
         """
         if 1 <= quality <= 100:
             self.jpeg_quality = quality
-            self.stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
             print(f"设置JPEG压缩质量为 {self.jpeg_quality}")
             return True
         return False
@@ -768,8 +829,21 @@ class VideoStreamHandler:
         
         return {
             'dropped_frames': self.performance_stats['dropped_frames'],
+            'pose_dropped_frames': self.performance_stats['pose_dropped_frames'],
+            'emotion_dropped_frames': self.performance_stats['emotion_dropped_frames'],
             'avg_compression_time_ms': round(avg_compression_ms, 2),
-            'avg_transmission_time_ms': round(avg_transmission_ms, 2)
+            'avg_transmission_time_ms': round(avg_transmission_ms, 2),
+            'frame_queues': self.get_queue_status(),
+            'jpeg_encoder': get_encoder_status(),
+            'video_sessions': get_video_session_registry().get_status()
+        }
+    
+    def get_queue_status(self):
+        """姿势/情绪帧队列的深度、占用内存与丢帧统计"""
+        return {
+            'pose': self.pose_frame_queue.get_status(),
+            'emotion': self.emotion_frame_queue.get_status(),
+            'budget_mb': VIDEO_STREAM_QUEUE_BUDGET_MB
         }
     
     # 新增跳采样方法
@@ -843,17 +917,8 @@ class VideoStreamHandler:
         if resolution_param:
             if isinstance(resolution_param, str):
                 # 根据字符串参数设置分辨率
-                resolution_map = {
-                    'high': (720, 540),     # 720p equivalent for 4:3
-                    'medium': (640, 480),   # 480p 标准
-                    'low': (320, 240),      # 240p 低分辨率
-                    '720p': (720, 540),
-                    '480p': (640, 480),
-                    '360p': (480, 360),
-                    '240p': (320, 240)
-                }
-                if resolution_param in resolution_map:
-                    self.stream_width, self.stream_height = resolution_map[resolution_param]
+                if resolution_param in RAW_STREAM_RESOLUTIONS:
+                    self.stream_width, self.stream_height = RAW_STREAM_RESOLUTIONS[resolution_param]
             elif isinstance(resolution_param, tuple) and len(resolution_param) == 2:
                 # 直接使用提供的宽高
                 self.stream_width, self.stream_height = resolution_param
@@ -866,11 +931,11 @@ class VideoStreamHandler:
             static_frame = np.ones((self.stream_height, self.stream_width, 3), dtype=np.uint8) * 220
             
             # 压缩并编码为JPEG
-            success, encoded_image = cv2.imencode('.jpg', static_frame, self.stream_params)
-            if success:
+            encoded_image = encode_jpeg(static_frame, self.jpeg_quality)
+            if encoded_image is not None:
                 # 返回静态帧
                 yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n')
+                       b'Content-Type: image/jpeg\r\n\r\n' + encoded_image + b'\r\n')
             
             # 恢复原始分辨率
             self.stream_width, self.stream_height = original_width, original_height
@@ -878,6 +943,7 @@ class VideoStreamHandler:
         
         # 计数器，用于周期性检查视频流状态
         frame_count = 0
+        last_seq = 0
         
         # 主循环 - 只要流处于活动状态就继续生成帧
         while self.is_streaming:
@@ -885,21 +951,40 @@ class VideoStreamHandler:
                 # 获取原始摄像头帧 - 完全不添加任何处理
                 frame = None
                 
-                # 直接访问姿势监测器的摄像头
+                # 摄像头输出的JPEG尺寸与请求一致且为直通数据时原样转发，不解码也不重新编码
+                if (self.camera_manager.passthrough_active and
+                        self.camera_manager.passthrough_size == (self.stream_width, self.stream_height)):
+                    jpeg = None
+                    try:
+                        jpeg = self.camera_manager.wait_for_jpeg(last_seq, timeout=1.0)
+                    except Exception as e:
+                        print(f"ERROR: 从摄像头管理器获取JPEG帧失败: {str(e)}")
+                    if jpeg is not None and jpeg.passthrough:
+                        last_seq = jpeg.seq
+                        yield (b'--frame\r\n'
+                               b'Content-Type: image/jpeg\r\n\r\n' + jpeg.data + b'\r\n')
+                        frame_count += 1
+                        continue
+                
+                # 等待摄像头管理器的新帧，新帧到达时才编码发送（以摄像头帧率为节奏）
+                frame_ref = None
                 try:
-                    from app import posture_monitor
-                    if posture_monitor and hasattr(posture_monitor, 'cap') and posture_monitor.cap.isOpened():
-                        ret, raw_frame = posture_monitor.cap.read()
-                        if ret and raw_frame is not None and raw_frame.size > 0:
-                            frame = raw_frame.copy()  # 获取完全未处理的原始相机帧
-                            # 保存为最新原始帧
-                            self.last_raw_frame = frame.copy()
+                    frame_ref = self.camera_manager.wait_for_frame(last_seq, timeout=1.0)
                 except Exception as e:
-                    print(f"ERROR: 直接访问摄像头失败: {str(e)}")
+                    print(f"ERROR: 从摄像头管理器获取帧失败: {str(e)}")
+                if frame_ref is not None:
+                    with frame_ref:
+                        last_seq = frame_ref.seq
+                        frame = frame_ref.image
+                        # 仅在需要缩放时才会产生新数组，否则直接编码只读视图
+                        if frame.shape[1] != self.stream_width or frame.shape[0] != self.stream_height:
+                            frame = cv2.resize(frame, (self.stream_width, self.stream_height))
+                        else:
+                            frame = frame_ref.copy()
                 
-                # 如果直接获取失败，尝试使用最近保存的原始帧
+                # 如果没有新帧，使用最近保存的原始帧
                 if frame is None and hasattr(self, 'last_raw_frame') and self.last_raw_frame is not None:
-                    frame = self.last_raw_frame.copy()
+                    frame = self.last_raw_frame
                 
                 # 如果没有有效的原始帧，使用纯色帧
                 if frame is None or frame.size == 0:
@@ -915,19 +1000,18 @@ class VideoStreamHandler:
                         frame = np.ones((self.stream_height, self.stream_width, 3), dtype=np.uint8) * 220
                 
                 # 压缩并编码为JPEG - 使用高质量设置以保持原始画面质量
-                stream_params = [int(cv2.IMWRITE_JPEG_QUALITY), 95]
-                success, encoded_image = cv2.imencode('.jpg', frame, stream_params)
-                if success:
+                encoded_image = encode_jpeg(frame, RAW_STREAM_QUALITY)
+                if encoded_image is not None:
                     yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n')
+                           b'Content-Type: image/jpeg\r\n\r\n' + encoded_image + b'\r\n')
                 else:
                     print("WARNING: 帧编码失败，使用备用帧")
                     # 使用纯色备用帧
                     backup_frame = np.ones((self.stream_height, self.stream_width, 3), dtype=np.uint8) * 200
-                    success, backup_encoded = cv2.imencode('.jpg', backup_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-                    if success:
+                    backup_encoded = encode_jpeg(backup_frame, 80)
+                    if backup_encoded is not None:
                         yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + backup_encoded.tobytes() + b'\r\n')
+                               b'Content-Type: image/jpeg\r\n\r\n' + backup_encoded + b'\r\n')
                 
                 # 每隔50帧检查一次视频流状态
                 frame_count += 1
@@ -936,16 +1020,6 @@ class VideoStreamHandler:
                         print("DEBUG: 视频流已停止，结束流生成")
                         break
                 
-                # 控制帧率 - 基于当前系统性能动态调整，提高生产频率
-                try:
-                    # 提高帧率以确保队列有足够的帧供应
-                    target_fps = min(STREAM_FPS_TARGET, 20)  # 提高到20fps以增加帧生产
-                    sleep_time = max(1.0 / target_fps - 0.005, 0.005)  # 减少延迟
-                    time.sleep(sleep_time)
-                except:
-                    # 出错时使用安全的默认值
-                    time.sleep(0.05)  # 约20fps
-                
             except Exception as e:
                 print(f"ERROR: 生成原始视频流出错: {str(e)}")
                 # 发送纯色错误帧
@@ -953,18 +1027,18 @@ class VideoStreamHandler:
                 
                 try:
                     # 使用高质量设置以确保可以编码
-                    success, encoded_image = cv2.imencode('.jpg', error_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-                    if success:
+                    encoded_image = encode_jpeg(error_frame, 80)
+                    if encoded_image is not None:
                         yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n')
+                               b'Content-Type: image/jpeg\r\n\r\n' + encoded_image + b'\r\n')
                 except:
                     # 如果连错误帧都无法编码，使用最简单的空白帧
                     try:
                         blank_frame = np.ones((240, 320, 3), dtype=np.uint8) * 220
-                        success, encoded_image = cv2.imencode('.jpg', blank_frame, [int(cv2.IMWRITE_JPEG_QUALITY), 60])
-                        if success:
+                        encoded_image = encode_jpeg(blank_frame, 60)
+                        if encoded_image is not None:
                             yield (b'--frame\r\n'
-                                   b'Content-Type: image/jpeg\r\n\r\n' + encoded_image.tobytes() + b'\r\n')
+                                   b'Content-Type: image/jpeg\r\n\r\n' + encoded_image + b'\r\n')
                     except:
                         pass
                 
@@ -973,4 +1047,75 @@ class VideoStreamHandler:
         
         # 恢复原始分辨率设置
         self.stream_width, self.stream_height = original_width, original_height
-        print("DEBUG: 原始视频流生成结束，已恢复分辨率设置")
\ No newline at end of file
+        print("DEBUG: 原始视频流生成结束，已恢复分辨率设置")
+    
+    def subscribe_raw_stream(self, resolution_param=None, profile=None):
+        """
+        为一个客户端订阅家长监护原始视频流（流分发中心的编码通道，同一分辨率的客户端共享编码结果）
+        
+        Args:
+            resolution_param: 分辨率参数（见RAW_STREAM_RESOLUTIONS）或 (width, height) 元组；
+                              'auto' 按该客户端自身的发送状况在 STREAM_RESOLUTION_LEVELS 中自动选择档位
+            profile: 视频流规格（StreamProfile），'auto' 时档位的尺寸、质量和帧率不超过该规格
+            
+        Returns:
+            StreamSubscription（'auto' 时为 AdaptiveSubscription），交给generate_raw_video_stream_async后由其关闭
+            
+        Raises:
+            ViewerLimitError: 同时观看的客户端数量已达上限
+        """
+        from modules.stream_hub import get_stream_hub
+        if resolution_param == 'auto':
+            hub = get_stream_hub()
+            if hub.get_source('raw') is not self.camera_manager:
+                hub.register_source('raw', self.camera_manager)
+            if profile is not None:
+                return hub.subscribe_profile(
+                    'raw', profile, resolution_levels=STREAM_RESOLUTION_LEVELS,
+                    quality_levels=(RAW_STREAM_QUALITY, 75, 55), adjust_interval=RESOLUTION_ADJUST_INTERVAL)
+            return hub.subscribe_adaptive(
+                'raw', STREAM_RESOLUTION_LEVELS, quality_levels=(RAW_STREAM_QUALITY, 75, 55),
+                target_fps=STREAM_FPS_TARGET, adjust_interval=RESOLUTION_ADJUST_INTERVAL)
+        size = RAW_STREAM_RESOLUTIONS.get(resolution_param) if isinstance(resolution_param, str) else resolution_param
+        if size is None:
+            size = (self.stream_width, self.stream_height)
+        # 与摄像头分辨率一致时不缩放，MJPEG直通时可原样转发摄像头数据
+        if tuple(size) == (self.camera_manager.frame_width, self.camera_manager.frame_height):
+            size = None
+        hub = get_stream_hub()
+        if hub.get_source('raw') is not self.camera_manager:
+            hub.register_source('raw', self.camera_manager)
+        return hub.subscribe('raw', RAW_STREAM_QUALITY, size)
+    
+    async def generate_raw_video_stream_async(self, subscription):
+        """
+        异步生成原始视频流（完全无处理）用于家长监护
+        
+        由新帧事件驱动，不占用线程池线程；客户端较慢时直接跳到最新一帧，不排队。
+        
+        Args:
+            subscription: subscribe_raw_stream() 返回的订阅，生成器结束时关闭
+        """
+        try:
+            # 视频流未启动或暂无新帧时发送纯色帧（不添加任何文本）
+            static_frame = np.ones((self.stream_height, self.stream_width, 3), dtype=np.uint8) * 220
+            encoded_image = encode_jpeg(static_frame, self.jpeg_quality)
+            idle_part = None
+            if encoded_image is not None:
+                idle_part = (b'--frame\r\n'
+                             b'Content-Type: image/jpeg\r\n\r\n' + encoded_image + b'\r\n')
+            if not self.is_streaming:
+                if idle_part is not None:
+                    yield idle_part
+                return
+            
+            while self.is_streaming:
+                part = await subscription.next_part_async(timeout=1.0)
+                if part is None:
+                    # 编码失败时没有纯色帧可发，继续等待新帧
+                    part = idle_part
+                if part is not None:
+                    yield part
+        finally:
+            subscription.close()
+            print("DEBUG: 异步原始视频流生成结束")
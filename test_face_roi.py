@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+姿势引导的面部区域测试（不需要摄像头和MediaPipe，姿势关键点为构造数据）
+
+直接运行：python test_face_roi.py；也可用 pytest 收集。
+"""
+from types import SimpleNamespace
+
+from modules.camera_sources import SyntheticCameraSource
+from modules.face_roi import FaceRoiTracker
+
+
+def _pose(cx, cy, span=0.06, visibility=0.9):
+    """构造面部关键点集中在 (cx, cy)（归一化坐标）附近的姿势结果，其余关键点不可见"""
+    offsets = [(0, 0), (-1, -1), (-1, -1), (-1, -1), (1, -1), (1, -1), (1, -1),
+               (-2, 0), (2, 0), (-0.5, 1), (0.5, 1)]
+    landmarks = [SimpleNamespace(x=cx + dx * span / 4, y=cy + dy * span / 4, visibility=visibility)
+                 for dx, dy in offsets]
+    landmarks += [SimpleNamespace(x=0.5, y=0.9, visibility=0.1) for _ in range(22)]
+    return SimpleNamespace(landmark=landmarks)
+
+
+def _frame_shape():
+    return SyntheticCameraSource(640, 480, seed=0).read()[1].shape
+
+
+def test_roi_follows_face():
+    """面部关键点可见时给出包含面部的正方形裁剪区域"""
+    shape = _frame_shape()
+    tracker = FaceRoiTracker(min_size=64)
+    roi = tracker.update(_pose(0.5, 0.4), shape)
+    assert roi is not None
+    x0, y0, x1, y1 = roi
+    assert x1 - x0 == y1 - y0
+    assert x0 < 320 < x1 and y0 < 192 < y1
+    assert 0 <= x0 and 0 <= y0 and x1 <= shape[1] and y1 <= shape[0]
+    assert tracker.stats['cropped'] == 1
+
+
+def test_miss_falls_back_to_full_frame_once():
+    """面部网格在裁剪区域内没有找到面部时，下一帧处理整帧，之后恢复裁剪"""
+    shape = _frame_shape()
+    tracker = FaceRoiTracker(min_size=64)
+    assert tracker.update(_pose(0.5, 0.4), shape) is not None
+    tracker.miss()
+    assert tracker.update(_pose(0.5, 0.4), shape) is None
+    assert tracker.stats['misses'] == 1
+    assert tracker.stats['full_frame'] == 1
+    assert tracker.update(_pose(0.5, 0.4), shape) is not None
+    assert tracker.stats['cropped'] == 2
+
+
+def test_no_pose_or_oversized_face_uses_full_frame():
+    """没有检测到人、面部关键点不可见或面部过大时处理整帧"""
+    shape = _frame_shape()
+    tracker = FaceRoiTracker(min_size=64)
+    assert tracker.update(None, shape) is None
+    assert tracker.update(_pose(0.5, 0.4, visibility=0.1), shape) is None
+    assert tracker.update(_pose(0.5, 0.5, span=0.6), shape) is None
+    assert tracker.stats['full_frame'] == 3
+    assert tracker.stats['cropped'] == 0
+
+
+def test_large_move_jumps_without_smoothing():
+    """头部大幅移动时方框直接跳到新位置"""
+    shape = _frame_shape()
+    tracker = FaceRoiTracker(min_size=64)
+    tracker.update(_pose(0.3, 0.4), shape)
+    x0, _, x1, _ = tracker.update(_pose(0.7, 0.4), shape)
+    assert x0 < 0.7 * shape[1] < x1
+    assert tracker.stats['jumps'] == 1
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f"✓ {name}")
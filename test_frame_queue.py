@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+按内存预算限定容量的帧队列测试（不需要摄像头，帧来自合成帧源）
+
+直接运行：python test_frame_queue.py；也可用 pytest 收集。
+"""
+import queue
+
+from modules.camera_sources import SyntheticCameraSource
+from modules.video_stream_module import BoundedFrameQueue
+
+
+def _frames(count, width=64, height=48):
+    source = SyntheticCameraSource(width, height, noise=10, seed=0)
+    return [source.read()[1] for _ in range(count)]
+
+
+def test_budget_evicts_oldest_frames():
+    """总字节数超过预算时丢弃最旧的帧，深度由帧大小换算"""
+    frames = _frames(6)
+    frame_bytes = frames[0].nbytes
+    q = BoundedFrameQueue(budget_bytes=frame_bytes * 3, max_depth=10)
+    dropped = sum(q.put(frame) for frame in frames)
+    assert dropped == 3
+    assert q.qsize() == 3
+    assert q.full()
+    status = q.get_status()
+    assert status['capacity'] == 3
+    assert status['bytes_held'] == frame_bytes * 3
+    assert status['dropped'] == 3 and status['enqueued'] == 6
+    # 剩下的是最新的三帧，按入队顺序取出
+    for expected in frames[3:]:
+        assert q.get_nowait() is expected
+    assert q.empty() and q.get_status()['bytes_held'] == 0
+
+
+def test_keeps_newest_frame_over_budget():
+    """单帧超过预算时也至少保留最新一帧"""
+    small, large = _frames(1)[0], _frames(1, 320, 240)[0]
+    q = BoundedFrameQueue(budget_bytes=small.nbytes)
+    q.put(small)
+    assert q.put(large) == 1
+    assert q.qsize() == 1
+    assert q.get_nowait() is large
+
+
+def test_max_depth_and_latest_fallback():
+    """帧很小时深度不超过上限；取空后 latest 仍保存最新一帧"""
+    frames = _frames(5)
+    q = BoundedFrameQueue(budget_bytes=frames[0].nbytes * 100, max_depth=2)
+    for frame in frames:
+        q.put(frame)
+    assert q.qsize() == 2
+    q.get_nowait()
+    q.get_nowait()
+    try:
+        q.get_nowait()
+    except queue.Empty:
+        pass
+    else:
+        raise AssertionError("空队列应抛出 queue.Empty")
+    assert q.latest is frames[-1]
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f"✓ {name}")
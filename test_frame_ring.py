@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+帧环形缓冲区测试（不需要摄像头，帧来自合成帧源）
+
+直接运行：python test_frame_ring.py；也可用 pytest 收集。
+"""
+import numpy as np
+
+from modules.camera_sources import SyntheticCameraSource
+from modules.frame_ring import FrameRing
+
+
+def _frames(count, width=64, height=48):
+    source = SyntheticCameraSource(width, height, noise=10, seed=0)
+    for _ in range(count):
+        ok, frame = source.read()
+        assert ok
+        yield frame
+
+
+def test_held_frame_is_not_overwritten():
+    """被借用的帧在后续发布中保持不变，释放后槽位重新可用"""
+    ring = FrameRing(capacity=3, frame_shape=(48, 64, 3))
+    frames = list(_frames(6))
+    ring.publish(frames[0])
+    held = ring.acquire_latest()
+    expected = held.copy()
+    for frame in frames[1:]:
+        ring.publish(frame)
+    assert held.seq == 1
+    assert np.array_equal(held.image, expected), "借用中的帧被覆盖"
+    assert not held.image.flags.writeable
+    assert ring.get_status()['grown_slots'] == 0
+    held.release()
+    assert ring.get_status()['slots_in_use'] == 1  # 只剩缓冲区持有的最新帧
+
+
+def test_ring_grows_when_all_slots_held():
+    """所有槽位都被借用时扩容，而不是覆盖正在使用的帧"""
+    ring = FrameRing(capacity=2, frame_shape=(48, 64, 3))
+    held = []
+    for frame in _frames(4):
+        ring.publish(frame)
+        held.append(ring.acquire_latest())
+    status = ring.get_status()
+    assert status['capacity'] == 4
+    assert status['grown_slots'] == 2
+    assert status['overwrites_blocked'] == 2
+    assert [ref.seq for ref in held] == [1, 2, 3, 4]
+
+    for ref in held:
+        ref.release()
+    # 释放后不再扩容
+    for frame in _frames(8):
+        ring.publish(frame)
+    assert ring.get_status()['capacity'] == 4
+    assert ring.get_status()['slots_in_use'] == 1
+
+
+def test_release_and_context_manager():
+    """with 语句释放引用，槽位回收后旧句柄不能再借用"""
+    ring = FrameRing(capacity=2, frame_shape=(48, 64, 3))
+    frames = list(_frames(3))
+    ring.publish(frames[0])
+    with ring.acquire_latest() as ref:
+        assert ring.get_status()['slots_in_use'] == 1
+        assert ref.seq == 1
+    ring.publish(frames[1])
+    ring.publish(frames[2])
+    try:
+        ref.retain()
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("已回收的帧不应能再次借用")
+    assert ring.get_status()['grown_slots'] == 0
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f"✓ {name}")
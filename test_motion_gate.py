@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+运动门控测试（不需要摄像头，帧来自合成帧源）
+
+直接运行：python test_motion_gate.py；也可用 pytest 收集。
+"""
+import time
+
+import cv2
+
+from modules.camera_sources import SyntheticCameraSource
+from modules.motion_gate import MotionGate
+
+
+def _small_gray(frame, size=(64, 48)):
+    return cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), size, interpolation=cv2.INTER_AREA)
+
+
+def test_static_scene_is_gated_and_motion_passes():
+    """画面不变时沿用结果，变化超过阈值时重新推理"""
+    source = SyntheticCameraSource(160, 120, noise=0, seed=0)
+    still = _small_gray(source.read()[1])
+    gate = MotionGate(threshold=2.0, max_reuse_s=0)
+    assert gate.should_process(still), "第一帧没有参考画面，必须推理"
+    for _ in range(5):
+        assert not gate.should_process(still.copy())
+    assert gate.last_diff == 0.0
+
+    moved = cv2.add(still, 40)
+    assert gate.should_process(moved)
+    assert gate.last_diff >= 2.0
+    assert gate.stats == {'frames': 7, 'processed': 2, 'gated': 5, 'forced': 0}
+
+
+def test_slow_drift_accumulates_against_reference():
+    """参考画面是上一次推理的画面，缓慢渐变累积超过阈值后同样触发推理"""
+    source = SyntheticCameraSource(160, 120, noise=0, seed=0)
+    base = _small_gray(source.read()[1])
+    gate = MotionGate(threshold=3.0, max_reuse_s=0)
+    gate.should_process(base)
+    results = [gate.should_process(cv2.add(base, step)) for step in (1, 2, 4)]
+    assert results == [False, False, True]
+
+
+def test_forced_reuse_timeout():
+    """画面不变但沿用超过 max_reuse_s 时强制推理一次"""
+    source = SyntheticCameraSource(160, 120, noise=0, seed=0)
+    still = _small_gray(source.read()[1])
+    gate = MotionGate(threshold=2.0, max_reuse_s=0.05)
+    assert gate.should_process(still)
+    assert not gate.should_process(still)
+    time.sleep(0.06)
+    assert gate.should_process(still)
+    assert gate.stats['forced'] == 1
+    assert not gate.should_process(still), "强制推理后以该帧为新的参考画面"
+
+
+def test_reset_and_shape_change():
+    """reset() 或比较尺寸变化后下一帧必定推理"""
+    source = SyntheticCameraSource(160, 120, noise=0, seed=0)
+    still = _small_gray(source.read()[1])
+    gate = MotionGate(threshold=2.0, max_reuse_s=0)
+    gate.should_process(still)
+    gate.reset()
+    assert gate.should_process(still)
+    assert gate.should_process(_small_gray(source.read()[1], size=(32, 24)))
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f"✓ {name}")
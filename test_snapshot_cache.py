@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+快照缓存与ETag测试（不需要摄像头，帧来自合成帧源）
+
+直接运行：python test_snapshot_cache.py；也可用 pytest 收集。
+"""
+from modules.camera_manager import CameraManager
+from modules.camera_sources import SyntheticCameraSource
+from modules.snapshot_cache import SnapshotCache, etag_matches, snapshot_etag
+
+
+def _manager_with_frame(source):
+    """不启动捕获线程的摄像头管理器，由测试发布帧"""
+    manager = CameraManager(frame_width=160, frame_height=120, source='synthetic')
+    manager._publish_frame(source.read()[1])
+    return manager
+
+
+def test_same_frame_is_not_modified():
+    """没有新帧时ETag不变，客户端携带 If-None-Match 应得到304；新帧到达后ETag变化"""
+    source = SyntheticCameraSource(160, 120, noise=10, seed=0)
+    manager = _manager_with_frame(source)
+    cache = SnapshotCache(manager, quality=80)
+
+    first = cache.get()
+    etag = snapshot_etag(first, cache.quality)
+    again = cache.get()
+    assert again.seq == first.seq
+    assert snapshot_etag(again, cache.quality) == etag
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'W/{etag}', etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches(None, etag)
+
+    manager._publish_frame(source.read()[1])
+    newer = cache.get()
+    assert newer.seq > first.seq
+    assert not etag_matches(etag, snapshot_etag(newer, cache.quality))
+
+
+def test_quality_and_width_change_etag():
+    """重新编码的快照ETag区分质量和尺寸，避免客户端用错缓存"""
+    source = SyntheticCameraSource(160, 120, noise=10, seed=0)
+    manager = _manager_with_frame(source)
+    cache = SnapshotCache(manager, quality=80)
+    full = cache.get()
+    assert snapshot_etag(full, 80) != snapshot_etag(full, 60)
+    small = cache.get(width=80)
+    assert (small.width, small.height) == (80, 60)
+    assert snapshot_etag(small, 80) != snapshot_etag(full, 80)
+
+
+def test_scaled_variant_encoded_once_per_frame():
+    """同一帧同一宽度只编码一次，新帧到达后旧的缩小版本失效"""
+    source = SyntheticCameraSource(160, 120, noise=10, seed=0)
+    manager = _manager_with_frame(source)
+    cache = SnapshotCache(manager, quality=80)
+    a = cache.get(width=80)
+    b = cache.get(width=80)
+    assert a is b
+    assert cache.stats['encoded'] == 1
+    manager._publish_frame(source.read()[1])
+    c = cache.get(width=80)
+    assert c.seq > a.seq
+    assert cache.stats['encoded'] == 2
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f"✓ {name}")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+流分发中心测试（不需要摄像头）
+
+直接运行：python test_stream_hub.py；也可用 pytest 收集。
+"""
+import asyncio
+import time
+
+import cv2
+
+from modules.camera_manager import CameraManager
+from modules.camera_sources import SyntheticCameraSource
+from modules.stream_hub import StreamHub, ViewerLimitError, mjpeg_part
+
+
+def _passthrough_manager(width=160, height=120):
+    """模拟摄像头输出MJPG的管理器：不启动捕获线程，由测试发布摄像头的JPEG"""
+    manager = CameraManager(frame_width=width, frame_height=height, source='synthetic')
+    manager.passthrough_active = True
+    manager.passthrough_size = (width, height)
+    return manager
+
+
+def _publish_camera_jpeg(manager, source):
+    ok, frame = source.read()
+    assert ok
+    data = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes()
+    manager._publish_jpeg(data)
+    return data
+
+
+def _synthetic_manager(width=160, height=120):
+    """由合成帧源驱动的摄像头管理器（已启动）"""
+    manager = CameraManager(frame_width=width, frame_height=height, source='synthetic')
+    manager.start()
+    return manager
+
+
+def test_subscribers_share_one_encode():
+    """相同规格的订阅共享同一个编码通道，每帧只编码一次，订阅者拿到同一个bytes对象"""
+    manager = _synthetic_manager()
+    hub = StreamHub(max_viewers=0)
+    hub.register_source('raw', manager)
+    first = hub.subscribe('raw', quality=70)
+    second = hub.subscribe('raw', quality=70)
+    other = hub.subscribe('raw', quality=50)
+    try:
+        assert first.channel is second.channel
+        assert other.channel is not first.channel
+        assert first.channel.subscribers == 2
+        shared = 0
+        for _ in range(5):
+            a = first.next_frame(timeout=2.0)
+            b = second.next_frame(timeout=2.0)
+            assert a is not None and b is not None
+            # 两次取帧之间可能到达新帧；同一帧必须是同一份编码结果
+            if a.seq == b.seq:
+                assert a.data is b.data
+                shared += 1
+        assert shared > 0
+        stats = first.channel.stats
+        assert stats['encoded'] + stats['reused'] == first.channel.published
+        assert stats['encoded'] <= first.channel.published
+    finally:
+        first.close()
+        second.close()
+        other.close()
+        manager.stop()
+    assert hub.get_status()['subscribers'] == 0
+
+
+def test_viewer_limit():
+    """同时观看人数达到上限时拒绝新订阅，有人退出后恢复"""
+    manager = _synthetic_manager()
+    hub = StreamHub(max_viewers=2)
+    hub.register_source('raw', manager)
+    subs = [hub.subscribe('raw', quality=70), hub.subscribe('raw', quality=50)]
+    try:
+        try:
+            hub.subscribe('raw', quality=70)
+        except ViewerLimitError:
+            pass
+        else:
+            raise AssertionError("超过观看人数上限应抛出 ViewerLimitError")
+        assert hub.rejected == 1
+        subs.pop().close()
+        subs.append(hub.subscribe('raw', quality=70))
+        assert subs[-1].channel.subscribers == 2
+    finally:
+        for sub in subs:
+            sub.close()
+        manager.stop()
+
+
+def test_passthrough_downgraded_tier_reencodes():
+    """MJPEG直通时，原尺寸的低质量档位应重新编码，而不是发送与高质量档位相同的摄像头数据"""
+    manager = _passthrough_manager()
+    source = SyntheticCameraSource(160, 120, noise=20, seed=1)
+    hub = StreamHub(max_viewers=0)
+    hub.register_source('raw', manager)
+    high = hub.subscribe('raw', quality=95)
+    low = hub.subscribe('raw', quality=50)
+    try:
+        time.sleep(0.1)
+        camera_data = _publish_camera_jpeg(manager, source)
+        high_jpeg = high.next_frame(timeout=2.0)
+        low_jpeg = low.next_frame(timeout=2.0)
+        assert high_jpeg is not None and low_jpeg is not None
+        assert high_jpeg.data == camera_data, "高质量档位应直接转发摄像头的JPEG"
+        assert low_jpeg.data != camera_data, "降档后发送的数据应与直通数据不同"
+        assert len(low_jpeg.data) < len(camera_data)
+        assert low_jpeg.seq == high_jpeg.seq
+    finally:
+        high.close()
+        low.close()
+
+
+def test_adaptive_part_measures_taken_frame():
+    """自适应订阅的multipart接口按实际取到的帧记录延迟，而不是等待结束时通道里的最新帧"""
+    manager = _synthetic_manager()
+    hub = StreamHub(max_viewers=0)
+    hub.register_source('raw', manager)
+    adaptive = hub.subscribe_adaptive('raw', quality_levels=(70,))
+
+    async def take():
+        return await adaptive.next_part_async(timeout=2.0)
+
+    try:
+        part = asyncio.run(take())
+        taken = adaptive._sub.last_frame
+        assert part is not None and taken is not None
+        assert part == mjpeg_part(taken.data)
+        assert adaptive.last_seq == taken.seq
+        assert len(adaptive._lags) == 1
+    finally:
+        adaptive.close()
+        manager.stop()
+
+
+if __name__ == '__main__':
+    for name, func in list(globals().items()):
+        if name.startswith('test_') and callable(func):
+            func()
+            print(f"✓ {name}")
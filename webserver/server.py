@@ -1,15 +1,28 @@
 import os
 import sys
+import asyncio
 import cv2
 import json
+import struct
 import numpy as np
-from typing import Optional, Generator
-from fastapi import FastAPI, APIRouter, Request, WebSocket, HTTPException, Depends, Response
+from typing import Optional, AsyncGenerator
+from fastapi import FastAPI, APIRouter, Request, WebSocket, WebSocketDisconnect, HTTPException, Depends, Response
 from fastapi.responses import StreamingResponse, JSONResponse, RedirectResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.cors import CORSMiddleware
 
 from .context import AppContext
+from modules.stream_hub import ViewerLimitError, get_stream_hub, get_stream_profile, iter_mjpeg, mjpeg_part, request_device_type
+from modules.jpeg_codec import encode_jpeg
+from modules.video_sessions import open_video_session
+from modules.video_stream_module import STREAM_RESOLUTION_LEVELS, RESOLUTION_ADJUST_INTERVAL
+
+try:
+    from config import WS_VIDEO_MAX_IN_FLIGHT, WS_VIDEO_MAX_IN_FLIGHT_LIMIT, WS_VIDEO_ACK_TIMEOUT
+except ImportError:
+    WS_VIDEO_MAX_IN_FLIGHT = 2
+    WS_VIDEO_MAX_IN_FLIGHT_LIMIT = 8
+    WS_VIDEO_ACK_TIMEOUT = 3.0
 
 def _detect_device_type(request: Request) -> str:
     """检测设备类型"""
@@ -69,6 +82,7 @@ class WebServer:
 
         # 添加WebSocket支持
         self._add_websocket_routes(app)
+        self._add_video_websocket_route(app)
         
         # 挂载WebServer的前端静态文件（在根路径路由之前）
         self._mount_static_files(app)
@@ -170,12 +184,28 @@ class WebServer:
             }
 
         @router.get("/video/local")
-        async def video_stream_endpoint(ctx: AppContext = Depends(get_app_context)):
+        async def video_stream_endpoint(request: Request, ctx: AppContext = Depends(get_app_context)):
             """视频流接口（本地调试版）"""
             try:
+                # 无新帧时发送的占位分段，只编码一次
+                idle_part = mjpeg_part(encode_jpeg(np.zeros((480, 640, 3), dtype=np.uint8), 95))
+                
                 # 首先尝试使用本地video_stream
                 if ctx.video_stream is not None:
-                    def generate_local_mjpeg() -> Generator[bytes, None, None]:
+                    camera_manager = getattr(ctx.video_stream, 'camera_manager', None)
+                    if camera_manager is not None:
+                        # 订阅流分发中心：同一帧只编码一次，所有客户端共享同一份JPEG字节，
+                        # 按摄像头实际帧率推送（MJPEG直通时原样转发摄像头的JPEG数据）；
+                        # 异步生成器由新帧事件驱动，不占用线程池线程
+                        hub = get_stream_hub()
+                        if hub.get_source('raw') is not camera_manager:
+                            hub.register_source('raw', camera_manager)
+                        subscription = hub.subscribe('raw')
+                        open_video_session(subscription, request, '/video/local', 'raw')
+                        return StreamingResponse(iter_mjpeg(subscription, idle_part=idle_part),
+                                                 media_type="multipart/x-mixed-replace; boundary=frame")
+                    
+                    async def generate_local_mjpeg() -> AsyncGenerator[bytes, None]:
                         try:
                             while True:
                                 frame = None
@@ -184,40 +214,22 @@ class WebServer:
                                 elif hasattr(ctx.video_stream, 'current_frame'):
                                     frame = ctx.video_stream.current_frame
                                 if frame is not None and isinstance(frame, np.ndarray):
-                                    _, buffer = cv2.imencode('.jpg', frame)
-                                    frame_bytes = buffer.tobytes()
-                                    yield (b'--frame\r\n'
-                                           b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+                                    yield mjpeg_part(encode_jpeg(frame, 95))
                                 else:
-                                    blank = np.zeros((480, 640, 3), dtype=np.uint8)
-                                    _, buffer = cv2.imencode('.jpg', blank)
-                                    yield (b'--frame\r\n'
-                                           b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                                import time; time.sleep(1/30)
+                                    yield idle_part
+                                await asyncio.sleep(1/30)
                         except Exception as e:
                             print(f"视频流生成错误: {e}")
                             return
                     return StreamingResponse(generate_local_mjpeg(), media_type="multipart/x-mixed-replace; boundary=frame")
-                # 使用WebServer摄像头
+                # 使用WebServer摄像头：订阅其编码通道，只在有客户端时编码，新帧到达才发送
                 from WebServer.backend.video_stream import camera
-                def generate_webserver_mjpeg() -> Generator[bytes, None, None]:
-                    try:
-                        import time
-                        while True:
-                            frame_bytes = camera.read()
-                            if frame_bytes:
-                                yield (b'--frame\r\n'
-                                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                            else:
-                                blank = np.zeros((480, 640, 3), dtype=np.uint8)
-                                _, buffer = cv2.imencode('.jpg', blank)
-                                yield (b'--frame\r\n'
-                                       b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                            time.sleep(1/30)
-                    except Exception as e:
-                        print(f"WebServer视频流生成错误: {e}")
-                        return
-                return StreamingResponse(generate_webserver_mjpeg(), media_type="multipart/x-mixed-replace; boundary=frame")
+                subscription = camera.subscribe()
+                open_video_session(subscription, request, '/video/local', camera.stream_name)
+                return StreamingResponse(iter_mjpeg(subscription, idle_part=idle_part),
+                                         media_type="multipart/x-mixed-replace; boundary=frame")
+            except ViewerLimitError as e:
+                raise HTTPException(status_code=503, detail=str(e))
             except Exception as e:
                 raise HTTPException(status_code=503, detail=f"视频流服务错误: {str(e)}")
 
@@ -581,6 +593,118 @@ class WebServer:
                         pass
         except Exception as e:
             print(f"[WebServer] 无法挂载WebSocket支持: {str(e)}")
+
+    def _add_video_websocket_route(self, app: FastAPI) -> None:
+        """
+        添加二进制视频WebSocket通道 /ws/video
+
+        协议：
+            - 连接后服务器先发送文本消息 {"type": "video_init", ...}
+            - 每帧一条二进制消息：8字节大端序帧序号 + JPEG数据
+            - 客户端收到并显示后回复 {"type": "ack", "seq": 帧序号}（累计确认，确认某帧即确认其之前的所有帧）
+            - 客户端可发送 {"type": "config", "max_in_flight": n} 调整未确认帧上限（不超过服务器上限）
+        分辨率/质量/帧率上限按视频流规格（查询参数 profile，默认按设备类型选择）。
+        每个客户端未确认的帧数达到上限时服务器暂停发送，期间的新帧直接跳过、下次发送最新一帧，
+        网络慢的客户端不会在服务器或网络中积压帧；超过 WS_VIDEO_ACK_TIMEOUT 仍未确认的帧视为丢失。
+        可与 /ws/realtime 同时使用。
+        """
+
+        @app.websocket("/ws/video")
+        async def websocket_video(websocket: WebSocket, stream: str = 'raw', quality: Optional[int] = None,
+                                  adaptive: bool = True, profile: Optional[str] = None,
+                                  max_in_flight: int = WS_VIDEO_MAX_IN_FLIGHT):
+            await websocket.accept()
+            hub = get_stream_hub()
+            if hub.get_source(stream) is None:
+                await websocket.send_json({"type": "error", "message": f"未知的视频流: {stream}"})
+                await websocket.close(code=1008)
+                return
+            stream_profile = get_stream_profile(profile, request_device_type(websocket))
+            if quality:
+                stream_profile = stream_profile._replace(quality=min(stream_profile.quality, quality))
+            try:
+                subscription = hub.subscribe_profile(stream, stream_profile, adaptive,
+                                                     resolution_levels=STREAM_RESOLUTION_LEVELS,
+                                                     adjust_interval=RESOLUTION_ADJUST_INTERVAL)
+            except ViewerLimitError as e:
+                await websocket.send_json({"type": "error", "message": str(e)})
+                await websocket.close(code=1013)
+                return
+            open_video_session(subscription, websocket, '/ws/video', stream, stream_profile.name)
+
+            def clamp_window(value) -> int:
+                return min(WS_VIDEO_MAX_IN_FLIGHT_LIMIT, max(1, int(value)))
+
+            window = clamp_window(max_in_flight)
+            in_flight = []          # 已发送未确认的帧 (序号, 发送时间)，序号递增
+            acked = asyncio.Event()
+            loop = asyncio.get_running_loop()
+
+            async def receive_acks():
+                nonlocal window, in_flight
+                while True:
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect(message.get("code", 1000))
+                    data = message.get("text")
+                    if data is None:
+                        # 客户端只应发送文本控制消息，二进制消息忽略
+                        continue
+                    try:
+                        message = json.loads(data)
+                        if message.get("type") == "ack":
+                            seq = int(message.get("seq", 0))
+                            in_flight = [(s, t) for s, t in in_flight if s > seq]
+                            acked.set()
+                        elif message.get("type") == "config" and "max_in_flight" in message:
+                            window = clamp_window(message["max_in_flight"])
+                            acked.set()
+                    except (TypeError, ValueError, AttributeError) as e:
+                        # 格式错误的消息直接忽略，不中断视频通道
+                        print(f"[WebSocket] 忽略无效的视频通道消息 {data[:100]!r}: {str(e)}")
+
+            receiver = asyncio.create_task(receive_acks())
+            try:
+                await websocket.send_json({
+                    "type": "video_init",
+                    "stream": stream,
+                    "profile": stream_profile._asdict(),
+                    "adaptive": adaptive,
+                    "max_in_flight": window,
+                    "header": "seq:uint64be"
+                })
+                while not receiver.done():
+                    if len(in_flight) >= window:
+                        deadline = loop.time() - WS_VIDEO_ACK_TIMEOUT
+                        if in_flight[0][1] <= deadline:
+                            expired = [s for s, t in in_flight if t <= deadline]
+                            in_flight = [(s, t) for s, t in in_flight if t > deadline]
+                            print(f"[WebSocket] 视频通道 {len(expired)} 帧超过 {WS_VIDEO_ACK_TIMEOUT}s 未确认"
+                                  f"（序号 {expired[0]}-{expired[-1]}），视为丢失并继续发送")
+                            continue
+                        # 等待客户端确认；客户端断开时接收任务结束
+                        acked.clear()
+                        try:
+                            await asyncio.wait_for(acked.wait(), min(1.0, in_flight[0][1] - deadline))
+                        except asyncio.TimeoutError:
+                            pass
+                        continue
+                    jpeg = await subscription.next_frame_async(timeout=1.0)
+                    if jpeg is None or receiver.done():
+                        continue
+                    in_flight.append((jpeg.seq, loop.time()))
+                    await websocket.send_bytes(struct.pack('>Q', jpeg.seq) + jpeg.data)
+            except WebSocketDisconnect:
+                pass
+            except Exception as e:
+                print(f"[WebSocket] 视频通道错误: {str(e)}")
+            finally:
+                subscription.close()
+                receiver.cancel()
+                try:
+                    await receiver
+                except (asyncio.CancelledError, Exception):
+                    pass
     
     def _mount_static_files(self, app: FastAPI) -> None:
         """挂载静态文件"""